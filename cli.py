@@ -3,29 +3,50 @@
 
 import fire
 import signal
+import sys
 from fastProxy import (
     fetch_proxies,
     alter_globals,
     printer,
+    ProxyValidator,
     THREAD_COUNT,
     REQUEST_TIMEOUT,
     GENERATE_CSV,
     ALL_PROXIES
 )
+from fastProxy.storage import ProxyHistoryStore
+from fastProxy.proxy_sources.health import DEFAULT_HEALTH_FILE
+from fastProxy.proxy_sources.manager import ProxySourceManager
+from fastProxy.exporters import get_exporter
+from fastProxy.rotation import ProxyRotator
+from fastProxy.server import ForwardProxyServer
+from fastProxy.snapshot import WarmStart
+from fastProxy.prefilter import default_prefilter
+from fastProxy.bench import run_benchmark, format_report
 
 def timeout_handler(signum, frame):
     """Handle timeout signal"""
     raise TimeoutError("CLI operation timed out")
 
-def main(c=None, t=None, g=None, a=None, max_proxies=5):
+def main(c=None, t=None, g=None, a=None, max_proxies=None, history=None, export=None, serve=None,
+         snapshot=None, want=None, profile=None, https_check=None, health=None):
     """Main CLI function to handle proxy operations
 
     Args:
-        c (int, optional): Thread count. Defaults to None.
+        c (int, optional): Thread count, or 'auto' for adaptive concurrency. Defaults to None.
         t (int, optional): Request timeout. Defaults to None.
         g (bool, optional): Generate CSV. Defaults to None.
         a (bool, optional): All proxies. Defaults to None.
-        max_proxies (int, optional): Maximum number of proxies to fetch. Defaults to 5.
+        max_proxies (int, optional): Maximum number of proxies to fetch. Defaults to 5, or no limit with want.
+        history (str, optional): SQLite file to append validation history to. Defaults to None.
+        export (str, optional): Comma separated export formats (csv, ndjson, parquet). Defaults to None.
+        serve (str, optional): host:port to run a local forward proxy on over the working proxies. Defaults to None.
+        snapshot (str, optional): Snapshot file to warm start from and save the validated proxies to. Defaults to None.
+        want (int, optional): Stop as soon as this many working proxies are found. Defaults to None.
+        profile (bool, optional): Save a profile of the run in the logs directory. Defaults to None.
+        https_check (str, optional): How HTTPS support is checked: request, tls or tunnel. Defaults to request.
+        health (str, optional): Source health file kept across runs, --nohealth to disable.
+            Defaults to proxy_list/source_health.json.
     """
     # Set global timeout for CLI operation # Linux
     # signal.signal(signal.SIGALRM, timeout_handler)
@@ -41,10 +62,36 @@ def main(c=None, t=None, g=None, a=None, max_proxies=5):
         )
 
         # Fetch and validate proxies with minimal settings
-        proxies = fetch_proxies(max_proxies=max_proxies)
+        if max_proxies is None and not want:
+            max_proxies = 5
+        store = ProxyHistoryStore(history) if history else None
+        health_file = DEFAULT_HEALTH_FILE if health is None else health
+        formats = export.split(',') if isinstance(export, str) else (export or [])
+        exporters = [get_exporter(fmt.strip()) for fmt in formats] or None
+        if snapshot:
+            warm = WarmStart(snapshot, validator=ProxyValidator.from_globals(https_check=https_check))
+            cached = warm.load()
+            if cached:
+                print(f"\nServing {len(cached)} proxies from snapshot while revalidating:")
+                printer(cached)
+            if health_file:
+                ProxySourceManager.health.load(health_file)
+            try:
+                proxies = warm.refresh(max_proxies=max_proxies, store=store, exporters=exporters, want=want,
+                                       profile=profile, prefilter=default_prefilter())
+            finally:
+                if health_file:
+                    ProxySourceManager.health.save(health_file)
+        else:
+            proxies = fetch_proxies(max_proxies=max_proxies, store=store, exporters=exporters, want=want,
+                                    profile=profile, https_check=https_check, health_file=health_file,
+                                    prefilter=default_prefilter())
         if proxies:
             print(f"\nFound {len(proxies)} working proxies:")
             printer(proxies)
+            if serve:
+                host, _, port = str(serve).rpartition(':')
+                ForwardProxyServer(ProxyRotator(proxies), host=host or '127.0.0.1', port=int(port)).run()
         else:
             print("\nNo working proxies found. Try increasing timeout or thread count.")
     except TimeoutError:
@@ -55,5 +102,30 @@ def main(c=None, t=None, g=None, a=None, max_proxies=5):
         # signal.alarm(0)  # Disable alarm # Linux only
         pass
 
+def bench(size=1000, alive=0.3, slow=0.1, engine='threaded', c=50, t=2, slow_delay=0.5, processes=None,
+          seed=0):
+    """Benchmark validation against local fake proxies and a local judge
+
+    Args:
+        size (int, optional): Number of synthetic candidates. Defaults to 1000.
+        alive (float, optional): Share of alive proxies. Defaults to 0.3.
+        slow (float, optional): Share of slow proxies, the rest are dead. Defaults to 0.1.
+        engine (str, optional): threaded, auto or multiprocess. Defaults to threaded.
+        c (int, optional): In-flight probes (per process for multiprocess). Defaults to 50.
+        t (float, optional): Probe timeout in seconds. Defaults to 2.
+        slow_delay (float, optional): Seconds slow proxies take to answer. Defaults to 0.5.
+        processes (int, optional): Worker processes for multiprocess. Defaults to the CPU count.
+        seed (int, optional): Seed of the candidate shuffle. Defaults to 0.
+    """
+    try:
+        print(format_report(run_benchmark(size=size, alive=alive, slow=slow, engine=engine, concurrency=c,
+                                          timeout=t, slow_delay=slow_delay, processes=processes,
+                                          seed=seed)))
+    except ValueError as e:
+        print(f"\nError: {str(e)}")
+
 if __name__ == '__main__':
-    fire.Fire(main)
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        fire.Fire(bench, command=sys.argv[2:])
+    else:
+        fire.Fire(main)
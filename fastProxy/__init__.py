@@ -1,5 +1,6 @@
 from .fastProxy import (
     fetch_proxies,
+    ProxyValidator,
     alter_globals,
     THREAD_COUNT,
     REQUEST_TIMEOUT,
@@ -13,6 +14,7 @@ from .proxy_sources.manager import ProxySourceManager
 __version__ = '1.0.0'
 __all__ = [
     'fetch_proxies',
+    'ProxyValidator',
     'printer',
     'logger',
     'ProxySourceManager',
@@ -0,0 +1,249 @@
+import json
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Optional
+from .logger import logger
+from .profiling import percentile
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+ENGINES = ('threaded', 'auto', 'multiprocess')
+
+# Relays straight to the judge, ignoring any *_proxy environment variables
+_direct = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _JudgeHandler(_QuietHandler):
+    def do_GET(self):
+        self._send(200, json.dumps({'origin': self.client_address[0]}).encode())
+
+
+class _ProxyHandler(_QuietHandler):
+    """Forward proxy for absolute-form GETs, optionally delayed"""
+
+    def do_GET(self):
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        try:
+            with _direct.open(self.path, timeout=10) as response:
+                body = response.read()
+                status = response.status
+        except OSError as e:
+            self._send(502, json.dumps({'error': str(e)}).encode())
+            return
+        self._send(status, body)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, handler, delay: float = 0.0):
+        self.delay = delay
+        super().__init__(('127.0.0.1', 0), handler)
+        self.thread = threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True)
+        self.thread.start()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+
+def _closed_port() -> int:
+    """A local port nothing listens on, so connections are refused"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class SyntheticWorkload:
+    """Local judge plus fake alive, slow and dead proxies
+
+    Every candidate points at 127.0.0.1: alive ones at a forward proxy that
+    relays to the local judge, slow ones at the same proxy with an added
+    delay and dead ones at a closed port. Nothing leaves the machine.
+
+    Args:
+        size: Number of candidates
+        alive: Share of alive candidates
+        slow: Share of slow candidates, the rest are dead
+        slow_delay: Seconds slow proxies wait before answering
+        seed: Seed of the candidate shuffle, for reproducible runs
+    """
+
+    def __init__(self, size: int = 1000, alive: float = 0.3, slow: float = 0.1,
+                 slow_delay: float = 0.5, seed: int = 0):
+        if alive < 0 or slow < 0 or alive + slow > 1:
+            raise ValueError("alive and slow must be shares that add up to at most 1")
+        self.size = size
+        self.alive = alive
+        self.slow = slow
+        self.slow_delay = slow_delay
+        self.seed = seed
+        self._servers = []
+        self.judge_url = None
+        self.ports = {}
+
+    def start(self) -> 'SyntheticWorkload':
+        judge = _Server(_JudgeHandler)
+        self._servers = [judge,
+                         _Server(_ProxyHandler),
+                         _Server(_ProxyHandler, delay=self.slow_delay)]
+        self.judge_url = f"http://127.0.0.1:{judge.port}/ip"
+        self.ports = {'alive': self._servers[1].port, 'slow': self._servers[2].port, 'dead': _closed_port()}
+        return self
+
+    def close(self) -> None:
+        for server in self._servers:
+            server.close()
+        self._servers = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def counts(self) -> Dict[str, int]:
+        alive = int(round(self.size * self.alive))
+        slow = min(int(round(self.size * self.slow)), self.size - alive)
+        return {'alive': alive, 'slow': slow, 'dead': self.size - alive - slow}
+
+    def candidates(self) -> List[Dict]:
+        """Shuffled candidate list in the format of the proxy sources"""
+        proxies = [{'ip': '127.0.0.1', 'port': str(self.ports[kind]), 'code': 'ZZ', 'country': 'Benchmark',
+                    'anonymity': 'elite proxy', 'https': 'no', 'source': f"bench-{kind}"}
+                   for kind, count in self.counts().items() for _ in range(count)]
+        random.Random(self.seed).shuffle(proxies)
+        return proxies
+
+
+def _validate(proxies, concurrency, timeout, judge_url, quiet=False):
+    from .fastProxy import ProxyValidator
+    if quiet:
+        # Worker processes do not inherit the parent's log level
+        logger.logger.setLevel(logging.WARNING)
+    # Synthetic candidates share a handful of ip:port endpoints, so every one is probed
+    validator = ProxyValidator(thread_count=concurrency, request_timeout=timeout, write_csv=False,
+                               http_url=judge_url, https_url=judge_url, dedup=False)
+    return validator.run(proxies=proxies)
+
+
+def _usage():
+    if resource is None:
+        return None
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return round(peak / (1024 * 1024 if os.uname().sysname == 'Darwin' else 1024), 1)
+
+
+def run_benchmark(size: int = 1000, alive: float = 0.3, slow: float = 0.1, engine: str = 'threaded',
+                  concurrency: int = 50, timeout: float = 2.0, slow_delay: float = 0.5,
+                  processes: Optional[int] = None, seed: int = 0, quiet: bool = True) -> Dict:
+    """Validate a synthetic workload with one engine and measure it
+
+    Args:
+        size: Number of candidates
+        alive: Share of alive candidates
+        slow: Share of slow candidates, the rest are dead
+        engine: 'threaded', 'auto' (adaptive concurrency) or 'multiprocess'
+        concurrency: In-flight probes (per process for 'multiprocess')
+        timeout: Probe timeout in seconds
+        slow_delay: Seconds slow proxies wait before answering
+        processes: Worker processes for 'multiprocess', defaults to the CPU count
+        seed: Seed of the candidate shuffle
+        quiet: Only log warnings while the benchmark runs
+
+    Returns:
+        Dict: Workload, throughput, latency percentiles (ms), CPU seconds and peak RSS (MB);
+        CPU and RSS include the local fake proxies and judge
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"engine must be one of {', '.join(ENGINES)}")
+    level = logger.logger.level
+    if quiet:
+        logger.logger.setLevel(logging.WARNING)
+    try:
+        with SyntheticWorkload(size, alive, slow, slow_delay, seed) as workload:
+            candidates = workload.candidates()
+            cpu_before = _usage()
+            started = time.perf_counter()
+            if engine == 'multiprocess':
+                processes = processes or os.cpu_count() or 1
+                chunks = [candidates[i::processes] for i in range(processes)]
+                with multiprocessing.get_context('spawn').Pool(processes) as pool:
+                    results = pool.starmap(_validate, [(chunk, concurrency, timeout, workload.judge_url, quiet)
+                                                       for chunk in chunks if chunk])
+                working = [proxy for result in results for proxy in result]
+            else:
+                working = _validate(candidates, 'auto' if engine == 'auto' else concurrency, timeout,
+                                    workload.judge_url)
+            elapsed = time.perf_counter() - started
+            cpu_after = _usage()
+            counts = workload.counts()
+    finally:
+        logger.logger.setLevel(level)
+
+    latencies = [proxy['latency'] for proxy in working if proxy.get('latency') is not None]
+    return {
+        'engine': engine,
+        'candidates': size,
+        'expected_working': counts['alive'] + (counts['slow'] if slow_delay < timeout else 0),
+        'working': len(working),
+        'elapsed': round(elapsed, 3),
+        'throughput': round(size / elapsed, 1) if elapsed else None,
+        'latency_ms': {f"p{q}": percentile(latencies, q) for q in (50, 90, 99)},
+        'cpu_seconds': round(cpu_after - cpu_before, 3) if cpu_before is not None else None,
+        'peak_rss_mb': _peak_rss_mb()
+    }
+
+
+def format_report(result: Dict) -> str:
+    latency = ', '.join(f"{name}={value}" for name, value in result['latency_ms'].items())
+    return '\n'.join([
+        f"Engine:      {result['engine']}",
+        f"Candidates:  {result['candidates']} ({result['working']} working, "
+        f"{result['expected_working']} expected)",
+        f"Elapsed:     {result['elapsed']} s",
+        f"Throughput:  {result['throughput']} candidates/s",
+        f"Latency ms:  {latency}",
+        f"CPU:         {result['cpu_seconds']} s",
+        f"Peak RSS:    {result['peak_rss_mb']} MB",
+    ])
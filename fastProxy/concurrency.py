@@ -0,0 +1,186 @@
+import errno
+import math
+import statistics
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from .logger import logger
+
+# errno values that mean this host ran out of sockets, ports or buffers
+RESOURCE_ERRNOS = {
+    errno.EMFILE, errno.ENFILE, errno.ENOBUFS, errno.ENOMEM, errno.EADDRNOTAVAIL
+}
+
+
+# Proxy replies meaning the judge behind it refused or shed the request
+JUDGE_OVERLOAD_STATUSES = {502, 503}
+
+
+def _judge_overloaded(exc: BaseException) -> bool:
+    """Whether a proxy error reports a failed CONNECT to the judge (502/503)"""
+    message = str(exc)
+    return any(f"Tunnel connection failed: {status}" in message for status in JUDGE_OVERLOAD_STATUSES)
+
+
+def classify_error(error: Optional[BaseException]) -> Optional[str]:
+    """Classify a probe error as 'resource', 'refused', 'dead', 'timeout' or 'other'
+
+    requests and urllib3 wrap socket errors several levels deep, so the
+    exception chain (causes, contexts, ``reason`` and exception args) is
+    walked until an OSError or timeout is found. 'refused' means the judge
+    refused the connection, directly or through a proxy's 502/503 tunnel
+    reply; a refused connection to the proxy itself only means the
+    candidate is 'dead'.
+    """
+    if error is None:
+        return None
+    seen = set()
+    stack = [(error, False)]
+    while stack:
+        exc, via_proxy = stack.pop()
+        if exc is None or id(exc) in seen:
+            continue
+        seen.add(id(exc))
+        if isinstance(exc, OSError) and exc.errno in RESOURCE_ERRNOS:
+            return 'resource'
+        if exc.__class__.__name__ == 'ProxyError':
+            if _judge_overloaded(exc):
+                return 'refused'
+            via_proxy = True
+        if isinstance(exc, ConnectionRefusedError) or \
+                (isinstance(exc, OSError) and exc.errno == errno.ECONNREFUSED):
+            return 'dead' if via_proxy else 'refused'
+        if isinstance(exc, TimeoutError) or 'Timeout' in exc.__class__.__name__:
+            return 'timeout'
+        children = [exc.__cause__, exc.__context__, getattr(exc, 'reason', None)]
+        children += [arg for arg in getattr(exc, 'args', ()) if isinstance(arg, BaseException)]
+        stack.extend((child, via_proxy) for child in children)
+    return 'other'
+
+
+class AdaptiveConcurrencyController:
+    """AIMD/gradient controller for the number of in-flight probes
+
+    During slow start every completed probe raises the limit by one, which
+    doubles it every probe round trip. Probe completions are also collected
+    in windows; at the end of a window the limit grows additively, as long
+    as throughput does not clearly fall and working proxies answer
+    about as fast as they did before. Latency is only compared per proxy,
+    against the best latency that same proxy showed earlier, since proxies
+    differ far more from each other than congestion changes them. The
+    limit shrinks when that latency inflates beyond ``tolerance`` times,
+    when most probes in a window were refused by the judge (directly or
+    as 502/503 replies of the proxies) and immediately, multiplicatively,
+    on local resource errors such as EMFILE. Dead candidates, including
+    proxies refusing connections, are ordinary results.
+
+    Keep one controller across runs so revalidated proxies supply latency
+    baselines.
+    """
+
+    # Proxies whose best latency is remembered
+    MAX_BASELINES = 10000
+
+    def __init__(self, initial: int = 8, min_limit: int = 1, max_limit: int = 256,
+                 window: int = 10, tolerance: float = 2.0, backoff: float = 0.5,
+                 refused_storm: float = 0.5, noise: float = 0.2):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.window = window
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.refused_storm = refused_storm
+        # Share by which window throughput may drop before it counts as falling
+        self.noise = noise
+        # Doubling phase, ended by the first sign of congestion
+        self.slow_start = True
+        self._limit = float(max(min_limit, min(initial, max_limit)))
+        self._lock = threading.Lock()
+        self._baselines = OrderedDict()
+        self._last_throughput = None
+        self._reset_window()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def _reset_window(self):
+        self._window_start = time.monotonic()
+        # Fixed when the window opens, as slow start raises the limit meanwhile
+        self._window_size = max(self.window, self.limit)
+        self._completed = 0
+        self._refused = 0
+        self._ratios = []
+
+    def _set_limit(self, value: float, reason: str):
+        old = self.limit
+        self._limit = float(max(self.min_limit, min(value, self.max_limit)))
+        if self.limit != old:
+            logger.debug(f"Concurrency limit {old} -> {self.limit} ({reason})")
+
+    def on_result(self, latency: Optional[float] = None, error: Optional[BaseException] = None,
+                  status: Optional[int] = None, proxy: Optional[str] = None) -> None:
+        """Feed back one finished probe
+
+        Args:
+            latency: Latency in milliseconds of a working proxy, None for failures
+            error: Exception raised by the probe, if any
+            status: HTTP status the proxy replied with, if any
+            proxy: Key of the probed proxy, used for its latency baseline
+        """
+        kind = classify_error(error)
+        with self._lock:
+            if kind == 'resource':
+                self._set_limit(self._limit * self.backoff, 'local resource error')
+                self.slow_start = False
+                self._last_throughput = None
+                self._reset_window()
+                return
+            self._completed += 1
+            congested = kind == 'refused' or status in JUDGE_OVERLOAD_STATUSES
+            if congested:
+                self._refused += 1
+            if latency is not None and proxy is not None:
+                ratio = self._track_latency(proxy, latency)
+                congested = congested or (ratio is not None and ratio < 1.0 / self.tolerance)
+            if self.slow_start and not congested:
+                # One more probe per completion doubles the limit every probe round trip
+                self._set_limit(self._limit + 1, 'slow start')
+            if self._completed >= self._window_size:
+                self._adjust()
+
+    def _track_latency(self, proxy, latency) -> Optional[float]:
+        """Remember a proxy's latency; returns its baseline/latency ratio, None for new proxies"""
+        ratio = None
+        baseline = self._baselines.pop(proxy, None)
+        if baseline is not None and latency > 0:
+            ratio = baseline / latency
+            self._ratios.append(ratio)
+            # Let the baseline follow slow drifts of the network
+            latency = min(latency, baseline + (latency - baseline) * 0.05)
+        self._baselines[proxy] = latency
+        if len(self._baselines) > self.MAX_BASELINES:
+            self._baselines.popitem(last=False)
+        return ratio
+
+    def _adjust(self):
+        elapsed = max(time.monotonic() - self._window_start, 1e-6)
+        throughput = self._completed / elapsed
+
+        rising = self._last_throughput is None or throughput >= self._last_throughput * (1 - self.noise)
+        gradient = statistics.median(self._ratios) if self._ratios else 1.0
+        if self._refused / self._completed >= self.refused_storm:
+            self.slow_start = False
+            self._set_limit(self._limit * self.backoff, 'connection refused storm')
+        elif gradient < 1.0 / self.tolerance:
+            self.slow_start = False
+            self._set_limit(self._limit * max(gradient * self.tolerance, self.backoff), 'latency inflation')
+        elif not rising:
+            self.slow_start = False
+            self._set_limit(self._limit - 1, 'throughput falling')
+        elif not self.slow_start:
+            self._set_limit(self._limit + max(1.0, math.sqrt(self._limit)), 'throughput rising')
+
+        self._last_throughput = throughput
+        self._reset_window()
@@ -0,0 +1,344 @@
+import itertools
+import json
+import socket
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import List, Dict, Optional
+from .logger import logger
+from .pool import proxy_id
+
+
+class WorkQueueBackend(ABC):
+    """Abstract base class for shared validation work queues
+
+    A backend holds the candidate proxies of a validation cycle and the
+    results reported back by workers. Candidates are de-duplicated per
+    cycle, so a proxy is handed out to at most one worker per cycle.
+    Pulled items stay claimed until they are acknowledged; items of a
+    worker that crashed are handed out again once their visibility
+    timeout has passed.
+    """
+
+    @abstractmethod
+    def push(self, cycle: str, proxies: List[Dict]) -> int:
+        """Enqueue candidates for a cycle
+
+        Returns:
+            int: Number of candidates actually enqueued (duplicates are dropped)
+        """
+        pass
+
+    @abstractmethod
+    def pull(self, batch_size: int) -> List[Dict]:
+        """Claim up to batch_size work items, each with a 'cycle', 'data' and 'receipt' key"""
+        pass
+
+    @abstractmethod
+    def ack(self, items: List[Dict]) -> None:
+        """Release claimed items once their results are reported"""
+        pass
+
+    @abstractmethod
+    def report(self, cycle: str, results: List[Dict]) -> None:
+        """Store results reported by a worker for a cycle"""
+        pass
+
+    @abstractmethod
+    def results(self, cycle: str) -> List[Dict]:
+        """Return all results reported for a cycle"""
+        pass
+
+
+class LocalWorkQueue(WorkQueueBackend):
+    """In-process work queue, used for tests and single-host runs
+
+    Args:
+        visibility_timeout: Seconds a pulled item stays claimed before it is handed out again
+    """
+
+    def __init__(self, visibility_timeout: float = 300.0):
+        self.visibility_timeout = visibility_timeout
+        self._lock = threading.Lock()
+        self._items = deque()
+        self._claimed = {}
+        self._receipts = itertools.count(1)
+        self._seen = {}
+        self._results = {}
+
+    def push(self, cycle: str, proxies: List[Dict]) -> int:
+        enqueued = 0
+        with self._lock:
+            seen = self._seen.setdefault(cycle, set())
+            for proxy_data in proxies:
+                key = proxy_id(proxy_data)
+                if key in seen:
+                    continue
+                seen.add(key)
+                self._items.append({'cycle': cycle, 'data': proxy_data})
+                enqueued += 1
+        return enqueued
+
+    def pull(self, batch_size: int) -> List[Dict]:
+        batch = []
+        now = time.monotonic()
+        with self._lock:
+            expired = [receipt for receipt, (deadline, _) in self._claimed.items() if deadline <= now]
+            for receipt in reversed(expired):
+                self._items.appendleft(self._claimed.pop(receipt)[1])
+            while self._items and len(batch) < batch_size:
+                item = self._items.popleft()
+                receipt = next(self._receipts)
+                self._claimed[receipt] = (now + self.visibility_timeout, item)
+                batch.append(dict(item, receipt=receipt))
+        return batch
+
+    def ack(self, items: List[Dict]) -> None:
+        with self._lock:
+            for item in items:
+                self._claimed.pop(item['receipt'], None)
+
+    def report(self, cycle: str, results: List[Dict]) -> None:
+        with self._lock:
+            self._results.setdefault(cycle, []).extend(results)
+
+    def results(self, cycle: str) -> List[Dict]:
+        with self._lock:
+            return list(self._results.get(cycle, []))
+
+
+# Enqueue every candidate whose id is new to the cycle's seen set, in one round trip.
+# KEYS: seen set, queue; ARGV: ttl, then id and payload of each candidate
+_PUSH_SCRIPT = """
+local enqueued = 0
+for i = 2, #ARGV, 2 do
+    if redis.call('SADD', KEYS[1], ARGV[i]) == 1 then
+        redis.call('RPUSH', KEYS[2], ARGV[i + 1])
+        enqueued = enqueued + 1
+    end
+end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return enqueued
+"""
+
+# Requeue claims past their deadline, then claim up to a batch of items.
+# KEYS: queue, claimed sorted set; ARGV: now, deadline of new claims, batch size
+_PULL_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+for _, raw in ipairs(expired) do
+    redis.call('ZREM', KEYS[2], raw)
+    redis.call('LPUSH', KEYS[1], raw)
+end
+local batch = {}
+for i = 1, tonumber(ARGV[3]) do
+    local raw = redis.call('LPOP', KEYS[1])
+    if not raw then
+        break
+    end
+    redis.call('ZADD', KEYS[2], ARGV[2], raw)
+    batch[i] = raw
+end
+return batch
+"""
+
+
+class RedisWorkQueue(WorkQueueBackend):
+    """Work queue shared between nodes through a Redis server
+
+    Requires the optional ``redis`` package. Pushing and pulling each take
+    one round trip through a Lua script, so de-duplication and claiming
+    are atomic across nodes. Claimed items live in a sorted set scored by
+    their deadline until a worker acknowledges them.
+
+    Args:
+        url: Redis server URL
+        prefix: Prefix of all keys
+        client: Ready Redis client, overrides url
+        visibility_timeout: Seconds a pulled item stays claimed before it is handed out again
+        cycle_ttl: Seconds the seen set and results of a cycle are kept
+    """
+
+    def __init__(self, url: str = 'redis://localhost:6379/0', prefix: str = 'fastproxy', client=None,
+                 visibility_timeout: float = 300.0, cycle_ttl: int = 86400):
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise ImportError("RedisWorkQueue requires the 'redis' package: pip install redis")
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+        self.visibility_timeout = visibility_timeout
+        self.cycle_ttl = cycle_ttl
+
+    def _key(self, *parts) -> str:
+        return ':'.join((self.prefix,) + parts)
+
+    def push(self, cycle: str, proxies: List[Dict]) -> int:
+        if not proxies:
+            return 0
+        args = [self.cycle_ttl]
+        for proxy_data in proxies:
+            args += [proxy_id(proxy_data), json.dumps({'cycle': cycle, 'data': proxy_data})]
+        return int(self.client.eval(_PUSH_SCRIPT, 2, self._key('seen', cycle), self._key('queue'), *args))
+
+    def pull(self, batch_size: int) -> List[Dict]:
+        # Wall clock time, as claims are compared across nodes
+        now = time.time()
+        raws = self.client.eval(_PULL_SCRIPT, 2, self._key('queue'), self._key('claimed'),
+                                now, now + self.visibility_timeout, batch_size)
+        return [dict(json.loads(raw), receipt=raw) for raw in raws or []]
+
+    def ack(self, items: List[Dict]) -> None:
+        if items:
+            self.client.zrem(self._key('claimed'), *[item['receipt'] for item in items])
+
+    def report(self, cycle: str, results: List[Dict]) -> None:
+        if results:
+            key = self._key('results', cycle)
+            pipeline = self.client.pipeline()
+            pipeline.rpush(key, *[json.dumps(r) for r in results])
+            pipeline.expire(key, self.cycle_ttl)
+            pipeline.execute()
+
+    def results(self, cycle: str) -> List[Dict]:
+        return [json.loads(raw) for raw in self.client.lrange(self._key('results', cycle), 0, -1)]
+
+
+class ResultStore:
+    """Merges results reported by workers into per-proxy and per-region views"""
+
+    def __init__(self, results: Optional[List[Dict]] = None):
+        self.results = list(results or [])
+
+    def by_proxy(self) -> Dict[str, Dict[str, bool]]:
+        """Map each proxy to its reachability per region"""
+        merged = {}
+        for result in self.results:
+            regions = merged.setdefault(result['proxy'], {})
+            regions[result['region']] = regions.get(result['region'], False) or result['alive']
+        return merged
+
+    def reachability(self) -> Dict[str, Dict[str, int]]:
+        """Count probed and alive proxies per region"""
+        summary = {}
+        for result in self.results:
+            counts = summary.setdefault(result['region'], {'probed': 0, 'alive': 0})
+            counts['probed'] += 1
+            if result['alive']:
+                counts['alive'] += 1
+        return summary
+
+    def working_proxies(self, region: Optional[str] = None) -> List[Dict]:
+        """Return proxy info of proxies alive in any (or the given) region"""
+        working = {}
+        for result in self.results:
+            if result['alive'] and (region is None or result['region'] == region):
+                working.setdefault(result['proxy'], result['info'])
+        return list(working.values())
+
+
+class Coordinator:
+    """Pushes source output into a shared queue and merges worker results"""
+
+    def __init__(self, backend: WorkQueueBackend, manager=None):
+        self.backend = backend
+        self.manager = manager
+
+    def start_cycle(self, proxies: Optional[List[Dict]] = None, max_proxies: int = 0,
+                    cycle: Optional[str] = None) -> str:
+        """Enqueue a new validation cycle
+
+        Args:
+            proxies: Candidates to enqueue, fetched from the manager when omitted
+            max_proxies: Limit passed to ProxySourceManager.fetch_all
+            cycle: Cycle id, defaults to the current timestamp
+
+        Returns:
+            str: The cycle id
+        """
+        cycle = cycle or str(int(time.time() * 1000))
+        if proxies is None:
+            if self.manager is None:
+                from .proxy_sources.manager import ProxySourceManager
+                self.manager = ProxySourceManager()
+            proxies = self.manager.fetch_all(max_proxies=max_proxies)
+        enqueued = self.backend.push(cycle, proxies or [])
+        logger.info(f"Cycle {cycle}: enqueued {enqueued} proxies for validation")
+        return cycle
+
+    def collect(self, cycle: str) -> ResultStore:
+        """Merge all results reported for a cycle"""
+        return ResultStore(self.backend.results(cycle))
+
+
+class Worker:
+    """Pulls batches from a shared queue, validates them and reports results
+
+    Each batch is validated by a ProxyValidator, so its probes run
+    concurrently with the given thread count and timeout. Items are
+    acknowledged only after their results are reported; the batch of a
+    worker that dies midway is handed out again by the queue.
+
+    Args:
+        backend: Shared work queue
+        region: Region tag of the results
+        node: Node tag of the results, defaults to the host name
+        batch_size: Items pulled per batch
+        thread_count (int or str): Probes in flight, or 'auto' for adaptive concurrency
+        request_timeout (float): Timeout in seconds of a single probe
+    """
+
+    def __init__(self, backend: WorkQueueBackend, region: str, node: Optional[str] = None,
+                 batch_size: int = 10, thread_count=10, request_timeout=15):
+        from .fastProxy import ProxyValidator
+
+        self.backend = backend
+        self.region = region
+        self.node = node or socket.gethostname()
+        self.batch_size = batch_size
+        # The queue already de-duplicates candidates per cycle
+        self.validator = ProxyValidator(thread_count=thread_count, request_timeout=request_timeout,
+                                        write_csv=False, dedup=False)
+
+    def _validate(self, proxies: List[Dict]) -> List[Dict]:
+        working = {proxy_id(info): info for info in self.validator.run(proxies=proxies)}
+        checked_at = time.time()
+        return [{
+            'proxy': proxy_id(proxy_data),
+            'alive': proxy_id(proxy_data) in working,
+            'info': working.get(proxy_id(proxy_data)),
+            'node': self.node,
+            'region': self.region,
+            'checked_at': checked_at
+        } for proxy_data in proxies]
+
+    def run_once(self) -> int:
+        """Validate one batch
+
+        Returns:
+            int: Number of proxies validated
+        """
+        batch = self.backend.pull(self.batch_size)
+        cycles = {}
+        for item in batch:
+            cycles.setdefault(item['cycle'], []).append(item)
+        for cycle, items in cycles.items():
+            try:
+                results = self._validate([item['data'] for item in items])
+            except Exception as e:
+                # Left claimed, so the queue hands these items out again
+                logger.error(f"Worker {self.node} failed validating a batch of cycle {cycle}: {str(e)}")
+                continue
+            self.backend.report(cycle, results)
+            self.backend.ack(items)
+        return len(batch)
+
+    def run(self, stop_event: Optional[threading.Event] = None, idle_sleep: float = 1.0) -> None:
+        """Keep validating batches until stop_event is set"""
+        stop_event = stop_event or threading.Event()
+        logger.info(f"Worker {self.node} ({self.region}) started")
+        while not stop_event.is_set():
+            if not self.run_once():
+                stop_event.wait(idle_sleep)
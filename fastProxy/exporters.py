@@ -0,0 +1,215 @@
+import csv
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import List, Dict, Iterable, Optional
+from .index import proxy_protocols
+from .logger import logger
+
+FIELDS = ['ip', 'port', 'protocol', 'latency', 'code', 'country', 'anonymity', 'source', 'checked_at']
+
+
+class Exporter(ABC):
+    """Abstract base class for streaming proxy exporters
+
+    Rows are appended to a temporary file while validation runs and the
+    file is atomically renamed to its final path on close(), so readers
+    never see a partially written export.
+    """
+
+    extension = ''
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.count = 0
+        self._opened = False
+        self._stamp_second = None
+        self._stamp = ''
+
+    def _timestamp(self) -> str:
+        """Return the current time, formatted at most once per second"""
+        now = int(time.time())
+        if now != self._stamp_second:
+            self._stamp_second = now
+            self._stamp = datetime.fromtimestamp(now).strftime('%Y-%m-%d %H:%M:%S')
+        return self._stamp
+
+    def _row(self, proxy: Dict) -> Dict:
+        """Flatten a working proxy into an export row"""
+        ip, _, port = proxy.get('proxy', '').rpartition(':')
+        checked_at = proxy.get('checked_at')
+        return {
+            'ip': proxy.get('ip', ip),
+            'port': int(proxy.get('port', port) or 0),
+            'protocol': ','.join(proxy_protocols(proxy)) or proxy.get('protocol', ''),
+            'latency': proxy.get('latency'),
+            'code': proxy.get('code', ''),
+            'country': proxy.get('country', ''),
+            'anonymity': proxy.get('anonymity', ''),
+            'source': proxy.get('source') or '',
+            'checked_at': (datetime.fromtimestamp(checked_at).strftime('%Y-%m-%d %H:%M:%S')
+                           if checked_at else self._timestamp())
+        }
+
+    def open(self) -> 'Exporter':
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._open()
+        self._opened = True
+        return self
+
+    def write(self, proxy: Dict) -> None:
+        self.write_many([proxy])
+
+    def write_many(self, proxies: Iterable[Dict]) -> None:
+        if not self._opened:
+            self.open()
+        rows = [self._row(proxy) for proxy in proxies]
+        if rows:
+            self._write_rows(rows)
+            self.count += len(rows)
+
+    def close(self) -> str:
+        """Flush, close and atomically move the export to its final path"""
+        if not self._opened:
+            self.open()
+        self._close()
+        self._opened = False
+        os.replace(self.tmp_path, self.path)
+        logger.info(f"Successfully wrote {self.count} proxies to {self.path}")
+        return self.path
+
+    def abort(self) -> None:
+        """Discard a partially written export"""
+        if self._opened:
+            self._close()
+            self._opened = False
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    @abstractmethod
+    def _open(self) -> None:
+        pass
+
+    @abstractmethod
+    def _write_rows(self, rows: List[Dict]) -> None:
+        pass
+
+    @abstractmethod
+    def _close(self) -> None:
+        pass
+
+
+class CSVExporter(Exporter):
+    """Buffered CSV exporter"""
+
+    extension = 'csv'
+
+    def _open(self):
+        self._file = open(self.tmp_path, 'w', newline='', buffering=1024 * 1024)
+        self._writer = csv.DictWriter(self._file, fieldnames=FIELDS)
+        self._writer.writeheader()
+
+    def _write_rows(self, rows):
+        self._writer.writerows(rows)
+
+    def _close(self):
+        self._file.close()
+
+
+class NDJSONExporter(Exporter):
+    """Buffered newline-delimited JSON exporter"""
+
+    extension = 'ndjson'
+
+    def _open(self):
+        self._file = open(self.tmp_path, 'w', buffering=1024 * 1024)
+
+    def _write_rows(self, rows):
+        self._file.write(''.join(json.dumps(row) + '\n' for row in rows))
+
+    def _close(self):
+        self._file.close()
+
+
+class ParquetExporter(Exporter):
+    """Columnar Parquet exporter, written in row groups
+
+    Requires the optional ``pyarrow`` package.
+    """
+
+    extension = 'parquet'
+
+    def __init__(self, path: str, row_group_size: int = 10000):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("ParquetExporter requires the 'pyarrow' package: pip install pyarrow")
+        super().__init__(path)
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.row_group_size = row_group_size
+        self._schema = pyarrow.schema([
+            ('ip', pyarrow.string()),
+            ('port', pyarrow.int32()),
+            ('protocol', pyarrow.string()),
+            ('latency', pyarrow.float64()),
+            ('code', pyarrow.string()),
+            ('country', pyarrow.string()),
+            ('anonymity', pyarrow.string()),
+            ('source', pyarrow.string()),
+            ('checked_at', pyarrow.string()),
+        ])
+
+    def _open(self):
+        self._writer = self._pq.ParquetWriter(self.tmp_path, self._schema)
+        self._buffer = []
+
+    def _flush(self):
+        if self._buffer:
+            self._writer.write_table(self._pa.Table.from_pylist(self._buffer, schema=self._schema))
+            self._buffer = []
+
+    def _write_rows(self, rows):
+        self._buffer.extend(rows)
+        if len(self._buffer) >= self.row_group_size:
+            self._flush()
+
+    def _close(self):
+        self._flush()
+        self._writer.close()
+
+
+EXPORTERS = {
+    'csv': CSVExporter,
+    'ndjson': NDJSONExporter,
+    'parquet': ParquetExporter
+}
+
+
+def get_exporter(fmt: str, path: Optional[str] = None) -> Exporter:
+    """Create an exporter for a format name ('csv', 'ndjson' or 'parquet')
+
+    Args:
+        fmt: Export format
+        path: Output file, defaults to proxy_list/export.<ext>; working_proxies.csv
+            stays the file of generate_csv
+    """
+    try:
+        exporter_class = EXPORTERS[fmt.lower()]
+    except KeyError:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    path = path or os.path.join('proxy_list', f"export.{exporter_class.extension}")
+    return exporter_class(path)
@@ -1,12 +1,23 @@
 import fire
-import requests
 import threading
+import time
+from collections import deque
 from queue import Queue
 import csv
 import os
 from .logger import logger
 from datetime import datetime
 from .proxy_sources.manager import ProxySourceManager
+from .proxy_sources.freshness import order_by_liveness
+from .pool import proxy_id
+from .prefilter import default_prefilter
+from .index import proxy_protocols
+from .concurrency import AdaptiveConcurrencyController
+from .net import ProbeContext, probe_context
+from .profiling import RunReport, profiled, profiling_requested, stage
+from contextlib import nullcontext
+from . import net
+from . import tls
 
 # Constants
 HTTP_URL = 'http://httpbin.org/ip'
@@ -49,142 +60,606 @@ def alter_globals(c=None, t=None, g=None, a=None):
 class alive_ip(threading.Thread):
     """Thread class for validating proxies"""
 
-    def __init__(self, proxy_data):
+    def __init__(self, proxy_data, result_queue=None, completed=None, timeout=None,
+                 http_url=None, https_url=None, https_check='request', timer=None):
         super().__init__(daemon=True)
         self.proxy_data = proxy_data
+        self.timeout = timeout if timeout is not None else REQUEST_TIMEOUT
+        self.http_url = http_url or HTTP_URL
+        self.https_url = https_url or HTTPS_URL
+        self.https_check = https_check
+        # Results go to the shared alive_queue unless the caller owns a channel
+        self.result_queue = result_queue if result_queue is not None else alive_queue
+        # Optional semaphore released when the probe finishes, used by the scheduler
+        self.completed = completed
+        self.result = None
+        self.latency = None
+        self.error = None
+        # Last HTTP status a proxy replied with, fed back to adaptive concurrency
+        self.status = None
+        self.done = False
+        # Sockets of this probe, closed by abort() when the probe is cancelled
+        self.context = ProbeContext(timer)
+
+    @property
+    def cancelled(self):
+        return self.context.cancelled.is_set()
+
+    def abort(self):
+        """Cancel the probe and close its sockets so the thread finishes promptly"""
+        return self.context.abort()
+
+    def _publish(self, proxy_info):
+        """Report a working proxy unless the probe was cancelled meanwhile"""
+        def put():
+            self.result = proxy_info
+            self.result_queue.put(proxy_info)
+        return self.context.publish(put)
 
     def check_proxy(self):
-        """Check if a proxy is working"""
+        """Check if a proxy is working
+
+        Proxies flagged as HTTPS capable get their HTTPS and HTTP probes
+        run concurrently, so both capabilities are recorded in one pass
+        and the worst case costs one timeout instead of two.
+        """
         try:
             proxy = self.proxy_data.get('proxy', f"{self.proxy_data['ip']}:{self.proxy_data['port']}")
-            is_https = self.proxy_data.get('is_https', self.proxy_data.get('https', False))
+            is_https = _flag(self.proxy_data.get('is_https', self.proxy_data.get('https', False)))
             country = self.proxy_data.get('country', '')
             anonymity = self.proxy_data.get('anonymity', 'unknown')
             if not anonymity.endswith(' proxy'):
                 anonymity += ' proxy'
 
-            # Test HTTPS proxy first if supported
+            latencies = {}
             if is_https:
-                try:
-                    proxies = {
-                        'https': f'https://{proxy}'
-                    }
-                    response = requests.get(
-                        HTTPS_URL,
-                        proxies=proxies,
-                        timeout=REQUEST_TIMEOUT,
-                        verify=False  # Allow self-signed certificates
-                    )
-                    if response.status_code == 200:
-                        logger.debug(f"Working HTTPS proxy found: {proxy}")
-                        proxy_info = {
-                            'proxy': proxy,
-                            'type': 'https',
-                            'country': country,
-                            'anonymity': anonymity
-                        }
-                        alive_queue.put(proxy_info)
-                        return True
-                except requests.exceptions.RequestException as e:
-                    logger.debug(f"HTTPS proxy failed: {proxy} - {e.__class__.__name__}: {str(e)}")
-
-            # Test HTTP proxy if HTTPS failed or not supported
-            try:
-                proxies = {
-                    'http': f'http://{proxy}',
-                    'https': None  # Don't use HTTPS for HTTP test
-                }
-                response = requests.get(
-                    HTTP_URL,
-                    proxies=proxies,
-                    timeout=REQUEST_TIMEOUT,
-                    verify=False  # Allow self-signed certificates
-                )
-                if response.status_code == 200:
-                    logger.debug(f"Working HTTP proxy found: {proxy}")
-                    proxy_info = {
-                        'proxy': proxy,
-                        'type': 'http',
-                        'country': country,
-                        'anonymity': anonymity
-                    }
-                    alive_queue.put(proxy_info)
-                    return True
-            except requests.exceptions.RequestException as e:
-                logger.debug(f"HTTP proxy failed: {proxy} - {e.__class__.__name__}: {str(e)}")
-
-            return False
+                https_probe = threading.Thread(target=self._probe, args=('https', proxy, latencies), daemon=True)
+                https_probe.start()
+                self._probe('http', proxy, latencies)
+                https_probe.join(self.timeout + 1)
+            else:
+                self._probe('http', proxy, latencies)
+
+            latencies = dict(latencies)
+            protocols = [protocol for protocol in ('https', 'http') if protocol in latencies]
+            if not protocols or self.cancelled:
+                return False
+
+            logger.debug(f"Working {'/'.join(protocols).upper()} proxy found: {proxy}")
+            self.latency = latencies[protocols[0]]
+            proxy_info = {
+                'proxy': proxy,
+                'type': protocols[0],
+                'protocols': protocols,
+                'code': self.proxy_data.get('code', ''),
+                'country': country,
+                'anonymity': anonymity,
+                'latency': self.latency,
+                'source': self.proxy_data.get('source'),
+                'checked_at': time.time()
+            }
+            return self._publish(proxy_info)
 
         except Exception as e:
+            self.error = e
             logger.error(f"Error validating proxy: {str(e)}")
             return False
 
-    def run(self):
-        self.check_proxy()
-
-def fetch_proxies(c=None, t=None, g=None, a=None, proxies=None, max_proxies=None):
-    """Fetch and validate proxies"""
-    # Update global settings if provided
-    alter_globals(c=c, t=t, g=g, a=a)
-
-    logger.info("Starting proxy fetching process...")
-
-    # Get proxies from sources if not provided
-    if proxies is None:
-        manager = ProxySourceManager()
-        proxies = manager.fetch_all(max_proxies=max_proxies if max_proxies else 10)
-
-    # Validate input parameters
-    if not isinstance(max_proxies, (type(None), int)) or (isinstance(max_proxies, int) and max_proxies <= 0):
-        logger.error("Invalid max_proxies parameter")
-        return []
-
-    # Process proxies in small batches
-    batch_size = 1  # Process one at a time for testing
-    working_proxies = []
-    total_timeout = REQUEST_TIMEOUT  # Use global timeout setting
+    def _probe(self, protocol, proxy, latencies):
+        """Run one HTTP or HTTPS probe, storing its latency in latencies when it succeeds"""
+        with probe_context(self.context), stage(self.context.timer, f"probe_{protocol}", thread=True):
+            if self.cancelled:
+                return
+            try:
+                started = time.perf_counter()
+                if protocol == 'https' and self.https_check != 'request':
+                    # CONNECT tunnel with a shared SSL context and resumed TLS sessions
+                    working = tls.probe_https(proxy, self.https_url, self.timeout, mode=self.https_check)
+                else:
+                    if protocol == 'https':
+                        url, proxies = self.https_url, {'https': f'https://{proxy}'}
+                    else:
+                        # Don't use HTTPS for HTTP test
+                        url, proxies = self.http_url, {'http': f'http://{proxy}', 'https': None}
+                    response = net.get(
+                        url,
+                        proxies=proxies,
+                        timeout=self.timeout,
+                        verify=False,  # Allow self-signed certificates
+                        # Shared across probes; also lets abort() close the TLS socket
+                        ssl_context=tls.shared_context() if protocol == 'https' else None
+                    )
+                    self.status = response.status_code
+                    working = response.status_code == 200
+                if working:
+                    latencies[protocol] = round((time.perf_counter() - started) * 1000, 1)
+            except OSError as e:
+                self.error = e
+                logger.debug(f"{protocol.upper()} proxy failed: {proxy} - {e.__class__.__name__}: {str(e)}")
 
+    def run(self):
+        try:
+            self.check_proxy()
+        finally:
+            self.done = True
+            if self.completed is not None:
+                self.completed.release()
+
+def _flag(value):
+    """Interpret source flags such as 'yes'/'no', True/False or 1/0"""
+    if isinstance(value, str):
+        return value.strip().lower() in ('yes', 'true', '1', 'y')
+    return bool(value)
+
+def _is_running(thread):
+    """Whether a probe is a started thread that has not finished yet"""
     try:
-        # Process only up to max_proxies if specified
-        proxy_list = proxies[:max_proxies] if max_proxies else proxies
-        logger.info(f"Successfully parsed {len(proxy_list)} valid proxies")
-
-        for i in range(0, len(proxy_list), batch_size):
-            batch = proxy_list[i:i+batch_size]
-            thread = None
-            logger.info(f"Processing proxy {i+1}/{len(proxy_list)}")
-
+        return isinstance(thread, threading.Thread) and thread.is_alive() \
+            and getattr(thread, 'done', False) is not True
+    except Exception:
+        return False
+
+def _probe_record(proxy_data, proxy_info, outcome):
+    """Build a validation history record for one probed proxy"""
+    proxy_info = proxy_info or {}
+    proxy = proxy_info.get('proxy') or proxy_data.get('proxy') or \
+        f"{proxy_data.get('ip', '')}:{proxy_data.get('port', '')}"
+    ip, _, port = proxy.rpartition(':')
+    return {
+        'ip': ip,
+        'port': port,
+        'protocol': ','.join(proxy_protocols(proxy_info)) or None,
+        'latency': proxy_info.get('latency'),
+        'outcome': outcome,
+        'checked_at': time.time(),
+        'source': proxy_data.get('source'),
+        'code': proxy_data.get('code', ''),
+        'country': proxy_data.get('country', ''),
+        'anonymity': proxy_info.get('anonymity', proxy_data.get('anonymity'))
+    }
+
+class ProxyValidator:
+    """Validates proxies with its own settings and result channel
+
+    Unlike the module-level globals changed by alter_globals, every
+    validator keeps its configuration on the instance and every run()
+    collects results in its own queue, so several validation jobs with
+    different settings can run concurrently in one process.
+
+    Args:
+        thread_count (int or str): Probes in flight, or 'auto' for adaptive concurrency
+        request_timeout (float): Timeout in seconds of a single probe
+        write_csv (bool): Write proxy_list/working_proxies.csv after each run
+        all_proxies (bool): Include all proxies
+        http_url (str): Judge URL for HTTP probes
+        https_url (str): Judge URL for HTTPS probes
+        run_timeout (float): Hard deadline in seconds for a whole run, None for no limit
+        https_check (str): How HTTPS support is checked: 'request' (full GET request),
+            'tls' (CONNECT tunnel and GET with resumed TLS sessions) or 'tunnel'
+            (CONNECT tunnel and TLS handshake only)
+        dedup (bool): Probe every ip:port only once per run
+        prioritize (bool): Probe the candidates most likely to be alive first, judged by
+            their source's yield and the freshness and uptime the source reports
+    """
+
+    # Seconds to wait for aborted probe threads to exit at the end of a run
+    ABORT_GRACE = 1.0
+
+    def __init__(self, thread_count=10, request_timeout=15, write_csv=True, all_proxies=False,
+                 http_url=HTTP_URL, https_url=HTTPS_URL, run_timeout=None, https_check='request',
+                 dedup=True, prioritize=True):
+        if https_check not in tls.HTTPS_CHECKS:
+            raise ValueError(f"https_check must be one of {', '.join(tls.HTTPS_CHECKS)}")
+        self.thread_count = thread_count
+        self.request_timeout = request_timeout
+        self.write_csv = write_csv
+        self.all_proxies = all_proxies
+        self.http_url = http_url
+        self.https_url = https_url
+        self.run_timeout = run_timeout
+        self.https_check = https_check
+        self.dedup = dedup
+        self.prioritize = prioritize
+        self._runs_lock = threading.Lock()
+        self._runs = set()
+        # RunReport of the most recent run
+        self.last_report = None
+        # Adaptive concurrency controller of thread_count='auto'
+        self._controller = None
+
+    def cancel(self):
+        """Cancel all runs of this validator; in-flight probes are aborted"""
+        with self._runs_lock:
+            for cancel_event in self._runs:
+                cancel_event.set()
+
+    @classmethod
+    def from_globals(cls, c=None, t=None, g=None, a=None, https_check=None):
+        """Build a validator from the module globals, overridden by any given values"""
+        return cls(
+            thread_count=c if c is not None else THREAD_COUNT,
+            request_timeout=t if t is not None else REQUEST_TIMEOUT,
+            write_csv=g if g is not None else GENERATE_CSV,
+            all_proxies=a if a is not None else ALL_PROXIES,
+            https_check=https_check or 'request'
+        )
+
+    def _start_probe(self, proxy, result_queue, completed, timeout, timer=None):
+        thread = alive_ip(proxy, result_queue=result_queue, completed=completed,
+                          timeout=timeout, http_url=self.http_url,
+                          https_url=self.https_url, https_check=self.https_check, timer=timer)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    @staticmethod
+    def _abort(thread):
+        """Abort a probe, closing its sockets"""
+        abort = getattr(thread, 'abort', None)
+        if callable(abort):
             try:
-                # Start single thread
-                proxy = batch[0]
-                thread = alive_ip(proxy)
-                thread.daemon = True
-                thread.start()
+                abort()
+            except Exception as e:
+                logger.debug(f"Error aborting probe: {str(e)}")
+
+    def run(self, proxies=None, max_proxies=None, store=None, exporters=None, pool=None,
+            min_score=None, deadline=None, prefilter=None, want=None, profile=None,
+            return_report=False):
+        """Fetch and validate proxies
+
+        Args:
+            proxies (list, optional): Candidates to validate, fetched from all sources when omitted
+            max_proxies (int, optional): Maximum number of candidates to validate
+            store (ProxyHistoryStore, optional): Appends every probe outcome to the history store
+            exporters (list, optional): Exporters that receive working proxies as they are found
+            pool (ProxyPool, optional): Ranks candidates by reliability score, skips probes of
+                proxies that are not due for revalidation and records every outcome
+            min_score (float, optional): Drop candidates and results scoring below this value
+            deadline (float, optional): Hard deadline in seconds for this run, defaults to run_timeout
+            prefilter (Prefilter, optional): Screens candidates before probing and remembers
+                dead proxies in its negative cache; candidates fetched from the sources are
+                screened by default_prefilter() when none is given
+            want (int, optional): Stop as soon as this many working proxies are found and cancel
+                the outstanding probes; candidates are then fetched from all sources, interleaved
+                by predicted yield, and max_proxies only caps how many of them may be probed
+            profile (bool, optional): Profile the run with pyinstrument or cProfile and save the
+                result in the logs directory; defaults to the FASTPROXY_PROFILE environment variable
+            return_report (bool): Return a (working proxies, RunReport) tuple
+
+        Returns:
+            list: Working proxies, at most want of them in target mode. The RunReport of the
+            run is also kept in last_report.
+        """
+        logger.info("Starting proxy fetching process...")
+        tls.disable_insecure_warnings()
+        cancel = threading.Event()
+        with self._runs_lock:
+            self._runs.add(cancel)
+        deadline = deadline if deadline is not None else self.run_timeout
+        run_deadline = time.monotonic() + deadline if deadline is not None else None
+        report = self.last_report = RunReport()
+        working_proxies = []
+        try:
+            with profiled(report) if profiling_requested(profile) else nullcontext():
+                working_proxies = self._run(proxies, max_proxies, store, exporters, pool, min_score, cancel,
+                                            run_deadline, prefilter, want, report)
+        finally:
+            report.finish(working_proxies)
+            with self._runs_lock:
+                self._runs.discard(cancel)
+        return (working_proxies, report) if return_report else working_proxies
+
+    def _run(self, proxies, max_proxies, store, exporters, pool, min_score, cancel, run_deadline,
+             prefilter=None, want=None, report=None):
+        report = report or RunReport()
+        timer = report.timer
+
+        # Get proxies from sources if not provided
+        health = ProxySourceManager.health
+        if proxies is None:
+            manager = ProxySourceManager()
+            health = manager.health
+            with timer.stage('fetch'):
+                if want:
+                    proxies = manager.fetch_all(max_proxies=max_proxies or 0, interleave=True)
+                else:
+                    proxies = manager.fetch_all(max_proxies=max_proxies if max_proxies else 10)
+            if prefilter is None:
+                prefilter = default_prefilter()
+
+        # Validate input parameters
+        if not isinstance(max_proxies, (type(None), int)) or (isinstance(max_proxies, int) and max_proxies <= 0):
+            logger.error("Invalid max_proxies parameter")
+            return []
+        if not isinstance(want, (type(None), int)) or (isinstance(want, int) and want <= 0):
+            logger.error("Invalid want parameter")
+            return []
 
-                # Wait for thread with timeout
-                thread.join(timeout=total_timeout)
+        working_proxies = []
+        records = []
+        exporters = exporters or []
+        total_timeout = self.request_timeout
+        # Results of this run only; probes abandoned by other runs cannot leak in
+        results = Queue()
+        # thread_count='auto' tunes the number of in-flight probes while validating
+        # Kept across runs so revalidated proxies compare against their own latency
+        if self.thread_count == 'auto' and self._controller is None:
+            self._controller = AdaptiveConcurrencyController()
+        controller = self._controller if self.thread_count == 'auto' else None
+        pending = deque()
+        in_flight = deque()
+        aborted = []
+        target_met = threading.Event()
+        validate_started = None
 
-                # Get results from queue
-                while not alive_queue.empty():
-                    working_proxies.append(alive_queue.get_nowait())
+        try:
+            report.count_candidates(proxies)
+            if self.dedup:
+                unique = {}
+                for proxy in proxies:
+                    unique.setdefault(proxy_id(proxy), proxy)
+                report.drop('duplicate', len(proxies) - len(unique))
+                proxies = list(unique.values())
+            if prefilter is not None:
+                with timer.stage('prefilter'):
+                    screened = prefilter.filter(proxies)
+                report.drop('prefilter', len(proxies) - len(screened))
+                proxies = screened
+            if self.prioritize:
+                with timer.stage('prioritize'):
+                    sources = {proxy.get('source') for proxy in proxies} - {None}
+                    proxies = order_by_liveness(proxies, {source: health.get(source).yield_rate
+                                                          for source in sources})
+            if pool is not None:
+                # Stable, so liveness still breaks ties between equal scores
+                with timer.stage('rank'):
+                    ranked = pool.rank(proxies, min_score=min_score)
+                report.drop('min_score', len(proxies) - len(ranked))
+                proxies = ranked
+
+            # Process only up to max_proxies if specified
+            proxy_list = proxies[:max_proxies] if max_proxies else proxies
+            report.drop('max_proxies', len(proxies) - len(proxy_list))
+            logger.info(f"Successfully parsed {len(proxy_list)} valid proxies")
+
+            def publish(found):
+                """Add working proxies to the result and stream them to the exporters"""
+                working_proxies.extend(found)
+                if found and exporters:
+                    with timer.stage('export'):
+                        for exporter in exporters:
+                            exporter.write_many(found)
+                if want and len(working_proxies) >= want and not cancel.is_set():
+                    logger.info(f"Found {want} working proxies, cancelling outstanding probes")
+                    target_met.set()
+                    report.stop_reason = 'target'
+                    cancel.set()
+
+            if pool is not None:
+                # Stable proxies are served from the pool until they are due again
+                not_due = [p for p in proxy_list if not pool.is_due(proxy_id(p))]
+                served = []
+                for proxy in not_due:
+                    score = pool.get_score(proxy_id(proxy))
+                    info = pool.get_info(proxy_id(proxy))
+                    if score.last_alive and info:
+                        served.append(info)
+                proxy_list = [p for p in proxy_list if pool.is_due(proxy_id(p))]
+                report.drop('not_due', len(not_due))
+                logger.info(f"Skipped {len(not_due)} proxies not due for revalidation")
+                publish(served)
+                if target_met.is_set():
+                    proxy_list = []
+
+            total = len(proxy_list)
+            pending.extend(enumerate(proxy_list, 1))
+            completed = threading.Semaphore(0)
+
+            def finish(index, proxy, thread, outcome):
+                """Collect results and feed back the outcome of one probe"""
+                found = []
+                while not results.empty():
+                    found.append(results.get_nowait())
+                publish(found)
+
+                info = getattr(thread, 'result', None)
+                info = info if isinstance(info, dict) else None
+                if outcome == 'cancelled':
+                    # Aborted probes say nothing about the proxy, so nothing is recorded
+                    logger.debug(f"Proxy {index} cancelled")
+                    report.record_probe(outcome)
+                    return
+                if outcome == 'timeout':
+                    logger.warning(f"Proxy {index} timed out")
+                elif outcome != 'error':
+                    logger.info(f"Proxy {index} completed")
+                    outcome = 'alive' if info else 'dead'
+                tried = ['http', 'https'] if _flag(proxy.get('is_https', proxy.get('https'))) else ['http']
+                report.record_probe(outcome, tried, info.get('protocols', []) if info else [])
+                if controller is not None:
+                    error = getattr(thread, 'error', None)
+                    status = getattr(thread, 'status', None)
+                    controller.on_result(info.get('latency') if info else None,
+                                         error if isinstance(error, BaseException) else None,
+                                         status=status if isinstance(status, int) else None,
+                                         proxy=f"{proxy_id(proxy)}/{info.get('type')}" if info else None)
+                if prefilter is not None and not info:
+                    prefilter.record_dead(proxy)
+                health.record_probe(proxy.get('source'), bool(info))
+                if store is not None:
+                    records.append(_probe_record(proxy, info, outcome))
+                if pool is not None:
+                    pool.record(proxy_id(proxy), bool(info), info.get('latency') if info else None, info=info)
+
+            validate_started = timer.now()
+            while (pending or in_flight) and not cancel.is_set():
+                if run_deadline is not None and time.monotonic() >= run_deadline:
+                    logger.warning(f"Run deadline reached, cancelling {len(in_flight)} in-flight probes")
+                    report.stop_reason = 'deadline'
+                    cancel.set()
+                    break
+                limit = controller.limit if controller is not None else max(1, int(self.thread_count))
+
+                # Start probes until the concurrency limit is reached
+                while pending and len(in_flight) < limit:
+                    index, proxy = pending.popleft()
+                    logger.info(f"Processing proxy {index}/{total}")
+                    now = time.monotonic()
+                    probe_deadline = now + total_timeout
+                    if run_deadline is not None:
+                        probe_deadline = min(probe_deadline, run_deadline)
+                    try:
+                        thread = self._start_probe(proxy, results, completed, max(probe_deadline - now, 0.001),
+                                                   timer)
+                        in_flight.append((index, proxy, thread, probe_deadline))
+                    except Exception as e:
+                        logger.error(f"Error processing proxy {index}: {str(e)}")
+
+                if not in_flight:
+                    continue
+
+                if all(_is_running(entry[2]) for entry in in_flight):
+                    # Sleep until any probe finishes, the oldest one expires or the run is cancelled
+                    wake_at = in_flight[0][3]
+                    if run_deadline is not None:
+                        wake_at = min(wake_at, run_deadline)
+                    with timer.stage('queue_wait'):
+                        completed.acquire(timeout=max(0.0, min(wake_at - time.monotonic(), 0.5)))
+                    now = time.monotonic()
+                    for entry in list(in_flight):
+                        index, proxy, thread, deadline = entry
+                        if not _is_running(thread):
+                            in_flight.remove(entry)
+                            finish(index, proxy, thread, 'done')
+                        elif now >= deadline:
+                            in_flight.remove(entry)
+                            self._abort(thread)
+                            aborted.append(thread)
+                            finish(index, proxy, thread, 'timeout')
+                    continue
+
+                # Probes that are not running threads are waited on directly
+                for entry in list(in_flight):
+                    index, proxy, thread, deadline = entry
+                    if _is_running(thread):
+                        continue
+                    in_flight.remove(entry)
+                    try:
+                        with timer.stage('queue_wait'):
+                            thread.join(timeout=max(0.0, deadline - time.monotonic()))
+                        still_running = thread.is_alive() and getattr(thread, 'done', False) is not True
+                        if still_running:
+                            self._abort(thread)
+                        finish(index, proxy, thread, 'timeout' if still_running else 'done')
+                    except Exception as e:
+                        logger.error(f"Error processing proxy {index}: {str(e)}")
+                        finish(index, proxy, thread, 'error')
+
+            if controller is not None:
+                logger.info(f"Adaptive concurrency settled at {controller.limit} in-flight probes")
 
-                if thread.is_alive():
-                    logger.warning(f"Proxy {i+1} timed out")
-                else:
-                    logger.info(f"Proxy {i+1} completed")
+        except Exception as e:
+            logger.error(f"Error in fetch_proxies: {str(e)}")
+
+        finally:
+            # Abort whatever is still running and make sure sockets and threads are released
+            for index, proxy, thread, _ in in_flight:
+                self._abort(thread)
+                aborted.append(thread)
+                finish(index, proxy, thread, 'cancelled')
+            in_flight.clear()
+            if cancel.is_set() and report.stop_reason is None:
+                report.stop_reason = 'cancelled'
+            report.drop('not_probed', len(pending))
+            if cancel.is_set() and pending and not target_met.is_set():
+                logger.warning(f"Run cancelled with {len(pending)} proxies not probed")
+            grace_end = time.monotonic() + self.ABORT_GRACE
+            for thread in aborted:
+                if _is_running(thread):
+                    thread.join(timeout=max(0.0, grace_end - time.monotonic()))
+            leaked = sum(1 for thread in aborted if _is_running(thread))
+            if leaked:
+                logger.warning(f"{leaked} aborted probes are still running")
+            if validate_started is not None:
+                timer.since('validate', validate_started)
+
+        with timer.stage('export'):
+            for exporter in exporters:
+                try:
+                    report.add_export(exporter.close())
+                except Exception as e:
+                    logger.error(f"Error closing exporter {exporter.path}: {str(e)}")
 
+        if store is not None and records:
+            try:
+                with timer.stage('history'):
+                    store.record_many(records)
             except Exception as e:
-                logger.error(f"Error processing proxy {i+1}: {str(e)}")
-                continue
+                logger.error(f"Error writing validation history: {str(e)}")
 
-    except Exception as e:
-        logger.error(f"Error in fetch_proxies: {str(e)}")
-
-    # Generate CSV if enabled
-    if GENERATE_CSV and working_proxies:
-        generate_csv(working_proxies)
+        if pool is not None:
+            working_proxies = pool.rank(working_proxies, min_score=min_score)
+            if store is not None:
+                try:
+                    store.save_scores(pool)
+                except Exception as e:
+                    logger.error(f"Error saving reliability scores: {str(e)}")
+
+        # Probes finishing together may overshoot the target
+        if want:
+            working_proxies = working_proxies[:want]
+
+        # Generate CSV if enabled, unless an exporter already wrote that file
+        csv_path = os.path.abspath(os.path.join('proxy_list', 'working_proxies.csv'))
+        exported = {os.path.abspath(exporter.path) for exporter in exporters}
+        if self.write_csv and working_proxies and csv_path not in exported:
+            with timer.stage('csv'):
+                report.add_export(generate_csv(working_proxies))
+
+        return working_proxies
+
+def fetch_proxies(c=None, t=None, g=None, a=None, proxies=None, max_proxies=None, store=None,
+                  exporters=None, pool=None, min_score=None, prefilter=None, want=None, profile=None,
+                  return_report=False, https_check=None, health_file=None):
+    """Fetch and validate proxies
+
+    Settings given here also update the module globals, as alter_globals
+    does. Use a ProxyValidator instance to run validations with different
+    settings concurrently.
+
+    Args:
+        store (ProxyHistoryStore, optional): Appends every probe outcome to the history store
+        exporters (list, optional): Exporters that receive working proxies as they are found
+        pool (ProxyPool, optional): Ranks candidates by reliability score, skips probes of
+            proxies that are not due for revalidation and records every outcome
+        min_score (float, optional): Drop candidates and results scoring below this value
+        prefilter (Prefilter, optional): Screens candidates before probing, default_prefilter() for
+            candidates fetched from the sources
+        want (int, optional): Return as soon as this many working proxies are found
+        profile (bool, optional): Save a cProfile/pyinstrument profile of the run in the logs directory
+        return_report (bool, optional): Return a (working proxies, RunReport) tuple
+        https_check (str, optional): How HTTPS support is checked: 'request' (default), 'tls' or
+            'tunnel'; see ProxyValidator. Every mode shares one SSL context across probes
+        health_file (str, optional): JSON file the source health statistics are loaded from
+            before the run and saved to after it, so source weighting carries over between runs
+    """
+    # Update global settings if provided
+    alter_globals(c=c, t=t, g=g, a=a)
 
-    return working_proxies
+    health = ProxySourceManager.health
+    if health_file:
+        health.load(health_file)
+    validator = ProxyValidator.from_globals(c=c, t=t, g=g, a=a, https_check=https_check)
+    try:
+        return validator.run(proxies=proxies, max_proxies=max_proxies, store=store,
+                             exporters=exporters, pool=pool, min_score=min_score, prefilter=prefilter,
+                             want=want, profile=profile, return_report=return_report)
+    finally:
+        if health_file:
+            try:
+                health.save(health_file)
+            except OSError as e:
+                logger.error(f"Error saving source health: {str(e)}")
 
 def generate_csv(working_proxies=None):
     """Generate CSV file with working proxies"""
@@ -203,23 +678,24 @@ def generate_csv(working_proxies=None):
 
     # Write to CSV file
     try:
+        checked_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         with open(csv_file, 'w', newline='') as f:
             writer = csv.writer(f)
             writer.writerow(['IP Address', 'Port', 'Code', 'Country', 'Anonymity', 'Google', 'Https', 'Last Checked'])
-
-            for proxy in working_proxies:
-                ip, port = proxy['proxy'].split(':')
-                writer.writerow([
-                    ip,
-                    port,
-                    '',  # Code (not available)
+            writer.writerows(
+                [
+                    *proxy['proxy'].rpartition(':')[::2],
+                    proxy.get('code', ''),
                     proxy.get('country', ''),
                     proxy.get('anonymity', 'unknown'),
                     'False',  # Google (not tested)
                     'True' if proxy.get('type') == 'https' else 'False',
-                    datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                ])
+                    checked_at
+                ]
+                for proxy in working_proxies
+            )
         logger.info(f"Successfully wrote {len(working_proxies)} proxies to {csv_file}")
+        return csv_file
     except Exception as e:
         logger.error(f"Error writing CSV file: {str(e)}")
 
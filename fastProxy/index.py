@@ -0,0 +1,267 @@
+import itertools
+import random
+import threading
+from typing import List, Dict, Optional, Iterable
+from .logger import logger
+from .pool import proxy_id
+
+# Indexed attributes of a working proxy
+FIELDS = ('code', 'protocol', 'anonymity', 'latency', 'asn')
+
+# Upper bounds (milliseconds) of the latency buckets; slower proxies land in the last one
+LATENCY_BUCKETS = (100, 250, 500, 1000, 2000, 5000)
+
+
+def latency_bucket(latency: Optional[float]) -> Optional[int]:
+    """Return the upper bound of the latency bucket of a latency in milliseconds
+
+    Proxies slower than the last bound get bucket 0, unknown latencies None.
+    """
+    if latency is None:
+        return None
+    for bound in LATENCY_BUCKETS:
+        if latency <= bound:
+            return bound
+    return 0
+
+
+def normalize_anonymity(anonymity: Optional[str]) -> str:
+    """'elite proxy', 'Elite' and 'elite' all become 'elite'"""
+    anonymity = (anonymity or 'unknown').strip().lower()
+    if anonymity.endswith(' proxy'):
+        anonymity = anonymity[:-len(' proxy')]
+    return anonymity
+
+
+def proxy_protocols(proxy_info: Dict) -> List[str]:
+    """Every protocol a working proxy passed, falling back to its single type"""
+    protocols = proxy_info.get('protocols')
+    if protocols:
+        return list(protocols)
+    return [proxy_info['type']] if proxy_info.get('type') else []
+
+
+def index_keys(proxy_info: Dict) -> Dict:
+    """Values of the indexed attributes of a working proxy
+
+    protocol is a tuple, since a proxy that passed both HTTP and HTTPS is
+    filed under each of them.
+    """
+    code = proxy_info.get('code') or ''
+    country = proxy_info.get('country') or ''
+    if not code and len(country) == 2 and country.isalpha():
+        code = country
+    return {
+        'code': code.upper() or None,
+        'protocol': tuple(sorted(proxy_protocols(proxy_info))),
+        'anonymity': normalize_anonymity(proxy_info.get('anonymity')),
+        'latency': latency_bucket(proxy_info.get('latency')),
+        'asn': proxy_info.get('asn')
+    }
+
+
+class _Bucket:
+    """List plus position map: O(1) add, remove and random choice"""
+
+    __slots__ = ('items', 'positions')
+
+    def __init__(self):
+        self.items = []
+        self.positions = {}
+
+    def add(self, key):
+        if key not in self.positions:
+            self.positions[key] = len(self.items)
+            self.items.append(key)
+
+    def discard(self, key):
+        position = self.positions.pop(key, None)
+        if position is None:
+            return
+        last = self.items.pop()
+        if last != key:
+            self.items[position] = last
+            self.positions[last] = position
+
+
+class ProxyIndex:
+    """In-memory multi-key index over working proxies
+
+    Every proxy is filed under each combination of its indexed attributes
+    (country code, protocol, anonymity, latency bucket and ASN) with the
+    others left as wildcards, so any filter on exact attribute values maps
+    to a single bucket and a random pick from it is O(1). Adding or
+    updating a proxy touches 2**len(FIELDS) buckets, independent of the
+    number of proxies. All operations take one lock, so revalidation can
+    update the index while other threads select from it.
+
+    Args:
+        proxies: Working proxies to index, as returned by fetch_proxies
+        geo (GeoEnricher, optional): Fills in country code and ASN from local mmdb files
+    """
+
+    def __init__(self, proxies: Optional[Iterable[Dict]] = None, geo=None):
+        self.geo = geo
+        self._lock = threading.RLock()
+        self._proxies = {}
+        self._keys = {}
+        self._buckets = {}
+        self._random = random.Random()
+        if proxies:
+            self.update(proxies)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._proxies)
+
+    def __contains__(self, proxy: str):
+        with self._lock:
+            return proxy in self._proxies
+
+    @staticmethod
+    def _combinations(keys: Dict):
+        values = [keys[field] + (None,) if field == 'protocol' else (keys[field], None)
+                  for field in FIELDS]
+        return set(itertools.product(*values))
+
+    def add(self, proxy_info: Dict) -> None:
+        """Index a working proxy, replacing its previous entry"""
+        proxy_info = dict(proxy_info)
+        if self.geo is not None:
+            self.geo.enrich(proxy_info)
+        key = proxy_id(proxy_info)
+        keys = index_keys(proxy_info)
+        with self._lock:
+            old = self._keys.get(key)
+            if old != keys:
+                if old is not None:
+                    self._unfile(key, old)
+                for combination in self._combinations(keys):
+                    bucket = self._buckets.get(combination)
+                    if bucket is None:
+                        bucket = self._buckets[combination] = _Bucket()
+                    bucket.add(key)
+                self._keys[key] = keys
+            self._proxies[key] = proxy_info
+
+    def update(self, proxies: Iterable[Dict]) -> None:
+        for proxy_info in proxies:
+            self.add(proxy_info)
+
+    def remove(self, proxy: str) -> None:
+        """Drop a proxy, e.g. after it failed revalidation"""
+        with self._lock:
+            keys = self._keys.pop(proxy, None)
+            if keys is not None:
+                self._unfile(proxy, keys)
+                del self._proxies[proxy]
+
+    def _unfile(self, key, keys):
+        for combination in self._combinations(keys):
+            bucket = self._buckets.get(combination)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket.items:
+                    del self._buckets[combination]
+
+    def _lookup(self, code=None, protocol=None, anonymity=None, latency=None, asn=None):
+        combination = (code.upper() if code else None, protocol,
+                       normalize_anonymity(anonymity) if anonymity else None,
+                       latency_bucket(latency) if latency is not None else None, asn)
+        return self._buckets.get(combination)
+
+    def _buckets_for(self, max_latency=None, **filters):
+        if max_latency is None:
+            bucket = self._lookup(**filters)
+            return [bucket] if bucket else []
+        bounds = [b for b in LATENCY_BUCKETS if b <= max_latency]
+        buckets = [self._lookup(latency=bound, **filters) for bound in bounds]
+        return [b for b in buckets if b]
+
+    def select(self, code: Optional[str] = None, protocol: Optional[str] = None,
+               anonymity: Optional[str] = None, max_latency: Optional[float] = None,
+               asn: Optional[int] = None) -> Optional[Dict]:
+        """Pick a random working proxy matching all given filters
+
+        Args:
+            code: Two-letter country code
+            protocol: 'http' or 'https'
+            anonymity: 'elite', 'anonymous' or 'transparent' (a ' proxy' suffix is ignored)
+            max_latency: Only proxies from latency buckets whose bound is at most this many milliseconds
+            asn: Autonomous system number, requires GeoIP enrichment
+
+        Returns:
+            Dict: Proxy info, None when nothing matches
+        """
+        with self._lock:
+            buckets = self._buckets_for(max_latency, code=code, protocol=protocol,
+                                        anonymity=anonymity, asn=asn)
+            total = sum(len(b.items) for b in buckets)
+            if not total:
+                return None
+            pick = self._random.randrange(total)
+            for bucket in buckets:
+                if pick < len(bucket.items):
+                    return dict(self._proxies[bucket.items[pick]])
+                pick -= len(bucket.items)
+
+    def filter(self, code: Optional[str] = None, protocol: Optional[str] = None,
+               anonymity: Optional[str] = None, max_latency: Optional[float] = None,
+               asn: Optional[int] = None) -> List[Dict]:
+        """All working proxies matching the filters"""
+        with self._lock:
+            buckets = self._buckets_for(max_latency, code=code, protocol=protocol,
+                                        anonymity=anonymity, asn=asn)
+            return [dict(self._proxies[key]) for bucket in buckets for key in bucket.items]
+
+    def count(self, code: Optional[str] = None, protocol: Optional[str] = None,
+              anonymity: Optional[str] = None, max_latency: Optional[float] = None,
+              asn: Optional[int] = None) -> int:
+        with self._lock:
+            buckets = self._buckets_for(max_latency, code=code, protocol=protocol,
+                                        anonymity=anonymity, asn=asn)
+            return sum(len(b.items) for b in buckets)
+
+
+class GeoEnricher:
+    """Offline GeoIP/ASN lookups from local MaxMind mmdb files
+
+    Requires the optional ``maxminddb`` package. Either database may be
+    omitted; existing country codes of a proxy are kept.
+
+    Args:
+        country_db: Path to a GeoLite2/GeoIP2 Country or City database
+        asn_db: Path to a GeoLite2 ASN database
+    """
+
+    def __init__(self, country_db: Optional[str] = None, asn_db: Optional[str] = None):
+        try:
+            import maxminddb
+        except ImportError:
+            raise ImportError("GeoIP enrichment requires maxminddb: pip install maxminddb")
+        self._country = maxminddb.open_database(country_db) if country_db else None
+        self._asn = maxminddb.open_database(asn_db) if asn_db else None
+
+    def enrich(self, proxy_info: Dict) -> Dict:
+        """Add code, country and asn/asn_org to a proxy dictionary in place"""
+        ip = proxy_id(proxy_info).rpartition(':')[0]
+        try:
+            if self._country is not None:
+                record = self._country.get(ip) or {}
+                country = record.get('country') or {}
+                if country.get('iso_code') and not proxy_info.get('code'):
+                    proxy_info['code'] = country['iso_code']
+                    proxy_info.setdefault('country', (country.get('names') or {}).get('en', ''))
+            if self._asn is not None:
+                record = self._asn.get(ip) or {}
+                if record.get('autonomous_system_number'):
+                    proxy_info['asn'] = record['autonomous_system_number']
+                    proxy_info['asn_org'] = record.get('autonomous_system_organization', '')
+        except ValueError as e:
+            logger.debug(f"GeoIP lookup failed for {ip}: {str(e)}")
+        return proxy_info
+
+    def close(self) -> None:
+        for reader in (self._country, self._asn):
+            if reader is not None:
+                reader.close()
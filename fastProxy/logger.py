@@ -10,6 +10,8 @@ class ProxyLogger:
         # Create logs directory if it doesn't exist
         log_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
         os.makedirs(log_dir, exist_ok=True)
+        # Also used for profiles and other run artifacts
+        self.log_dir = log_dir
 
         # Create rotating file handler
         log_file = os.path.join(log_dir, 'fastproxy.log')
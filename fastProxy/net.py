@@ -0,0 +1,252 @@
+import socket
+import ssl
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+import requests
+import urllib3.util.connection as urllib3_connection
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+try:
+    from urllib3.exceptions import NameResolutionError
+except ImportError:  # pragma: no cover - urllib3 < 2 reports lookup errors as NewConnectionError
+    NameResolutionError = None
+
+from .profiling import stage
+from .resolver import default_resolver as resolver
+
+_local = threading.local()
+
+
+class ProbeCancelled(ConnectionAbortedError):
+    """Raised when a probe is aborted before or while connecting"""
+
+
+class ProbeContext:
+    """Tracks the sockets opened by one probe so they can be closed from another thread
+
+    Closing the sockets makes any blocking connect/send/recv in the probe
+    thread fail right away, which releases the file descriptor and lets
+    the thread finish instead of hanging until its timeout.
+    """
+
+    def __init__(self, timer=None):
+        self._lock = threading.Lock()
+        self._sockets = set()
+        self.cancelled = threading.Event()
+        # Optional StageTimer receiving resolve/connect/tls times of the probe
+        self.timer = timer
+
+    def register(self, sock: socket.socket) -> None:
+        with self._lock:
+            if self.cancelled.is_set():
+                sock.close()
+                raise ProbeCancelled("probe was cancelled")
+            self._sockets.add(sock)
+
+    def unregister(self, sock: socket.socket) -> None:
+        with self._lock:
+            self._sockets.discard(sock)
+
+    def publish(self, callback) -> bool:
+        """Run callback unless the probe was cancelled, atomically with abort()"""
+        with self._lock:
+            if self.cancelled.is_set():
+                return False
+            callback()
+            return True
+
+    def abort(self) -> int:
+        """Cancel the probe and close its open sockets
+
+        Returns:
+            int: Number of sockets closed
+        """
+        with self._lock:
+            self.cancelled.set()
+            sockets, self._sockets = self._sockets, set()
+        for sock in sockets:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+        return len(sockets)
+
+
+class ProbeSSLContext(ssl.SSLContext):
+    """SSLContext whose TLS sockets are tracked by the current probe context
+
+    wrap_socket() detaches the plain socket, so closing that one on abort
+    no longer interrupts anything. The TLS socket takes its place in the
+    probe context before the handshake starts, so an abort interrupts the
+    handshake and any later read.
+    """
+
+    def wrap_socket(self, sock, server_side=False, do_handshake_on_connect=True,
+                    suppress_ragged_eofs=True, server_hostname=None, session=None):
+        tls_sock = super().wrap_socket(sock, server_side=server_side, do_handshake_on_connect=False,
+                                       suppress_ragged_eofs=suppress_ragged_eofs,
+                                       server_hostname=server_hostname, session=session)
+        context = current_context()
+        if context is not None:
+            context.unregister(sock)
+            context.register(tls_sock)
+        if do_handshake_on_connect:
+            with stage(context.timer if context is not None else None, 'tls', thread=True):
+                tls_sock.do_handshake()
+        return tls_sock
+
+
+def current_context() -> Optional[ProbeContext]:
+    return getattr(_local, 'context', None)
+
+
+@contextmanager
+def probe_context(context: ProbeContext):
+    """Attach a ProbeContext to the connections opened by the current thread"""
+    previous = current_context()
+    _local.context = context
+    try:
+        yield context
+    finally:
+        _local.context = previous
+
+
+def create_connection(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None,
+                      socket_options=None):
+    """Counterpart of urllib3's create_connection used by the sessions of this module
+
+    Addresses are looked up through the shared ResolverCache, so IP
+    literals never reach the resolver and host names are resolved once
+    per TTL. Inside a probe context the socket is also registered with
+    the context before it connects, so an abort interrupts a pending
+    connect.
+    """
+    context = current_context()
+    if context is not None and context.cancelled.is_set():
+        raise ProbeCancelled("probe was cancelled")
+
+    host, port = address
+    if host.startswith('['):
+        host = host.strip('[]')
+    timer = context.timer if context is not None else None
+    err = None
+    with stage(timer, 'resolve', thread=True):
+        addresses = resolver.resolve(host, port, urllib3_connection.allowed_gai_family(), socket.SOCK_STREAM)
+    for af, socktype, proto, _, sa in addresses:
+        sock = socket.socket(af, socktype, proto)
+        try:
+            if context is not None:
+                context.register(sock)
+            urllib3_connection._set_socket_options(sock, socket_options)
+            if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                sock.settimeout(timeout)
+            if source_address:
+                sock.bind(source_address)
+            with stage(timer, 'connect', thread=True):
+                sock.connect(sa)
+            return sock
+        except ProbeCancelled:
+            raise
+        except OSError as e:
+            err = e
+            if context is not None:
+                context.unregister(sock)
+            sock.close()
+            if context is not None and context.cancelled.is_set():
+                raise ProbeCancelled("probe was cancelled") from e
+    if err is not None:
+        raise err
+    raise OSError("getaddrinfo returns an empty list")
+
+
+class _ResolvingConnection:
+    """Opens its socket with create_connection instead of urllib3's"""
+
+    def _new_conn(self):
+        try:
+            return create_connection((self._dns_host, self.port), self.timeout,
+                                     source_address=self.source_address, socket_options=self.socket_options)
+        except socket.gaierror as e:
+            if NameResolutionError is None:  # pragma: no cover
+                raise NewConnectionError(self, f"Failed to resolve {self.host}: {e}") from e
+            raise NameResolutionError(self.host, self, e) from e
+        except socket.timeout as e:
+            raise ConnectTimeoutError(
+                self, f"Connection to {self.host} timed out. (connect timeout={self.timeout})") from e
+        except OSError as e:
+            raise NewConnectionError(self, f"Failed to establish a new connection: {e}") from e
+
+
+class ResolvingHTTPConnection(_ResolvingConnection, HTTPConnection):
+    pass
+
+
+class ResolvingHTTPSConnection(_ResolvingConnection, HTTPSConnection):
+    pass
+
+
+class ResolvingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = ResolvingHTTPConnection
+
+
+class ResolvingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = ResolvingHTTPSConnection
+
+
+POOL_CLASSES = {'http': ResolvingHTTPConnectionPool, 'https': ResolvingHTTPSConnectionPool}
+
+
+class ResolvingAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections go through create_connection
+
+    Only sessions this adapter is mounted on use the resolver cache and
+    probe contexts; urllib3 itself is left alone, so other requests made
+    by the host application resolve and connect as usual.
+
+    Args:
+        ssl_context (ssl.SSLContext, optional): Context of HTTPS connections, e.g. a
+            ProbeSSLContext so aborts also close TLS sockets
+    """
+
+    def __init__(self, ssl_context: Optional[ssl.SSLContext] = None, **kwargs):
+        # Set before HTTPAdapter.__init__, which builds the pool manager
+        self.ssl_context = ssl_context
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.ssl_context is not None:
+            kwargs.setdefault('ssl_context', self.ssl_context)
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = POOL_CLASSES
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        if self.ssl_context is not None:
+            # https:// proxies get a TLS connection of their own, wrapped with proxy_ssl_context
+            proxy_kwargs.setdefault('ssl_context', self.ssl_context)
+            proxy_kwargs.setdefault('proxy_ssl_context', self.ssl_context)
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        # SOCKS managers bring their own pools
+        if not proxy.lower().startswith('socks'):
+            manager.pool_classes_by_scheme = POOL_CLASSES
+        return manager
+
+
+def session(ssl_context: Optional[ssl.SSLContext] = None) -> requests.Session:
+    """requests session that uses the resolver cache and the current probe context"""
+    s = requests.Session()
+    adapter = ResolvingAdapter(ssl_context)
+    s.mount('http://', adapter)
+    s.mount('https://', adapter)
+    return s
+
+
+def get(url: str, ssl_context: Optional[ssl.SSLContext] = None, **kwargs) -> requests.Response:
+    """requests.get through session(); like requests.get, the session is closed afterwards"""
+    with session(ssl_context) as s:
+        return s.get(url, **kwargs)
@@ -0,0 +1,121 @@
+import threading
+import time
+from typing import List, Dict, Optional, Iterable
+from .scoring import ReliabilityScore
+
+
+def proxy_id(proxy_data: Dict) -> str:
+    """Return the ip:port string identifying a proxy dictionary"""
+    return proxy_data.get('proxy') or f"{proxy_data.get('ip', '')}:{proxy_data.get('port', '')}"
+
+
+class ProxyPool:
+    """Thread-safe in-memory pool of proxies and their reliability scores
+
+    The pool remembers the last known proxy info of every proxy it has
+    seen together with a ReliabilityScore, so callers can rank candidates
+    and decide which ones actually need a new probe.
+    """
+
+    def __init__(self, alpha: float = 0.3, half_life: float = 6 * 3600,
+                 min_interval: float = 60.0, max_interval: float = 3600.0):
+        self.alpha = alpha
+        self.half_life = half_life
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._lock = threading.RLock()
+        self._info = {}
+        self._scores = {}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._scores)
+
+    def __contains__(self, proxy: str):
+        with self._lock:
+            return proxy in self._scores
+
+    def _new_score(self, data: Optional[Dict] = None) -> ReliabilityScore:
+        if data:
+            return ReliabilityScore.from_dict(data, alpha=self.alpha, half_life=self.half_life)
+        return ReliabilityScore(alpha=self.alpha, half_life=self.half_life)
+
+    def record(self, proxy: str, alive: bool, latency: Optional[float] = None,
+               info: Optional[Dict] = None, now: Optional[float] = None) -> ReliabilityScore:
+        """Fold one validation outcome of a proxy into the pool"""
+        with self._lock:
+            score = self._scores.get(proxy)
+            if score is None:
+                score = self._scores[proxy] = self._new_score()
+            score.update(alive, latency, now)
+            if info:
+                self._info[proxy] = dict(self._info.get(proxy, {}), **info)
+            return score
+
+    def get_score(self, proxy: str) -> Optional[ReliabilityScore]:
+        with self._lock:
+            return self._scores.get(proxy)
+
+    def get_info(self, proxy: str) -> Optional[Dict]:
+        with self._lock:
+            info = self._info.get(proxy)
+            return dict(info) if info else None
+
+    def score(self, proxy: str, now: Optional[float] = None) -> float:
+        """Reliability score of a proxy; unknown proxies get the prior"""
+        with self._lock:
+            score = self._scores.get(proxy)
+            return score.value(now) if score else ReliabilityScore().prior
+
+    def due_at(self, proxy: str, now: Optional[float] = None) -> Optional[float]:
+        """Time at which a proxy should be probed again, None if it was never checked"""
+        with self._lock:
+            score = self._scores.get(proxy)
+            if score is None or score.updated_at is None:
+                return None
+            return score.updated_at + score.next_check_interval(self.min_interval, self.max_interval, now)
+
+    def is_due(self, proxy: str, now: Optional[float] = None) -> bool:
+        """Whether a proxy should be probed again"""
+        with self._lock:
+            score = self._scores.get(proxy)
+            return score is None or score.is_due(self.min_interval, self.max_interval, now)
+
+    def rank(self, proxies: Iterable[Dict], min_score: Optional[float] = None,
+             now: Optional[float] = None) -> List[Dict]:
+        """Order proxy dictionaries by descending score, dropping those below min_score"""
+        now = time.time() if now is None else now
+        scored = [(self.score(proxy_id(p), now), p) for p in proxies]
+        if min_score is not None:
+            scored = [(s, p) for s, p in scored if s >= min_score]
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [p for _, p in scored]
+
+    def working(self, min_score: Optional[float] = None, limit: Optional[int] = None,
+                now: Optional[float] = None) -> List[Dict]:
+        """Proxies whose last probe succeeded, best score first"""
+        with self._lock:
+            alive = [dict(self._info[proxy], score=round(score.value(now), 4))
+                     for proxy, score in self._scores.items()
+                     if score.last_alive and proxy in self._info]
+        if min_score is not None:
+            alive = [p for p in alive if p['score'] >= min_score]
+        alive.sort(key=lambda p: p['score'], reverse=True)
+        return alive[:limit] if limit else alive
+
+    def export_scores(self) -> List[Dict]:
+        """Serializable score records, used to persist the pool"""
+        with self._lock:
+            return [dict(score.to_dict(), proxy=proxy, info=self._info.get(proxy))
+                    for proxy, score in self._scores.items()]
+
+    def import_scores(self, records: Iterable[Dict]) -> int:
+        """Restore scores exported by export_scores()"""
+        count = 0
+        with self._lock:
+            for record in records:
+                self._scores[record['proxy']] = self._new_score(record)
+                if record.get('info'):
+                    self._info[record['proxy']] = dict(record['info'])
+                count += 1
+        return count
@@ -0,0 +1,199 @@
+import bisect
+import ipaddress
+import socket
+import threading
+import time
+from typing import List, Dict, Optional, Iterable, Tuple
+from .logger import logger
+from .pool import proxy_id
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+# IPv4 ranges that never host a public proxy (RFC 6890 special-purpose and multicast/reserved space)
+BOGON_NETWORKS = (
+    '0.0.0.0/8', '10.0.0.0/8', '100.64.0.0/10', '127.0.0.0/8', '169.254.0.0/16',
+    '172.16.0.0/12', '192.0.0.0/24', '192.0.2.0/24', '192.88.99.0/24', '192.168.0.0/16',
+    '198.18.0.0/15', '198.51.100.0/24', '203.0.113.0/24', '224.0.0.0/4', '240.0.0.0/4'
+)
+
+
+def pack_ip(ip: str) -> Optional[int]:
+    """IPv4 dotted quad to its uint32 value, None if it is not a valid IPv4 address"""
+    try:
+        return int.from_bytes(socket.inet_pton(socket.AF_INET, ip), 'big')
+    except (OSError, TypeError):
+        return None
+
+
+def pack_port(port) -> Optional[int]:
+    """Port string or number to int, None if it is not a valid TCP port"""
+    try:
+        port = int(port)
+    except (TypeError, ValueError):
+        return None
+    return port if 0 < port < 65536 else None
+
+
+def split_address(proxy_data: Dict) -> Tuple[str, str]:
+    """ip and port of a candidate, or of a working proxy that only carries 'proxy'"""
+    ip, _, port = proxy_id(proxy_data).rpartition(':')
+    return ip, port
+
+
+def merge_networks(networks: Iterable[str]) -> Tuple[List[int], List[int]]:
+    """Sorted, non-overlapping (starts, ends) uint32 ranges covering the given CIDRs"""
+    ranges = sorted((int(net.network_address), int(net.broadcast_address))
+                    for net in (ipaddress.ip_network(cidr, strict=False) for cidr in networks)
+                    if net.version == 4)
+    starts, ends = [], []
+    for start, end in ranges:
+        if ends and start <= ends[-1] + 1:
+            ends[-1] = max(ends[-1], end)
+        else:
+            starts.append(start)
+            ends.append(end)
+    return starts, ends
+
+
+class NegativeCache:
+    """ip:port pairs recently found dead, skipped until their entry expires
+
+    Keys are packed as ``ip << 16 | port`` so membership of a whole
+    candidate batch is one sorted-array lookup.
+    """
+
+    def __init__(self, ttl: float = 1800.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._expires = {}
+        self._sorted = None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._expires)
+
+    def add(self, ip: str, port, now: Optional[float] = None) -> None:
+        ip, port = pack_ip(ip), pack_port(port)
+        if ip is None or port is None:
+            return
+        now = time.time() if now is None else now
+        with self._lock:
+            self._expires[ip << 16 | port] = now + self.ttl
+            self._sorted = None
+
+    def keys(self, now: Optional[float] = None):
+        """Sorted packed keys of the live entries (a numpy array when numpy is available)"""
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = [key for key, expires in self._expires.items() if expires <= now]
+            for key in expired:
+                del self._expires[key]
+            if expired or self._sorted is None:
+                keys = sorted(self._expires)
+                self._sorted = np.array(keys, dtype=np.uint64) if np is not None else keys
+            return self._sorted
+
+
+class Prefilter:
+    """Bulk screening of candidates before any network I/O
+
+    Drops candidates with invalid addresses or ports, bogon/private/
+    reserved addresses, blocklisted subnets or ports and recent negative
+    cache hits. With numpy installed the checks run vectorized over packed
+    uint32 addresses and uint16 ports, with CIDR membership resolved by
+    searchsorted over the merged, sorted ranges; without numpy the same
+    sorted ranges are searched with bisect.
+
+    Args:
+        blocklist: CIDRs (or single addresses) never to probe
+        blocked_ports: Ports never to probe
+        negative_cache (NegativeCache, optional): Known-dead proxies to skip
+        drop_bogons: Drop BOGON_NETWORKS
+    """
+
+    def __init__(self, blocklist: Optional[Iterable[str]] = None, blocked_ports: Optional[Iterable[int]] = None,
+                 negative_cache: Optional[NegativeCache] = None, drop_bogons: bool = True):
+        networks = list(BOGON_NETWORKS) if drop_bogons else []
+        networks.extend(blocklist or [])
+        self._starts, self._ends = merge_networks(networks)
+        self.blocked_ports = sorted(set(int(p) for p in blocked_ports or []))
+        self._blocked_port_set = set(self.blocked_ports)
+        self.negative_cache = negative_cache
+        self.stats = {}
+
+    def record_dead(self, proxy_data: Dict) -> None:
+        """Remember a proxy that failed validation in the negative cache"""
+        if self.negative_cache is not None:
+            self.negative_cache.add(*split_address(proxy_data))
+
+    def filter(self, proxies: List[Dict]) -> List[Dict]:
+        """Return the candidates worth probing, in their original order"""
+        if not proxies:
+            return []
+        addresses = [split_address(p) for p in proxies]
+        ips = [pack_ip(ip) for ip, _ in addresses]
+        ports = [pack_port(port) for _, port in addresses]
+        dead = self.negative_cache.keys() if self.negative_cache is not None else []
+        if np is not None:
+            keep = self._mask_numpy(ips, ports, dead)
+            kept = [p for p, k in zip(proxies, keep.tolist()) if k]
+        else:
+            kept = [p for p, ip, port in zip(proxies, ips, ports) if self._keep(ip, port, dead)]
+        self.stats = {'candidates': len(proxies), 'kept': len(kept), 'dropped': len(proxies) - len(kept)}
+        if len(kept) < len(proxies):
+            logger.info(f"Prefilter dropped {len(proxies) - len(kept)} of {len(proxies)} candidates")
+        return kept
+
+    def _mask_numpy(self, ips, ports, dead):
+        valid = np.array([ip is not None and port is not None for ip, port in zip(ips, ports)], dtype=bool)
+        packed_ips = np.array([ip or 0 for ip in ips], dtype=np.uint32)
+        packed_ports = np.array([port or 0 for port in ports], dtype=np.uint16)
+        keep = valid
+        if self._starts:
+            starts = np.array(self._starts, dtype=np.uint32)
+            ends = np.array(self._ends, dtype=np.uint32)
+            position = np.searchsorted(starts, packed_ips, side='right').astype(np.int64) - 1
+            inside = (position >= 0) & (packed_ips <= ends[np.maximum(position, 0)])
+            keep &= ~inside
+        if self.blocked_ports:
+            keep &= ~np.isin(packed_ports, np.array(self.blocked_ports, dtype=np.uint16))
+        if len(dead):
+            keys = packed_ips.astype(np.uint64) << np.uint64(16) | packed_ports.astype(np.uint64)
+            position = np.minimum(np.searchsorted(dead, keys), len(dead) - 1)
+            keep &= dead[position] != keys
+        return keep
+
+    def _keep(self, ip, port, dead):
+        if ip is None or port is None:
+            return False
+        position = bisect.bisect_right(self._starts, ip) - 1
+        if position >= 0 and ip <= self._ends[position]:
+            return False
+        if port in self._blocked_port_set:
+            return False
+        if dead:
+            key = ip << 16 | port
+            position = bisect.bisect_left(dead, key)
+            if position < len(dead) and dead[position] == key:
+                return False
+        return True
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_prefilter() -> Prefilter:
+    """Process-wide Prefilter used when a run fetches its own candidates
+
+    Drops bogons and keeps one NegativeCache, so proxies found dead by
+    one run are skipped by the next ones until their TTL expires.
+    """
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = Prefilter(negative_cache=NegativeCache())
+        return _default
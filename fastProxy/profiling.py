@@ -0,0 +1,222 @@
+import cProfile
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Dict, Optional
+from .logger import logger
+
+try:
+    import pyinstrument
+except ImportError:  # pragma: no cover - pyinstrument is optional
+    pyinstrument = None
+
+# Set to 1/true/yes to profile every validation run
+PROFILE_ENV = 'FASTPROXY_PROFILE'
+
+
+class StageTimer:
+    """Accumulates wall and CPU time per named stage of a run
+
+    Run-level stages (fetch, validate, csv, ...) are timed with stage()
+    and count process CPU time, which includes the probe threads working
+    meanwhile. Per-probe stages (connect, tls, probe_http, ...) are added
+    from the probe threads with their own thread CPU time, so their wall
+    time is a sum over concurrent probes and may exceed the run's.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def add(self, name: str, wall: float, cpu: Optional[float] = None) -> None:
+        with self._lock:
+            stage = self._stages.setdefault(name, [0.0, 0.0, 0])
+            stage[0] += wall
+            stage[1] += cpu or 0.0
+            stage[2] += 1
+
+    @staticmethod
+    def now(thread: bool = False):
+        """Start mark for since(); thread=True measures the calling thread's CPU only"""
+        return time.perf_counter(), time.thread_time() if thread else time.process_time(), thread
+
+    def since(self, name: str, mark) -> None:
+        """Add the time elapsed since a mark taken with now()"""
+        wall, cpu, thread = mark
+        self.add(name, time.perf_counter() - wall, (time.thread_time() if thread else time.process_time()) - cpu)
+
+    @contextmanager
+    def stage(self, name: str, thread: bool = False):
+        mark = self.now(thread)
+        try:
+            yield
+        finally:
+            self.since(name, mark)
+
+    def stages(self) -> Dict[str, Dict]:
+        """{stage: {'wall': seconds, 'cpu': seconds, 'count': n}}"""
+        with self._lock:
+            return {name: {'wall': round(wall, 6), 'cpu': round(cpu, 6), 'count': count}
+                    for name, (wall, cpu, count) in self._stages.items()}
+
+
+def stage(timer: Optional[StageTimer], name: str, thread: bool = False):
+    """timer.stage(name), or a no-op when there is no timer"""
+    return timer.stage(name, thread) if timer is not None else _no_stage()
+
+
+@contextmanager
+def _no_stage():
+    yield
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile, None for no values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))]
+
+
+class RunReport:
+    """Structured summary of one validation run
+
+    Collects what otherwise only shows up in log lines: candidates per
+    source, candidates dropped before probing (duplicates, prefilter,
+    max_proxies, not due), probe outcomes, per-protocol success, the
+    latency distribution of working proxies, stage timings and the files
+    written by exporters. to_dict() gives a JSON serializable form.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.elapsed = None
+        self.working = 0
+        self.timer = StageTimer()
+        self.profile_path = None
+        self.candidates = 0
+        self.candidates_by_source = Counter()
+        self.dropped = Counter()
+        self.outcomes = Counter()
+        self.protocols = {}
+        self.latency = {}
+        self.exports = []
+        self.stop_reason = None
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    @property
+    def stages(self) -> Dict[str, Dict]:
+        return self.timer.stages()
+
+    @property
+    def timeouts(self) -> int:
+        return self.outcomes['timeout']
+
+    @property
+    def probes(self) -> int:
+        return sum(self.outcomes.values())
+
+    def count_candidates(self, proxies: List[Dict]) -> None:
+        self.candidates = len(proxies)
+        self.candidates_by_source = Counter(proxy.get('source') or 'unknown' for proxy in proxies)
+
+    def drop(self, reason: str, count: int) -> None:
+        """Count candidates removed before probing"""
+        if count:
+            self.dropped[reason] += count
+
+    def record_probe(self, outcome: str, tried: List[str] = (), working: List[str] = ()) -> None:
+        """Count one probe outcome and the protocols it tried and confirmed"""
+        with self._lock:
+            self.outcomes[outcome] += 1
+            for protocol in tried:
+                counts = self.protocols.setdefault(protocol, {'probed': 0, 'working': 0})
+                counts['probed'] += 1
+                counts['working'] += protocol in working
+
+    def add_export(self, path: Optional[str]) -> None:
+        if path:
+            self.exports.append(path)
+
+    def finish(self, working_proxies) -> None:
+        self.elapsed = round(time.perf_counter() - self._started, 6)
+        self.working = len(working_proxies or [])
+        latencies = [p['latency'] for p in working_proxies or [] if p.get('latency') is not None]
+        self.latency = {
+            'count': len(latencies),
+            'min': min(latencies) if latencies else None,
+            'mean': round(sum(latencies) / len(latencies), 1) if latencies else None,
+            'p50': percentile(latencies, 50),
+            'p90': percentile(latencies, 90),
+            'p99': percentile(latencies, 99),
+            'max': max(latencies) if latencies else None
+        }
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                'started_at': self.started_at,
+                'elapsed': self.elapsed,
+                'working': self.working,
+                'candidates': self.candidates,
+                'candidates_by_source': dict(self.candidates_by_source),
+                'dropped': dict(self.dropped),
+                'probes': self.probes,
+                'outcomes': dict(self.outcomes),
+                'timeouts': self.timeouts,
+                'protocols': {name: dict(counts) for name, counts in self.protocols.items()},
+                'latency_ms': dict(self.latency),
+                'stages': self.stages,
+                'exports': list(self.exports),
+                'stop_reason': self.stop_reason,
+                'profile_path': self.profile_path
+            }
+
+    def __repr__(self):
+        return (f"RunReport(candidates={self.candidates}, probes={self.probes}, "
+                f"working={self.working}, elapsed={self.elapsed})")
+
+
+def profiling_requested(profile: Optional[bool] = None) -> bool:
+    """Explicit flag, otherwise the FASTPROXY_PROFILE environment variable"""
+    if profile is not None:
+        return bool(profile)
+    return os.environ.get(PROFILE_ENV, '').strip().lower() in ('1', 'true', 'yes')
+
+
+@contextmanager
+def profiled(report: RunReport, directory: Optional[str] = None):
+    """Profile the block and dump the result to the logs directory
+
+    Uses pyinstrument when installed (pip install pyinstrument), which
+    writes an HTML report, and cProfile otherwise, whose .prof file can be
+    read with pstats or snakeviz. cProfile only sees the calling thread,
+    i.e. the scheduling loop, not the probe threads.
+    """
+    directory = directory or logger.log_dir
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    if pyinstrument is not None:
+        profiler = pyinstrument.Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            report.profile_path = os.path.join(directory, f"profile-{stamp}.html")
+            with open(report.profile_path, 'w') as f:
+                f.write(profiler.output_html())
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            report.profile_path = os.path.join(directory, f"profile-{stamp}.prof")
+            profiler.dump_stats(report.profile_path)
+    logger.info(f"Saved profile to {report.profile_path}")
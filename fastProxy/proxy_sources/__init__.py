@@ -1,8 +1,16 @@
+import asyncio
 from abc import ABC, abstractmethod
 from typing import List, Dict, Optional
 import requests
 from bs4 import BeautifulSoup
 from ..logger import logger
+from .. import net
+from ..ratelimit import Backoff, retry_after_seconds, shared_limiter
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - aiohttp is optional
+    aiohttp = None
 
 class ProxySource(ABC):
     """Abstract base class for proxy sources"""
@@ -21,18 +29,81 @@ class ProxySource(ABC):
         """
         pass
 
+    async def afetch(self) -> List[Dict[str, str]]:
+        """Fetch proxies without blocking the event loop
+
+        Runs fetch() in the default executor; sources override it with a
+        native implementation built on _make_request_async().
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, self.fetch)
+
+    # Per-host request limits shared by every source instance, and the retry policy for 429s
+    rate_limiter = shared_limiter
+    backoff = Backoff()
+    # Error of the last failed request, so the manager can tell failures from empty lists
+    last_error = None
+
     def _make_request(self, url: str) -> Optional[requests.Response]:
-        """Make HTTP request with error handling"""
-        try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            return response
-        except requests.RequestException as e:
-            logger.error(f"Error fetching from {url}: {str(e)}")
-            return None
+        """Make a rate-limited HTTP request with error handling
+
+        Waits for a token of the host's bucket before every request. A 429
+        response blocks the host's bucket for the Retry-After or a jittered
+        backoff delay, so every fetcher of that host slows down, and the
+        request is retried up to backoff.max_retries times.
+        """
+        for attempt in range(self.backoff.max_retries + 1):
+            self.rate_limiter.acquire(url)
+            try:
+                # Source hosts share the validator's resolver cache
+                response = net.get(url, timeout=10)
+                if response.status_code == 429 and attempt < self.backoff.max_retries:
+                    delay = self.backoff.delay(attempt, retry_after_seconds(response))
+                    logger.warning(f"Rate limited by {self.rate_limiter.host_of(url)}, "
+                                   f"retrying in {delay:.1f} seconds")
+                    self.rate_limiter.penalize(url, delay)
+                    continue
+                response.raise_for_status()
+                return response
+            except requests.RequestException as e:
+                logger.error(f"Error fetching from {url}: {str(e)}")
+                self.last_error = e
+                return None
+        return None
+
+    async def _make_request_async(self, url: str) -> Optional[str]:
+        """Async counterpart of _make_request, returning the response body
+
+        Uses aiohttp when it is installed (pip install aiohttp) and awaits
+        the rate limiter and backoff instead of sleeping; without aiohttp
+        the blocking request runs in the default executor.
+        """
+        if aiohttp is None:
+            response = await asyncio.get_running_loop().run_in_executor(None, self._make_request, url)
+            return response.text if response is not None else None
+
+        timeout = aiohttp.ClientTimeout(total=10)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            for attempt in range(self.backoff.max_retries + 1):
+                await self.rate_limiter.acquire_async(url)
+                try:
+                    async with session.get(url) as response:
+                        if response.status == 429 and attempt < self.backoff.max_retries:
+                            delay = self.backoff.delay(attempt, retry_after_seconds(response))
+                            logger.warning(f"Rate limited by {self.rate_limiter.host_of(url)}, "
+                                           f"retrying in {delay:.1f} seconds")
+                            self.rate_limiter.penalize(url, delay)
+                            continue
+                        response.raise_for_status()
+                        return await response.text()
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    logger.error(f"Error fetching from {url}: {str(e)}")
+                    self.last_error = e
+                    return None
+        return None
 
 from .manager import ProxySourceManager
 from .free_proxy_list import FreeProxyListSource
 from .geonode import GeoNodeSource
+from .health import SourceHealthTracker
 
-__all__ = ['ProxySource', 'ProxySourceManager', 'FreeProxyListSource', 'GeoNodeSource']
+__all__ = ['ProxySource', 'ProxySourceManager', 'FreeProxyListSource', 'GeoNodeSource', 'SourceHealthTracker']
@@ -1,6 +1,8 @@
+import time
 from typing import List, Dict, Optional
 from bs4 import BeautifulSoup
 from . import ProxySource
+from .freshness import parse_age
 from ..logger import logger
 
 class FreeProxyListSource(ProxySource):
@@ -10,14 +12,30 @@ class FreeProxyListSource(ProxySource):
 
     def fetch(self) -> List[Dict[str, str]]:
         """Fetch proxies from free-proxy-list.net"""
-        proxies = []
         response = self._make_request(self.URL)
 
         if not response:
-            return proxies
+            return []
+        return self.parse(response.text)
+
+    async def afetch(self) -> List[Dict[str, str]]:
+        """Fetch proxies from free-proxy-list.net on the running event loop"""
+        text = await self._make_request_async(self.URL)
+
+        if not text:
+            return []
+        return self.parse(text)
 
+    def parse(self, html: str, now: Optional[float] = None) -> List[Dict[str, str]]:
+        """Extract proxies from the free-proxy-list.net page
+
+        The relative "Last Checked" column is kept as is in last_checked and
+        turned into a unix time in checked_at, None when it cannot be parsed.
+        """
+        now = time.time() if now is None else now
+        proxies = []
         try:
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = BeautifulSoup(html, 'html.parser')
             # Try different table selectors
             proxy_table = (
                 soup.find('table', {'id': 'proxylisttable'}) or
@@ -52,6 +70,8 @@ class FreeProxyListSource(ProxySource):
                         'https': cols[6].text.strip().lower(),
                         'last_checked': cols[7].text.strip()
                     }
+                    age = parse_age(proxy['last_checked'])
+                    proxy['checked_at'] = now - age if age is not None else None
                     # Debug log before validation
                     logger.debug(f"Processing row {idx}: {proxy}")
                     # Only validate IP and port format
@@ -0,0 +1,103 @@
+import re
+import time
+from datetime import datetime, timezone
+from typing import List, Dict, Optional
+
+# Seconds per unit of the relative ages sources print, e.g. "12 secs ago"
+AGE_UNITS = {
+    'sec': 1, 'second': 1, 'min': 60, 'minute': 60, 'hour': 3600, 'hr': 3600,
+    'day': 86400, 'week': 604800, 'month': 2592000, 'year': 31536000
+}
+_AGE_PART = re.compile(r'(\d+(?:\.\d+)?)\s*(' + '|'.join(sorted(AGE_UNITS, key=len, reverse=True)) + r')s?\b',
+                       re.IGNORECASE)
+
+# Age at which a source's check counts for half as much
+FRESHNESS_HALF_LIFE = 1800.0
+# Freshness and uptime assumed for candidates whose source gives no hint
+UNKNOWN_FRESHNESS = 0.5
+UNKNOWN_UPTIME = 0.5
+
+
+def parse_age(text) -> Optional[float]:
+    """Seconds in a relative age like "12 secs ago" or "1 hour 5 mins ago", None if unparseable"""
+    if not isinstance(text, str):
+        return None
+    text = text.strip().lower()
+    if text in ('just now', 'now'):
+        return 0.0
+    parts = _AGE_PART.findall(text)
+    if not parts:
+        return None
+    return float(sum(float(value) * AGE_UNITS[unit.lower()] for value, unit in parts))
+
+
+def parse_timestamp(value) -> Optional[float]:
+    """Unix time of epoch seconds, epoch milliseconds or an ISO 8601 string, None if unparseable"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        # Anything past the year 33658 in seconds is a millisecond timestamp
+        return float(value) / 1000 if value > 1e12 else float(value)
+    if not isinstance(value, str) or not value.strip():
+        return None
+    value = value.strip()
+    try:
+        return parse_timestamp(float(value))
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def parse_number(value) -> Optional[float]:
+    try:
+        return float(value) if value is not None and not isinstance(value, bool) else None
+    except (TypeError, ValueError):
+        return None
+
+
+def liveness(proxy: Dict, prior: float = 0.5, now: Optional[float] = None) -> float:
+    """Expected chance that a candidate is alive, from its source's hints
+
+    The prior (usually the source's yield) is scaled by how recently the
+    source saw the proxy working, halving every FRESHNESS_HALF_LIFE
+    seconds, and by the uptime the source reports.
+    """
+    now = time.time() if now is None else now
+    checked_at = proxy.get('checked_at')
+    if checked_at is None:
+        freshness = UNKNOWN_FRESHNESS
+    else:
+        freshness = 0.5 ** (max(0.0, now - checked_at) / FRESHNESS_HALF_LIFE)
+    uptime = proxy.get('uptime')
+    uptime = UNKNOWN_UPTIME if uptime is None else min(max(uptime, 0.0), 1.0)
+    return prior * freshness * uptime
+
+
+def order_by_liveness(proxies: List[Dict], priors: Optional[Dict[str, float]] = None,
+                      now: Optional[float] = None) -> List[Dict]:
+    """Most likely alive candidates first, faster ones first on ties
+
+    Args:
+        proxies: Candidates, optionally carrying checked_at, uptime and speed
+        priors: Yield of each source; candidates of unknown sources get 0.5
+        now: Reference time for the freshness of checked_at
+
+    Returns:
+        List[Dict]: The candidates reordered; the sort is stable, so candidates
+        without any hints keep their order
+    """
+    now = time.time() if now is None else now
+    priors = priors or {}
+
+    def key(proxy):
+        speed = proxy.get('speed')
+        return (-liveness(proxy, priors.get(proxy.get('source'), 0.5), now),
+                speed if speed is not None else float('inf'))
+
+    return sorted(proxies, key=key)
@@ -1,7 +1,7 @@
 from typing import List, Dict
 import json
-import time
 from . import ProxySource
+from .freshness import parse_number, parse_timestamp
 from ..logger import logger
 
 class GeoNodeSource(ProxySource):
@@ -18,86 +18,85 @@ class GeoNodeSource(ProxySource):
            '&sort_type=desc')
 
     def fetch(self) -> List[Dict[str, str]]:
-        """Fetch proxies from geonode.com API with exponential backoff"""
+        """Fetch proxies from geonode.com API"""
+        # Rate limiting, backoff and 429 retries are handled by _make_request
+        response = self._make_request(self.API_URL)
+        if not response:
+            logger.error("No response received from geonode.com API")
+            return []
+        return self._parse_response(response.json)
+
+    async def afetch(self) -> List[Dict[str, str]]:
+        """Fetch proxies from geonode.com API on the running event loop"""
+        text = await self._make_request_async(self.API_URL)
+        if not text:
+            logger.error("No response received from geonode.com API")
+            return []
+        return self._parse_response(lambda: json.loads(text))
+
+    def _parse_response(self, load_json) -> List[Dict[str, str]]:
+        try:
+            data = load_json()
+            logger.debug(f"Received response from geonode.com: {data.keys()}")
+            return self.parse(data)
+        except json.JSONDecodeError as e:
+            logger.error(f"Error parsing geonode.com API response: {str(e)}")
+        except Exception as e:
+            logger.error(f"Error processing geonode.com API response: {str(e)}")
+            logger.debug(f"Error details: {str(e)}", exc_info=True)
+        return []
+
+    def parse(self, data: Dict) -> List[Dict[str, str]]:
+        """Extract proxies from a decoded geonode.com API response
+
+        lastChecked, upTime (percent) and speed (ms) become checked_at (unix
+        time), uptime (0 to 1) and speed, None when missing or unparseable.
+        """
         proxies = []
-        max_retries = 3
-        retry_delay = 1
+        if 'data' not in data:
+            logger.error("Invalid response format from geonode.com API")
+            return proxies
 
-        for attempt in range(max_retries):
+        for proxy in data['data']:
             try:
-                response = self._make_request(self.API_URL)
-                if response and response.status_code == 429:
-                    retry_after = int(response.headers.get('Retry-After', retry_delay))
-                    logger.warning(f"Rate limited by geonode.com, waiting {retry_after} seconds")
-                    time.sleep(retry_after)
-                    retry_delay *= 2
+                protocols = proxy.get('protocols', [])
+                if isinstance(protocols, str):
+                    protocols = protocols.lower().split(',')
+                elif isinstance(protocols, list):
+                    protocols = [p.lower() for p in protocols]
+                else:
+                    logger.warning(f"Unexpected protocols format: {protocols}")
+                    protocols = []
+
+                anonymity = proxy.get('anonymityLevel', 'unknown')
+                if anonymity:
+                    anonymity = anonymity.lower().replace('_', ' ')
+                    if not anonymity.endswith(' proxy'):
+                        anonymity += ' proxy'
+                else:
+                    anonymity = 'unknown proxy'
+
+                proxy_entry = {
+                    'ip': proxy.get('ip', ''),
+                    'port': str(proxy.get('port', '')),
+                    'country': proxy.get('country', ''),
+                    'anonymity': anonymity,
+                    'https': 'yes' if 'https' in protocols else 'no'
+                }
+                uptime = parse_number(proxy.get('upTime'))
+                proxy_entry['checked_at'] = parse_timestamp(proxy.get('lastChecked'))
+                proxy_entry['uptime'] = round(uptime / 100, 4) if uptime is not None else None
+                proxy_entry['speed'] = parse_number(proxy.get('speed', proxy.get('responseTime')))
+
+                # Validate required fields
+                if not proxy_entry['ip'] or not proxy_entry['port']:
+                    logger.warning(f"Skipping proxy with missing required fields: {proxy_entry}")
                     continue
 
-                if not response:
-                    logger.error("No response received from geonode.com API")
-                    return proxies
-
-                try:
-                    data = response.json()
-                    logger.debug(f"Received response from geonode.com: {data.keys()}")
-
-                    if 'data' not in data:
-                        logger.error("Invalid response format from geonode.com API")
-                        return proxies
-
-                    for proxy in data['data']:
-                        try:
-                            protocols = proxy.get('protocols', [])
-                            if isinstance(protocols, str):
-                                protocols = protocols.lower().split(',')
-                            elif isinstance(protocols, list):
-                                protocols = [p.lower() for p in protocols]
-                            else:
-                                logger.warning(f"Unexpected protocols format: {protocols}")
-                                protocols = []
-
-                            anonymity = proxy.get('anonymityLevel', 'unknown')
-                            if anonymity:
-                                anonymity = anonymity.lower().replace('_', ' ')
-                                if not anonymity.endswith(' proxy'):
-                                    anonymity += ' proxy'
-                            else:
-                                anonymity = 'unknown proxy'
-
-                            proxy_entry = {
-                                'ip': proxy.get('ip', ''),
-                                'port': str(proxy.get('port', '')),
-                                'country': proxy.get('country', ''),
-                                'anonymity': anonymity,
-                                'https': 'yes' if 'https' in protocols else 'no'
-                            }
-
-                            # Validate required fields
-                            if not proxy_entry['ip'] or not proxy_entry['port']:
-                                logger.warning(f"Skipping proxy with missing required fields: {proxy_entry}")
-                                continue
-
-                            proxies.append(proxy_entry)
-                        except Exception as e:
-                            logger.debug(f"Error processing proxy entry: {str(e)}", exc_info=True)
-                            continue
-
-                    logger.info(f"Found {len(proxies)} proxies from geonode.com")
-                    break  # Success, exit retry loop
-
-                except json.JSONDecodeError as e:
-                    logger.error(f"Error parsing geonode.com API response: {str(e)}")
-                    break
-                except Exception as e:
-                    logger.error(f"Error processing geonode.com API response: {str(e)}")
-                    logger.debug(f"Error details: {str(e)}", exc_info=True)
-                    break
-
+                proxies.append(proxy_entry)
             except Exception as e:
-                logger.error(f"Error fetching from geonode.com (attempt {attempt + 1}/{max_retries}): {str(e)}")
-                logger.debug(f"Error details: {str(e)}", exc_info=True)
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay)
-                    retry_delay *= 2
+                logger.debug(f"Error processing proxy entry: {str(e)}", exc_info=True)
+                continue
 
+        logger.info(f"Found {len(proxies)} proxies from geonode.com")
         return proxies
@@ -0,0 +1,182 @@
+import json
+import os
+import threading
+import time
+from typing import List, Dict, Optional
+from ..logger import logger
+from ..ratelimit import Backoff
+
+DEFAULT_HEALTH_FILE = 'proxy_list/source_health.json'
+
+
+class SourceHealth:
+    """Fetch and validation statistics of one proxy source"""
+
+    __slots__ = ('fetches', 'errors', 'fetched', 'probed', 'working', 'latency',
+                 'consecutive_failures', 'backoff_until')
+
+    def __init__(self, fetches: int = 0, errors: int = 0, fetched: int = 0, probed: int = 0,
+                 working: int = 0, latency: Optional[float] = None, consecutive_failures: int = 0,
+                 backoff_until: float = 0.0):
+        self.fetches = fetches
+        self.errors = errors
+        self.fetched = fetched
+        self.probed = probed
+        self.working = working
+        self.latency = latency
+        self.consecutive_failures = consecutive_failures
+        self.backoff_until = backoff_until
+
+    @property
+    def yield_rate(self) -> float:
+        """Share of probed candidates that worked, smoothed towards 0.5 for new sources"""
+        return (self.working + 1) / (self.probed + 2)
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.fetches if self.fetches else 0.0
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class SourceHealthTracker:
+    """Tracks per-source yield, fetch latency and errors across runs
+
+    The yield (working / probed candidates) decides how a candidate
+    budget is split between sources; sources whose fetches fail or return
+    nothing are skipped for an exponentially growing backoff period.
+
+    Args:
+        backoff (Backoff, optional): Skip period after consecutive failed fetches
+        min_share: Smallest weight of a healthy source, so a bad run never starves it for good
+    """
+
+    def __init__(self, backoff: Optional[Backoff] = None, min_share: float = 0.05):
+        self.backoff = backoff or Backoff(base=60.0, max_delay=3600.0)
+        self.min_share = min_share
+        self._lock = threading.Lock()
+        self._sources = {}
+
+    def get(self, source: str) -> SourceHealth:
+        with self._lock:
+            health = self._sources.get(source)
+            if health is None:
+                health = self._sources[source] = SourceHealth()
+            return health
+
+    def record_fetch(self, source: str, count: int, latency: float, error: bool = False,
+                     now: Optional[float] = None) -> None:
+        """Record one fetch; errors and empty results count as failures"""
+        now = time.time() if now is None else now
+        health = self.get(source)
+        with self._lock:
+            health.fetches += 1
+            health.fetched += count
+            health.latency = latency if health.latency is None else 0.7 * health.latency + 0.3 * latency
+            if error:
+                health.errors += 1
+            if error or not count:
+                health.consecutive_failures += 1
+                delay = self.backoff.delay(health.consecutive_failures - 1)
+                health.backoff_until = now + delay
+                logger.warning(f"Source {source} failed {health.consecutive_failures} times, "
+                               f"skipping it for {delay:.0f} seconds")
+            else:
+                health.consecutive_failures = 0
+                health.backoff_until = 0.0
+
+    def record_probe(self, source: Optional[str], alive: bool) -> None:
+        if not source:
+            return
+        health = self.get(source)
+        with self._lock:
+            health.probed += 1
+            health.working += 1 if alive else 0
+
+    def is_available(self, source: str, now: Optional[float] = None) -> bool:
+        """False while a failing source is backed off"""
+        now = time.time() if now is None else now
+        with self._lock:
+            health = self._sources.get(source)
+            return health is None or health.backoff_until <= now
+
+    def weights(self, sources: List[str]) -> Dict[str, float]:
+        """Normalized share of the budget for each source, proportional to its yield"""
+        if not sources:
+            return {}
+        rates = {source: self.get(source).yield_rate for source in sources}
+        total = sum(rates.values())
+        weights = {source: max(rate / total, self.min_share) for source, rate in rates.items()}
+        total = sum(weights.values())
+        return {source: weight / total for source, weight in weights.items()}
+
+    def allocate(self, budget: int, available: Dict[str, int]) -> Dict[str, int]:
+        """Split budget candidates between sources by weight
+
+        Args:
+            budget: Total number of candidates to take
+            available: Number of candidates each source returned
+
+        Returns:
+            Dict[str, int]: Candidates to take from each source; what a source cannot
+            fill is handed to the others
+        """
+        allocation = {source: 0 for source in available}
+        remaining = min(budget, sum(available.values()))
+        open_sources = [source for source, count in available.items() if count]
+        while remaining > 0 and open_sources:
+            weights = self.weights(open_sources)
+            shares = {source: remaining * weights[source] for source in open_sources}
+            grants = {source: min(int(share), available[source] - allocation[source])
+                      for source, share in shares.items()}
+            # Hand out rounding leftovers by largest remainder
+            leftover = remaining - sum(grants.values())
+            for source in sorted(open_sources, key=lambda s: shares[s] - int(shares[s]), reverse=True):
+                if leftover <= 0:
+                    break
+                if grants[source] < available[source] - allocation[source]:
+                    grants[source] += 1
+                    leftover -= 1
+            for source, grant in grants.items():
+                allocation[source] += grant
+                remaining -= grant
+            open_sources = [source for source in open_sources if allocation[source] < available[source]]
+            if not any(grants.values()):
+                break
+        return allocation
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            sources = dict(self._sources)
+        return {source: dict(health.to_dict(), yield_rate=round(health.yield_rate, 4),
+                             error_rate=round(health.error_rate, 4))
+                for source, health in sources.items()}
+
+    def save(self, path: str) -> None:
+        """Persist the statistics so weighting carries over to the next process"""
+        with self._lock:
+            data = {source: health.to_dict() for source, health in self._sources.items()}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(data, f)
+
+    def load(self, path: str) -> int:
+        """Restore statistics written by save(); returns the number of sources loaded"""
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.debug(f"No source health loaded from {path}: {str(e)}")
+            return 0
+        with self._lock:
+            for source, fields in data.items():
+                self._sources[source] = SourceHealth(**{k: v for k, v in fields.items()
+                                                        if k in SourceHealth.__slots__})
+        return len(data)
+
+
+# Shared by every manager and validator run in the process
+source_health = SourceHealthTracker()
@@ -1,39 +1,151 @@
-from typing import List, Dict
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional
 from .free_proxy_list import FreeProxyListSource
+from .freshness import order_by_liveness
 from .geonode import GeoNodeSource
+from .health import SourceHealthTracker, source_health
 from ..logger import logger
 
 class ProxySourceManager:
-    """Manages multiple proxy sources"""
+    """Manages multiple proxy sources
 
-    def __init__(self):
+    Args:
+        health (SourceHealthTracker, optional): Per-source statistics used to weight and
+            back off sources, shared by the whole process by default
+    """
+
+    # Yield, latency and errors of every source across runs
+    health = source_health
+
+    def __init__(self, health: Optional[SourceHealthTracker] = None):
         self.sources = [
             FreeProxyListSource(),
             GeoNodeSource()
         ]
+        if health is not None:
+            self.health = health
+
+    @staticmethod
+    def source_name(source) -> str:
+        return source.__class__.__name__
+
+    def _fetched(self, source, proxies, started) -> List[Dict[str, str]]:
+        if not proxies and source.last_error is not None:
+            # The source swallowed a request error and returned nothing
+            return self._fetch_failed(source, source.last_error, started)
+        name = self.source_name(source)
+        for proxy in proxies:
+            proxy.setdefault('source', name)
+        logger.debug(f"Fetched {len(proxies)} proxies from {name}")
+        self.health.record_fetch(name, len(proxies), time.monotonic() - started)
+        return proxies
+
+    def _fetch_failed(self, source, error, started) -> List[Dict[str, str]]:
+        name = self.source_name(source)
+        logger.error(f"Error fetching from {name}: {str(error)}")
+        self.health.record_fetch(name, 0, time.monotonic() - started, error=True)
+        return []
+
+    def _fetch_source(self, source) -> List[Dict[str, str]]:
+        started = time.monotonic()
+        source.last_error = None
+        try:
+            return self._fetched(source, source.fetch(), started)
+        except Exception as e:
+            return self._fetch_failed(source, e, started)
+
+    async def _afetch_source(self, source) -> List[Dict[str, str]]:
+        started = time.monotonic()
+        source.last_error = None
+        try:
+            return self._fetched(source, await source.afetch(), started)
+        except Exception as e:
+            return self._fetch_failed(source, e, started)
+
+    def _available_sources(self) -> List:
+        sources = [s for s in self.sources if self.health.is_available(self.source_name(s))]
+        if not sources and self.sources:
+            # Never come back empty handed: try the source whose backoff ends first
+            source = min(self.sources, key=lambda s: self.health.get(self.source_name(s)).backoff_until)
+            logger.info(f"All sources are backed off, trying {self.source_name(source)} anyway")
+            return [source]
+        if len(sources) < len(self.sources):
+            logger.info(f"Skipping {len(self.sources) - len(sources)} backed off sources")
+        return sources
 
-    def fetch_all(self, max_proxies: int = 50) -> List[Dict[str, str]]:
+    def fetch_all(self, max_proxies: int = 50, interleave: bool = False) -> List[Dict[str, str]]:
         """Fetch proxies from all sources
 
+        Sources that keep failing are skipped while they are backed off; when
+        every source is backed off, the one whose backoff ends first is tried.
+        When there are more candidates than max_proxies, the budget is split
+        between sources in proportion to how many of their candidates turned
+        out to work, and the best yielding sources come first. Within a source
+        the most recently checked, highest-uptime candidates come first.
+
         Args:
-            max_proxies: Maximum number of total proxies to return
+            max_proxies: Maximum number of total proxies to return, 0 for no limit
+            interleave: Mix the sources' candidates in proportion to their yield instead
+                of listing them source by source, so any prefix is a representative sample
 
         Returns:
             List of proxy dictionaries
         """
-        all_proxies = []
+        sources = self._available_sources()
+
+        # Sources are fetched concurrently so one rate-limited source does not hold up the others
+        results = []
+        if sources:
+            with ThreadPoolExecutor(max_workers=len(sources)) as executor:
+                results = list(executor.map(self._fetch_source, sources))
+        return self._combine(sources, results, max_proxies, interleave)
+
+    async def afetch_all(self, max_proxies: int = 50, interleave: bool = False) -> List[Dict[str, str]]:
+        """Fetch proxies from all sources concurrently on the running event loop
 
-        for source in self.sources:
-            try:
-                proxies = source.fetch()
-                all_proxies.extend(proxies)
-                logger.debug(f"Fetched {len(proxies)} proxies from {source.__class__.__name__}")
-            except Exception as e:
-                logger.error(f"Error fetching from {source.__class__.__name__}: {str(e)}")
+        Same budget, weighting and backoff rules as fetch_all().
+        """
+        sources = self._available_sources()
+        results = await asyncio.gather(*(self._afetch_source(source) for source in sources))
+        return self._combine(sources, results, max_proxies, interleave)
+
+    def _combine(self, sources, results, max_proxies, interleave) -> List[Dict[str, str]]:
+        fetched = {}
+        for source, proxies in zip(sources, results):
+            fetched.setdefault(self.source_name(source), []).extend(proxies)
+        # Freshest, highest-uptime candidates first, so a source's share of the budget takes those
+        fetched = {name: order_by_liveness(proxies) for name, proxies in fetched.items()}
 
-        # Apply max_proxies limit to total proxies
-        if max_proxies > 0 and len(all_proxies) > max_proxies:
-            all_proxies = all_proxies[:max_proxies]
-            logger.debug(f"Limited total proxies to {max_proxies}")
+        # Apply max_proxies limit to total proxies, spending it where proxies actually work
+        total = sum(len(proxies) for proxies in fetched.values())
+        if max_proxies > 0 and total > max_proxies:
+            allocation = self.health.allocate(max_proxies, {name: len(p) for name, p in fetched.items()})
+            logger.debug(f"Limited total proxies to {max_proxies}: {allocation}")
+            fetched = {name: proxies[:allocation[name]] for name, proxies in fetched.items()}
 
+        weights = self.health.weights(list(fetched))
+        if interleave:
+            return self.interleave(fetched, weights)
+        all_proxies = []
+        for name in sorted(fetched, key=lambda name: weights[name], reverse=True):
+            all_proxies.extend(fetched[name])
         return all_proxies
+
+    @staticmethod
+    def interleave(fetched: Dict[str, List[Dict]], weights: Dict[str, float]) -> List[Dict[str, str]]:
+        """Merge per-source candidate lists by smooth weighted round robin"""
+        queues = {name: list(reversed(proxies)) for name, proxies in fetched.items() if proxies}
+        current = {name: 0.0 for name in queues}
+        merged = []
+        while queues:
+            total = sum(weights[name] for name in queues)
+            for name in queues:
+                current[name] += weights[name]
+            name = max(queues, key=lambda n: current[n])
+            current[name] -= total
+            merged.append(queues[name].pop())
+            if not queues[name]:
+                del queues[name]
+        return merged
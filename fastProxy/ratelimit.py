@@ -0,0 +1,224 @@
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    """Thread-safe token bucket
+
+    Tokens refill at ``rate`` per second up to ``capacity``. Callers either
+    block in acquire(), await acquire_async() so other coroutines keep
+    running, or poll try_acquire() for the time they would have to wait.
+    penalize() empties the bucket for a while, e.g. after a 429.
+
+    Args:
+        rate: Tokens added per second
+        capacity: Largest burst, defaults to one second worth of tokens (at least 1)
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.throttled = 0
+        self.penalties = 0
+        self.wait_time = 0.0
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Take tokens if available
+
+        Returns:
+            float: 0 when the tokens were taken, otherwise seconds until they may be
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self._blocked_until:
+                return self._blocked_until - now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                self.acquired += 1
+                return 0.0
+            return (tokens - self._tokens) / self.rate if self.rate > 0 else float('inf')
+
+    def _deadline(self, timeout):
+        return None if timeout is None else time.monotonic() + timeout
+
+    def _next_wait(self, tokens, deadline, waited):
+        wait = self.try_acquire(tokens)
+        if wait == 0:
+            return 0.0, waited
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None, waited
+            wait = min(wait, remaining)
+        if not waited:
+            with self._lock:
+                self.throttled += 1
+        return wait, True
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Block until tokens are available; False if timeout expired first"""
+        deadline = self._deadline(timeout)
+        started = time.monotonic()
+        waited = False
+        while True:
+            wait, waited = self._next_wait(tokens, deadline, waited)
+            if not wait:
+                self._count_wait(started, waited)
+                return wait is not None
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Like acquire(), but sleeps with asyncio so other tasks keep running"""
+        deadline = self._deadline(timeout)
+        started = time.monotonic()
+        waited = False
+        while True:
+            wait, waited = self._next_wait(tokens, deadline, waited)
+            if not wait:
+                self._count_wait(started, waited)
+                return wait is not None
+            await asyncio.sleep(wait)
+
+    def _count_wait(self, started, waited):
+        if waited:
+            with self._lock:
+                self.wait_time += time.monotonic() - started
+
+    def penalize(self, seconds: float) -> None:
+        """Hand out no tokens for the next seconds (e.g. a Retry-After)"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+            self.penalties += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                'rate': self.rate,
+                'capacity': self.capacity,
+                'tokens': round(self._tokens, 3),
+                'acquired': self.acquired,
+                'throttled': self.throttled,
+                'penalties': self.penalties,
+                'wait_time': round(self.wait_time, 3)
+            }
+
+
+class HostRateLimiter:
+    """One TokenBucket per host, shared by every source fetching from it
+
+    Args:
+        rate: Default requests per second per host
+        capacity: Default burst per host
+        limits: Per-host overrides as {host: (rate, capacity)}
+    """
+
+    def __init__(self, rate: float = 1.0, capacity: float = 10.0, limits: Optional[Dict] = None):
+        self.rate = rate
+        self.capacity = capacity
+        self.limits = dict(limits or {})
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        return (urlsplit(url).hostname or url).lower()
+
+    def bucket(self, url: str) -> TokenBucket:
+        """Bucket of the host of a URL (or of a bare host name)"""
+        host = self.host_of(url) if '://' in url else url.lower()
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                rate, capacity = self.limits.get(host, (self.rate, self.capacity))
+                bucket = self._buckets[host] = TokenBucket(rate, capacity)
+            return bucket
+
+    def set_limit(self, host: str, rate: float, capacity: Optional[float] = None) -> None:
+        """Change the limit of a host, e.g. once its real limit is known"""
+        with self._lock:
+            self.limits[host.lower()] = (rate, capacity)
+            self._buckets.pop(host.lower(), None)
+
+    def acquire(self, url: str, timeout: Optional[float] = None) -> bool:
+        return self.bucket(url).acquire(timeout=timeout)
+
+    async def acquire_async(self, url: str, timeout: Optional[float] = None) -> bool:
+        return await self.bucket(url).acquire_async(timeout=timeout)
+
+    def penalize(self, url: str, seconds: float) -> None:
+        self.bucket(url).penalize(seconds)
+
+    def stats(self) -> Dict[str, Dict]:
+        """Counters of every host seen so far"""
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {host: bucket.stats() for host, bucket in buckets.items()}
+
+
+class Backoff:
+    """Jittered exponential backoff
+
+    The n-th retry waits between half and all of ``base * factor**n``
+    (capped at ``max_delay``), so concurrent clients spread out instead of
+    retrying in lockstep. A server supplied Retry-After is a lower bound.
+    """
+
+    def __init__(self, base: float = 1.0, factor: float = 2.0, max_delay: float = 60.0, max_retries: int = 3):
+        self.base = base
+        self.factor = factor
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait before retry number attempt (0-based)"""
+        ceiling = min(self.max_delay, self.base * self.factor ** attempt)
+        delay = ceiling / 2 + random.uniform(0, ceiling / 2)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    def sleep(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        delay = self.delay(attempt, retry_after)
+        time.sleep(delay)
+        return delay
+
+    async def sleep_async(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        delay = self.delay(attempt, retry_after)
+        await asyncio.sleep(delay)
+        return delay
+
+
+def retry_after_seconds(response) -> Optional[float]:
+    """Parse the Retry-After header of a response (seconds or HTTP date)"""
+    value = getattr(response, 'headers', {}).get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# Shared by all proxy sources, so several fetchers of one host respect a single limit
+shared_limiter = HostRateLimiter()
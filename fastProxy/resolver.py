@@ -0,0 +1,120 @@
+import ipaddress
+import socket
+import threading
+import time
+from typing import List, Tuple
+from .logger import logger
+
+
+def ip_literal(host: str):
+    """Return the parsed address if host is an IPv4/IPv6 literal, else None"""
+    try:
+        return ipaddress.ip_address(host.strip('[]'))
+    except ValueError:
+        return None
+
+
+class ResolverCache:
+    """Thread-safe getaddrinfo cache shared by all probe and source connections
+
+    IP literals, which is what every proxy address from the sources is, are
+    turned into socket addresses without calling the resolver at all. Host
+    names (source and judge hosts) are resolved once per ``ttl`` seconds;
+    concurrent lookups of the same name wait for a single resolver call, and
+    failures are remembered for ``negative_ttl`` seconds so a broken name
+    does not hit the local resolver on every probe.
+    """
+
+    def __init__(self, ttl: float = 300.0, negative_ttl: float = 30.0, max_entries: int = 4096):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._pending = {}
+        self.hits = 0
+        self.misses = 0
+        self.literals = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def resolve(self, host: str, port: int, family: int = socket.AF_UNSPEC,
+                type: int = socket.SOCK_STREAM) -> List[Tuple]:
+        """Cached replacement for socket.getaddrinfo(host, port, family, type)
+
+        Returns:
+            List[Tuple]: getaddrinfo style (family, type, proto, canonname, sockaddr) entries
+        """
+        address = ip_literal(host)
+        if address is not None:
+            with self._lock:
+                self.literals += 1
+            return [self._literal_entry(address, port, family, type)]
+
+        key = (host.lower(), family, type)
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > time.monotonic():
+                    self.hits += 1
+                    return self._with_port(entry[1], port)
+                pending = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = threading.Event()
+                    self.misses += 1
+                    break
+            # Another thread is already resolving this name
+            pending.wait()
+
+        try:
+            try:
+                result = socket.getaddrinfo(host, 0, family, type)
+                expires = time.monotonic() + self.ttl
+            except socket.gaierror as e:
+                logger.debug(f"Failed to resolve {host}: {str(e)}")
+                result = e
+                expires = time.monotonic() + self.negative_ttl
+            with self._lock:
+                self._store(key, expires, result)
+        finally:
+            with self._lock:
+                self._pending.pop(key).set()
+        return self._with_port(result, port)
+
+    def _store(self, key, expires, result):
+        if key not in self._entries and len(self._entries) >= self.max_entries:
+            now = time.monotonic()
+            for stale in [k for k, (exp, _) in self._entries.items() if exp <= now]:
+                del self._entries[stale]
+            while len(self._entries) >= self.max_entries:
+                del self._entries[next(iter(self._entries))]
+        self._entries[key] = (expires, result)
+
+    @staticmethod
+    def _with_port(result, port):
+        if isinstance(result, Exception):
+            # A fresh error per lookup; re-raising the cached one would grow its traceback forever
+            raise socket.gaierror(*result.args)
+        return [(af, socktype, proto, canon, (sa[0], port) + tuple(sa[2:]))
+                for af, socktype, proto, canon, sa in result]
+
+    @staticmethod
+    def _literal_entry(address, port, family, type):
+        if address.version == 4:
+            af, sockaddr = socket.AF_INET, (str(address), port)
+        else:
+            af, sockaddr = socket.AF_INET6, (str(address), port, 0, 0)
+        if family not in (socket.AF_UNSPEC, af):
+            raise socket.gaierror(socket.EAI_FAMILY, f"{address} does not match the requested address family")
+        proto = socket.IPPROTO_TCP if type == socket.SOCK_STREAM else 0
+        return af, type, proto, '', sockaddr
+
+
+# Shared by every connection of the fastProxy.net sessions
+default_resolver = ResolverCache()
@@ -0,0 +1,244 @@
+import heapq
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Dict, Optional, Iterable
+from urllib.parse import urlsplit
+from .logger import logger
+from .pool import proxy_id
+
+# Response codes that put a proxy on cooldown for the domain that sent them
+COOLDOWN_STATUSES = {403, 429}
+
+
+def domain_of(target: str) -> str:
+    """Return the lower-cased host name of a URL or bare domain"""
+    if '://' in target:
+        return (urlsplit(target).hostname or '').lower()
+    return target.split('/', 1)[0].rsplit(':', 1)[0].lower()
+
+
+class ProxyRotator:
+    """Hands out validated proxies per target domain
+
+    Every domain gets its own round-robin deque of proxies, built in score
+    order from the pool when the domain is first seen. Proxies that hit
+    their concurrency cap are skipped; proxies that were rate limited or
+    blocked by a domain are dropped from that domain's deque and put on a
+    heap of cooldown expiries, and only rejoin the deque once the cooldown
+    ends. Requests that carry a session key keep getting the same proxy
+    for ``sticky_ttl`` seconds as long as it stays usable.
+
+    Adding or removing proxies only bumps a version; each domain's deque
+    catches up the next time that domain is used, and the least recently
+    used domains are forgotten beyond ``max_domains``.
+
+    Args:
+        proxies: Working proxies as returned by fetch_proxies
+        pool (ProxyPool, optional): Orders proxies by score and receives request outcomes
+        max_concurrency: Requests a single proxy may serve at the same time
+        cooldown: First cooldown in seconds after a 403/429, doubled on repeats
+        max_cooldown: Upper bound of the cooldown
+        sticky_ttl: Seconds a session stays bound to its proxy after its last use
+        max_domains: Domains whose rotation state is kept, least recently used ones are evicted
+    """
+
+    # Expired sessions are purged once this many are tracked
+    MAX_SESSIONS = 10000
+
+    def __init__(self, proxies: Optional[Iterable[Dict]] = None, pool=None, max_concurrency: int = 4,
+                 cooldown: float = 60.0, max_cooldown: float = 3600.0, sticky_ttl: float = 600.0,
+                 max_domains: int = 1024):
+        self.pool = pool
+        self.max_concurrency = max_concurrency
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.sticky_ttl = sticky_ttl
+        self.max_domains = max_domains
+        self._lock = threading.RLock()
+        self._proxies = {}
+        self._order = []
+        # Bumped whenever proxies are added or removed
+        self._version = 0
+        self._in_flight = {}
+        # Domain -> [deque, version it was synced at], least recently used first
+        self._domains = OrderedDict()
+        self._cooling = {}
+        self._strikes = {}
+        self._expiries = []
+        # Domain -> proxies taken out of its deque while cooling down
+        self._dropped = {}
+        self._sticky = {}
+        if proxies:
+            self.update(proxies)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._proxies)
+
+    def update(self, proxies: Iterable[Dict]) -> None:
+        """Add newly validated proxies, keeping the state of known ones"""
+        proxies = list(proxies)
+        if self.pool is not None:
+            proxies = self.pool.rank(proxies)
+        with self._lock:
+            for proxy_info in proxies:
+                key = proxy_id(proxy_info)
+                if key not in self._proxies:
+                    self._order.append(key)
+                    self._in_flight.setdefault(key, 0)
+                    self._version += 1
+                self._proxies[key] = dict(proxy_info)
+
+    def remove(self, proxy: str) -> None:
+        """Stop handing out a proxy"""
+        with self._lock:
+            if self._proxies.pop(proxy, None) is not None:
+                self._order.remove(proxy)
+                self._in_flight.pop(proxy, None)
+                self._version += 1
+
+    def _domain_queue(self, domain):
+        entry = self._domains.get(domain)
+        if entry is None:
+            entry = self._domains[domain] = [deque(self._order), self._version]
+            if len(self._domains) > self.max_domains:
+                evicted, _ = self._domains.popitem(last=False)
+                self._dropped.pop(evicted, None)
+        else:
+            self._domains.move_to_end(domain)
+            if entry[1] != self._version:
+                self._sync(domain, entry)
+        return entry[0]
+
+    def _sync(self, domain, entry):
+        """Bring a domain's deque up to date with proxies added or removed since it was used"""
+        dropped = self._dropped.get(domain, set())
+        dropped &= self._proxies.keys()
+        # Keeps the rotation position; proxies removed and added again appear once
+        queue = deque(proxy for proxy in entry[0] if proxy in self._proxies)
+        known = set(queue) | dropped
+        queue.extend(proxy for proxy in self._order if proxy not in known)
+        entry[0], entry[1] = queue, self._version
+
+    def _expire_cooldowns(self, now):
+        while self._expiries and self._expiries[0][0] <= now:
+            expires, proxy, domain = heapq.heappop(self._expiries)
+            # Skip heap entries superseded by a later cooldown
+            if self._cooling.get((proxy, domain)) != expires:
+                continue
+            del self._cooling[(proxy, domain)]
+            dropped = self._dropped.get(domain)
+            if dropped and proxy in dropped:
+                dropped.discard(proxy)
+                # Evicted domains rebuild their deque from scratch when used again
+                if proxy in self._proxies and domain in self._domains:
+                    self._domain_queue(domain).append(proxy)
+
+    def _usable(self, proxy, domain):
+        return proxy in self._proxies and (proxy, domain) not in self._cooling \
+            and self._in_flight[proxy] < self.max_concurrency
+
+    def acquire(self, target: str, session: Optional[str] = None) -> Optional[Dict]:
+        """Pick a proxy for a request to target
+
+        Args:
+            target: URL or domain the request goes to
+            session: Optional session key for sticky assignment
+
+        Returns:
+            Dict: Proxy info of the assigned proxy, None if every proxy is busy or cooling down
+        """
+        domain = domain_of(target)
+        now = time.monotonic()
+        with self._lock:
+            self._expire_cooldowns(now)
+            if session is not None:
+                sticky = self._sticky.pop((domain, session), None)
+                # Sessions whose proxy is blocked, removed or busy move to another one
+                if sticky is not None and sticky[1] > now and self._usable(sticky[0], domain):
+                    return self._lease(sticky[0], domain, session, now)
+                if len(self._sticky) > self.MAX_SESSIONS:
+                    self._sticky = {k: v for k, v in self._sticky.items() if v[1] > now}
+
+            queue = self._domain_queue(domain)
+            for _ in range(len(queue)):
+                proxy = queue.popleft()
+                if (proxy, domain) in self._cooling:
+                    # Rejoins the deque when its cooldown expires
+                    self._dropped.setdefault(domain, set()).add(proxy)
+                    continue
+                queue.append(proxy)
+                if self._in_flight[proxy] < self.max_concurrency:
+                    return self._lease(proxy, domain, session, now)
+        logger.debug(f"No proxy available for {domain}")
+        return None
+
+    def _lease(self, proxy, domain, session, now):
+        self._in_flight[proxy] += 1
+        if session is not None:
+            self._sticky[(domain, session)] = (proxy, now + self.sticky_ttl)
+        return dict(self._proxies[proxy])
+
+    def release(self, proxy, target: str, status: Optional[int] = None, error: bool = False,
+                latency: Optional[float] = None) -> None:
+        """Return a proxy after the request finished
+
+        Args:
+            proxy: Proxy info returned by acquire, or its ip:port
+            target: URL or domain the request went to
+            status: HTTP status of the response, 403/429 put the proxy on cooldown for the domain
+            error: Whether the request failed at the proxy (connection error, timeout)
+            latency: Request latency in milliseconds, fed to the pool
+        """
+        key = proxy if isinstance(proxy, str) else proxy_id(proxy)
+        domain = domain_of(target)
+        with self._lock:
+            if key in self._in_flight and self._in_flight[key] > 0:
+                self._in_flight[key] -= 1
+            if status in COOLDOWN_STATUSES:
+                self._start_cooldown(key, domain, time.monotonic())
+            elif not error:
+                self._strikes.pop((key, domain), None)
+        if self.pool is not None and (error or status is not None):
+            self.pool.record(key, alive=not error, latency=None if error else latency)
+
+    def _start_cooldown(self, proxy, domain, now):
+        strikes = self._strikes.get((proxy, domain), 0)
+        self._strikes[(proxy, domain)] = strikes + 1
+        expires = now + min(self.cooldown * 2 ** strikes, self.max_cooldown)
+        self._cooling[(proxy, domain)] = expires
+        heapq.heappush(self._expiries, (expires, proxy, domain))
+        logger.debug(f"Proxy {proxy} cooling down for {domain} until +{expires - now:.0f}s")
+
+    @contextmanager
+    def lease(self, target: str, session: Optional[str] = None):
+        """Context manager around acquire()/release()
+
+        Yields the proxy info, or None when no proxy is available. Failed
+        requests are reported when the block raises; set ``status`` on the
+        yielded dict to report rate limiting.
+        """
+        proxy = self.acquire(target, session)
+        started = time.perf_counter()
+        try:
+            yield proxy
+        except Exception:
+            if proxy is not None:
+                self.release(proxy, target, error=True)
+            raise
+        else:
+            if proxy is not None:
+                self.release(proxy, target, status=proxy.get('status'),
+                             latency=round((time.perf_counter() - started) * 1000, 1))
+
+    def stats(self) -> Dict:
+        """In-flight requests per proxy and the number of cooling proxy/domain pairs"""
+        with self._lock:
+            return {
+                'proxies': len(self._proxies),
+                'in_flight': {p: n for p, n in self._in_flight.items() if n},
+                'cooling': len(self._cooling),
+                'sessions': len(self._sticky)
+            }
@@ -0,0 +1,213 @@
+import heapq
+import itertools
+import math
+import threading
+import time
+from typing import List, Dict, Optional, Iterable
+from .logger import logger
+from .pool import ProxyPool, proxy_id
+from .ratelimit import TokenBucket
+from .snapshot import to_candidate
+
+
+class RevalidationScheduler:
+    """Keeps a large pool fresh within a fixed probe budget
+
+    Every known proxy sits in a heap keyed on the time it is due for
+    revalidation. The due time comes from the pool: the last check plus
+    the ReliabilityScore's check interval, which is short for uncertain
+    proxies (success rate near 0.5, few checks, flapping) and long for
+    stable ones. step() probes the most overdue proxies, but never more
+    than ``budget`` per second on average, so a pool of 50k proxies is
+    refreshed continuously instead of being re-scanned every cycle.
+
+    run() does not wait for a batch before starting the next one: every
+    batch is validated in its own thread, so dead proxies waiting out their
+    timeout do not hold the probe rate below the budget. About budget x
+    request_timeout probes are then in flight at a time.
+
+    Args:
+        pool (ProxyPool, optional): Supplies due times and records outcomes
+        validator (ProxyValidator, optional): Probes due proxies, built without CSV output by default,
+            with enough threads to probe a whole batch at once
+        budget: Probes per second
+        burst: Largest batch of probes started at once, defaults to one second of budget
+    """
+
+    def __init__(self, pool: Optional[ProxyPool] = None, validator=None, budget: float = 10.0,
+                 burst: Optional[float] = None):
+        self.pool = pool if pool is not None else ProxyPool()
+        self.validator = validator
+        self.budget = TokenBucket(budget, burst)
+        self._lock = threading.Lock()
+        self._heap = []
+        self._due = {}
+        self._candidates = {}
+        self._counter = itertools.count()
+        self._stop = threading.Event()
+        # Batches validated by run() in the background
+        self._batches = set()
+        self.probed = 0
+        self.alive = 0
+        self.lag = 0.0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._candidates)
+
+    def _push(self, key, due):
+        # Superseded heap entries are skipped when popped
+        self._due[key] = due
+        heapq.heappush(self._heap, (due, next(self._counter), key))
+
+    def add(self, proxies: Iterable[Dict], now: Optional[float] = None) -> int:
+        """Schedule candidates or working proxies; never checked ones are due immediately
+
+        Returns:
+            int: Number of proxies that were not scheduled yet
+        """
+        now = time.time() if now is None else now
+        added = 0
+        with self._lock:
+            for proxy in proxies:
+                candidate = proxy if 'ip' in proxy else to_candidate(proxy)
+                key = proxy_id(candidate)
+                if key not in self._candidates:
+                    added += 1
+                    due = self.pool.due_at(key, now)
+                    self._push(key, now if due is None else due)
+                self._candidates[key] = candidate
+        return added
+
+    def remove(self, proxy: str) -> None:
+        with self._lock:
+            self._candidates.pop(proxy, None)
+            self._due.pop(proxy, None)
+
+    def next_due(self) -> Optional[float]:
+        """Due time of the most urgent proxy, None when nothing is scheduled"""
+        with self._lock:
+            self._discard_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def _discard_stale(self):
+        while self._heap and self._due.get(self._heap[0][2]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def due(self, now: Optional[float] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Pop the due proxies, most overdue first, at most limit of them"""
+        now = time.time() if now is None else now
+        batch = []
+        with self._lock:
+            while limit is None or len(batch) < limit:
+                self._discard_stale()
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                due, _, key = heapq.heappop(self._heap)
+                del self._due[key]
+                self.lag = max(self.lag, now - due)
+                batch.append(self._candidates[key])
+        return batch
+
+    def _reschedule(self, batch, now):
+        with self._lock:
+            for candidate in batch:
+                key = proxy_id(candidate)
+                if key in self._candidates and key not in self._due:
+                    due = self.pool.due_at(key, now)
+                    self._push(key, now + self.pool.max_interval if due is None else due)
+
+    def _take(self, now: float) -> List[Dict]:
+        """Pop as many due proxies as the budget allows right now"""
+        batch = []
+        while len(batch) < self.budget.capacity:
+            next_due = self.next_due()
+            if next_due is None or next_due > now or self.budget.try_acquire() > 0:
+                break
+            batch.extend(self.due(now, 1))
+        return batch
+
+    def _validate(self, batch: List[Dict]) -> List[Dict]:
+        if self.validator is None:
+            from .fastProxy import ProxyValidator
+            # A whole batch is probed at once, so slow and dead proxies cost one timeout per batch
+            self.validator = ProxyValidator(thread_count=max(1, int(math.ceil(self.budget.capacity))), write_csv=False)
+        working = []
+        try:
+            working = self.validator.run(proxies=batch, pool=self.pool)
+        except Exception as e:
+            logger.error(f"Error revalidating {len(batch)} proxies: {str(e)}")
+        finally:
+            self._reschedule(batch, time.time())
+        with self._lock:
+            self.probed += len(batch)
+            self.alive += len(working)
+        logger.debug(f"Revalidated {len(batch)} proxies, {len(working)} working")
+        return working
+
+    def step(self, now: Optional[float] = None) -> List[Dict]:
+        """Probe as many due proxies as the budget allows right now and wait for the result
+
+        Returns:
+            List[Dict]: Proxies of the batch that are working
+        """
+        batch = self._take(time.time() if now is None else now)
+        return self._validate(batch) if batch else []
+
+    def _submit(self, batch: List[Dict]) -> None:
+        """Validate a batch in the background"""
+        def validate():
+            try:
+                self._validate(batch)
+            finally:
+                with self._lock:
+                    self._batches.discard(thread)
+
+        thread = threading.Thread(target=validate, daemon=True)
+        with self._lock:
+            self._batches.add(thread)
+        thread.start()
+
+    def run(self, duration: Optional[float] = None) -> None:
+        """Revalidate continuously until stop() is called or duration seconds passed
+
+        Batches still being probed when the run ends are waited for.
+        """
+        self._stop.clear()
+        end = time.monotonic() + duration if duration is not None else None
+        while not self._stop.is_set():
+            if end is not None and time.monotonic() >= end:
+                break
+            batch = self._take(time.time())
+            if batch:
+                self._submit(batch)
+            next_due = self.next_due()
+            wait = 1.0 if next_due is None else next_due - time.time()
+            if wait <= 0:
+                # Proxies are overdue, so the budget is what holds them back
+                wait = 1.0 / self.budget.rate if self.budget.rate > 0 else 1.0
+            if end is not None:
+                wait = min(wait, max(end - time.monotonic(), 0.0))
+            self._stop.wait(max(min(wait, 1.0), 0.01))
+        with self._lock:
+            batches = list(self._batches)
+        for thread in batches:
+            thread.join()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self, now: Optional[float] = None) -> Dict:
+        now = time.time() if now is None else now
+        with self._lock:
+            overdue = sum(1 for due in self._due.values() if due <= now)
+            scheduled = len(self._candidates)
+        return {
+            'scheduled': scheduled,
+            'overdue': overdue,
+            'probed': self.probed,
+            'alive': self.alive,
+            'max_lag': round(self.lag, 3),
+            'batches': len(self._batches),
+            'budget': self.budget.rate
+        }
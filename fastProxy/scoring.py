@@ -0,0 +1,115 @@
+import time
+from typing import Dict, Optional
+
+# Latency at which the latency factor of a score halves (milliseconds)
+LATENCY_REFERENCE = 1000.0
+
+
+class ReliabilityScore:
+    """Time-decayed EWMA of a proxy's success rate and latency
+
+    Every validation moves the averages towards the new observation by
+    ``alpha``. Older evidence additionally fades with ``half_life``, both
+    when a new observation arrives and when the score is read, so a proxy
+    that has not been checked for a while drifts back towards the prior
+    and becomes uncertain again.
+    """
+
+    __slots__ = ('success', 'latency', 'updated_at', 'checks', 'flaps', 'last_alive',
+                 'alpha', 'half_life', 'prior')
+
+    def __init__(self, alpha: float = 0.3, half_life: float = 6 * 3600, prior: float = 0.5,
+                 success: Optional[float] = None, latency: Optional[float] = None,
+                 updated_at: Optional[float] = None, checks: int = 0, flaps: int = 0,
+                 last_alive: Optional[bool] = None):
+        self.alpha = alpha
+        self.half_life = half_life
+        self.prior = prior
+        self.success = prior if success is None else success
+        self.latency = latency
+        self.updated_at = updated_at
+        self.checks = checks
+        self.flaps = flaps
+        self.last_alive = last_alive
+
+    def _decay(self, now: float) -> float:
+        """Weight that evidence recorded at updated_at still carries at now"""
+        if self.updated_at is None:
+            return 0.0
+        return 0.5 ** (max(now - self.updated_at, 0.0) / self.half_life)
+
+    def update(self, alive: bool, latency: Optional[float] = None, now: Optional[float] = None) -> None:
+        """Fold one validation outcome into the score"""
+        now = time.time() if now is None else now
+        keep = (1 - self.alpha) * self._decay(now) if self.checks else 0.0
+        self.success = self.success_rate(now) * keep + (1.0 if alive else 0.0) * (1 - keep)
+        if alive and latency is not None:
+            self.latency = latency if self.latency is None else self.latency * keep + latency * (1 - keep)
+        if self.last_alive is not None and self.last_alive != alive:
+            self.flaps += 1
+        self.last_alive = alive
+        self.checks += 1
+        self.updated_at = now
+
+    def success_rate(self, now: Optional[float] = None) -> float:
+        """Success EWMA, decayed towards the prior since the last check"""
+        now = time.time() if now is None else now
+        weight = self._decay(now)
+        return self.prior + (self.success - self.prior) * weight
+
+    def value(self, now: Optional[float] = None) -> float:
+        """Reliability score in [0, 1]; success rate scaled down by latency"""
+        success = self.success_rate(now)
+        if self.latency is None:
+            return success
+        return success * LATENCY_REFERENCE / (LATENCY_REFERENCE + self.latency)
+
+    def uncertainty(self, now: Optional[float] = None) -> float:
+        """How unsure we are about the proxy, in [0, 1]
+
+        Highest for proxies with a success rate near 0.5, few checks or
+        frequent state changes.
+        """
+        p = self.success_rate(now)
+        spread = 4 * p * (1 - p)
+        flapping = self.flaps / self.checks if self.checks else 1.0
+        return min(1.0, max(spread, flapping, 1.0 / (1 + self.checks)))
+
+    def next_check_interval(self, min_interval: float = 60.0, max_interval: float = 3600.0,
+                            now: Optional[float] = None) -> float:
+        """Seconds until the proxy should be revalidated
+
+        Stable proxies (confidently alive or dead) are checked less often,
+        uncertain ones close to min_interval.
+        """
+        stability = 1.0 - self.uncertainty(now)
+        return min_interval * (max_interval / min_interval) ** stability
+
+    def is_due(self, min_interval: float = 60.0, max_interval: float = 3600.0,
+               now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        if self.updated_at is None:
+            return True
+        return now - self.updated_at >= self.next_check_interval(min_interval, max_interval, now)
+
+    def to_dict(self) -> Dict:
+        return {
+            'success': self.success,
+            'latency': self.latency,
+            'updated_at': self.updated_at,
+            'checks': self.checks,
+            'flaps': self.flaps,
+            'last_alive': self.last_alive
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict, **kwargs) -> 'ReliabilityScore':
+        last_alive = data.get('last_alive')
+        return cls(success=data.get('success'), latency=data.get('latency'),
+                   updated_at=data.get('updated_at'), checks=data.get('checks') or 0,
+                   flaps=data.get('flaps') or 0,
+                   last_alive=None if last_alive is None else bool(last_alive), **kwargs)
+
+    def __repr__(self):
+        return (f"ReliabilityScore(success={self.success:.3f}, latency={self.latency}, "
+                f"checks={self.checks}, flaps={self.flaps})")
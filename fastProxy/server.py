@@ -0,0 +1,275 @@
+import asyncio
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+from .logger import logger
+from .pool import proxy_id
+from .rotation import ProxyRotator
+
+# Hop-by-hop headers that must not be forwarded to the upstream proxy
+HOP_HEADERS = {'proxy-connection', 'connection', 'keep-alive', 'proxy-authorization', 'te', 'upgrade'}
+
+
+class UpstreamError(Exception):
+    """Raised when an upstream proxy fails before anything was sent to the client"""
+
+
+class ForwardProxyServer:
+    """Local asyncio forward proxy that spreads requests over validated proxies
+
+    Clients talk to one local endpoint using plain HTTP (absolute-form
+    requests) or CONNECT. Every request is routed through a proxy handed out
+    by a ProxyRotator; if the upstream fails before a response reached the
+    client, the request is retried on another upstream. Failures are fed back
+    to the rotator (and through it to its ProxyPool), and proxies failing
+    ``max_failures`` times in a row are taken out of rotation.
+
+    Args:
+        rotator (ProxyRotator): Source of upstream proxies, built from fetch_proxies output
+        host: Listen address
+        port: Listen port, 0 picks a free one
+        retries: Additional upstreams tried when one fails
+        timeout: Seconds allowed for connecting to an upstream and for its response head
+        max_failures: Consecutive failures after which a proxy is removed from the rotator
+    """
+
+    def __init__(self, rotator: ProxyRotator, host: str = '127.0.0.1', port: int = 8899,
+                 retries: int = 2, timeout: float = 10.0, max_failures: int = 3):
+        self.rotator = rotator
+        self.host = host
+        self.port = port
+        self.retries = retries
+        self.timeout = timeout
+        self.max_failures = max_failures
+        self._failures = {}
+        self._server = None
+
+    @property
+    def address(self) -> Optional[Tuple[str, int]]:
+        """Bound (host, port) once the server is started"""
+        if self._server is None or not self._server.sockets:
+            return None
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        host, port = self.address
+        logger.info(f"Forward proxy listening on {host}:{port} over {len(self.rotator)} proxies")
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def run(self) -> None:
+        """Serve until interrupted"""
+        try:
+            asyncio.run(self.serve_forever())
+        except KeyboardInterrupt:
+            logger.info("Forward proxy stopped")
+
+    def _report(self, proxy: Dict, target: str, status: Optional[int] = None, error: bool = False,
+                latency: Optional[float] = None) -> None:
+        """Feed an upstream outcome back into the rotator and the failure counts"""
+        self.rotator.release(proxy, target, status=status, error=error, latency=latency)
+        key = proxy_id(proxy)
+        if not error:
+            self._failures.pop(key, None)
+            return
+        self._failures[key] = self._failures.get(key, 0) + 1
+        if self._failures[key] >= self.max_failures:
+            logger.info(f"Removing failing upstream {key} from rotation")
+            self.rotator.remove(key)
+            del self._failures[key]
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self.timeout)
+            request_line, *header_lines = head.decode('latin-1').split('\r\n')
+            method, target, version = request_line.split(' ', 2)
+            headers = [line.split(':', 1) for line in header_lines if ':' in line]
+            if method.upper() == 'CONNECT':
+                await self._connect(target, reader, writer)
+            else:
+                await self._forward(method, target, version, headers, reader, writer)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError,
+                ValueError, ConnectionError) as e:
+            logger.debug(f"Dropping client connection: {e.__class__.__name__}: {str(e)}")
+        except Exception as e:
+            logger.error(f"Error handling proxy request: {str(e)}")
+        finally:
+            writer.close()
+
+    async def _open_upstream(self, proxy: Dict):
+        host, _, port = proxy_id(proxy).rpartition(':')
+        return await asyncio.wait_for(asyncio.open_connection(host, int(port)), self.timeout)
+
+    async def _read_status(self, reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+        head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self.timeout)
+        try:
+            return int(head.split(b' ', 2)[1]), head
+        except (IndexError, ValueError):
+            raise UpstreamError(f"malformed response head: {head[:64]!r}")
+
+    async def _with_upstream(self, target: str, attempt):
+        """Run attempt(proxy) on upstreams until one succeeds
+
+        attempt raises OSError, asyncio errors or UpstreamError when the
+        upstream failed and the request can be retried elsewhere. Failed
+        upstreams are reported right away; the lease of the successful one
+        is returned as (proxy, status, latency) and must be reported by the
+        caller once the exchange is over.
+        """
+        loop = asyncio.get_running_loop()
+        for _ in range(self.retries + 1):
+            proxy = self.rotator.acquire(target)
+            if proxy is None:
+                return None
+            started = loop.time()
+            try:
+                status = await attempt(proxy)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError,
+                    asyncio.LimitOverrunError, UpstreamError) as e:
+                logger.debug(f"Upstream {proxy_id(proxy)} failed: {e.__class__.__name__}: {str(e)}")
+                self._report(proxy, target, error=True)
+                continue
+            return proxy, status, round((loop.time() - started) * 1000, 1)
+        return None
+
+    async def _connect(self, target: str, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        tunnel = {}
+
+        async def attempt(proxy):
+            up_reader, up_writer = await self._open_upstream(proxy)
+            try:
+                up_writer.write(f"CONNECT {target} HTTP/1.1\r\nHost: {target}\r\n\r\n".encode())
+                await up_writer.drain()
+                status, _ = await self._read_status(up_reader)
+            except BaseException:
+                up_writer.close()
+                raise
+            if status != 200:
+                up_writer.close()
+                raise UpstreamError(f"CONNECT refused with status {status}")
+            tunnel['streams'] = (up_reader, up_writer)
+            return status
+
+        lease = await self._with_upstream(target, attempt)
+        if lease is None:
+            await self._reply(writer, 502, 'Bad Gateway')
+            return
+        up_reader, up_writer = tunnel['streams']
+        try:
+            writer.write(b'HTTP/1.1 200 Connection established\r\n\r\n')
+            await writer.drain()
+            await self._pipe_both(reader, writer, up_reader, up_writer)
+        finally:
+            self._report(lease[0], target, status=lease[1], latency=lease[2])
+
+    async def _forward(self, method, target, version, headers, reader, writer) -> None:
+        if not urlsplit(target).scheme:
+            await self._reply(writer, 400, 'Bad Request')
+            return
+        codings = [coding.strip().lower() for name, value in headers
+                   if name.strip().lower() == 'transfer-encoding' for coding in value.split(',') if coding.strip()]
+        if codings and codings != ['chunked']:
+            # Only plain chunked bodies can be decoded and buffered for retries
+            await self._reply(writer, 501, 'Not Implemented')
+            return
+        if codings:
+            try:
+                body = await self._read_chunked(reader)
+            except ValueError:
+                await self._reply(writer, 400, 'Bad Request')
+                return
+            # The buffered body goes upstream with a length instead of chunks
+            headers = [header for header in headers
+                       if header[0].strip().lower() not in ('transfer-encoding', 'content-length')]
+            headers.append(['Content-Length', f" {len(body)}"])
+        else:
+            length = next((int(value) for name, value in headers if name.strip().lower() == 'content-length'), 0)
+            body = await reader.readexactly(length) if length else b''
+        lines = [f"{method} {target} {version}"]
+        lines += [f"{name}:{value}" for name, value in headers if name.strip().lower() not in HOP_HEADERS]
+        lines.append('Connection: close')
+        request = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+        response = {}
+
+        async def attempt(proxy):
+            up_reader, up_writer = await self._open_upstream(proxy)
+            try:
+                up_writer.write(request)
+                await up_writer.drain()
+                status, head = await self._read_status(up_reader)
+            except BaseException:
+                up_writer.close()
+                raise
+            response['streams'] = (up_reader, up_writer, head)
+            return status
+
+        lease = await self._with_upstream(target, attempt)
+        if lease is None:
+            await self._reply(writer, 502, 'Bad Gateway')
+            return
+        up_reader, up_writer, head = response['streams']
+        try:
+            writer.write(head)
+            await self._pipe(up_reader, writer)
+        finally:
+            up_writer.close()
+            self._report(lease[0], target, status=lease[1], latency=lease[2])
+
+    async def _read_chunked(self, reader: asyncio.StreamReader) -> bytes:
+        """Read a chunked request body, dropping chunk extensions and trailers
+
+        Raises:
+            ValueError: On a malformed chunk size
+        """
+        chunks = []
+        while True:
+            line = await asyncio.wait_for(reader.readuntil(b'\r\n'), self.timeout)
+            size = int(line.split(b';', 1)[0].strip(), 16)
+            if not size:
+                break
+            chunk = await asyncio.wait_for(reader.readexactly(size + 2), self.timeout)
+            if chunk[-2:] != b'\r\n':
+                raise ValueError("chunk not terminated by CRLF")
+            chunks.append(chunk[:-2])
+        # Trailer fields end with an empty line
+        while await asyncio.wait_for(reader.readuntil(b'\r\n'), self.timeout) != b'\r\n':
+            pass
+        return b''.join(chunks)
+
+    @staticmethod
+    async def _reply(writer: asyncio.StreamWriter, status: int, reason: str) -> None:
+        writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Length: 0\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+
+    @staticmethod
+    async def _pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                writer.write(data)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            if writer.can_write_eof():
+                try:
+                    writer.write_eof()
+                except OSError:
+                    pass
+
+    async def _pipe_both(self, reader, writer, up_reader, up_writer) -> None:
+        try:
+            await asyncio.gather(self._pipe(reader, up_writer), self._pipe(up_reader, writer))
+        finally:
+            up_writer.close()
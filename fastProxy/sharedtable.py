@@ -0,0 +1,255 @@
+import mmap
+import os
+import random
+import struct
+import time
+from typing import List, Dict, Optional, Iterable
+from .logger import logger
+from .pool import proxy_id
+from .prefilter import pack_ip
+
+DEFAULT_TABLE = 'proxy_list/proxies.table'
+MAGIC = b'FPXT'
+VERSION = 1
+
+# magic, version, record size, capacity, count, generation
+HEADER = struct.Struct('<4sHHIIQ')
+# ip, port, flags, latency (ms), score, country code, checked_at (epoch seconds)
+RECORD = struct.Struct('<IHHff2s2xI')
+GENERATION_OFFSET = 16
+
+FLAG_HTTP = 1
+FLAG_HTTPS = 2
+ANONYMITY_SHIFT = 2
+ANONYMITY_LEVELS = ('unknown', 'transparent', 'anonymous', 'elite')
+
+
+def _anonymity_level(anonymity: Optional[str]) -> int:
+    anonymity = (anonymity or '').lower()
+    for level, name in enumerate(ANONYMITY_LEVELS):
+        if level and anonymity.startswith(name):
+            return level
+    return 0
+
+
+def pack_record(proxy_info: Dict, score: float = 0.0) -> Optional[bytes]:
+    """Encode a working proxy as one fixed-width record, None for non-IPv4 proxies"""
+    ip, _, port = proxy_id(proxy_info).rpartition(':')
+    packed_ip = pack_ip(ip)
+    if packed_ip is None or not port.isdigit():
+        return None
+    protocols = proxy_info.get('protocols') or [proxy_info.get('type')]
+    flags = (FLAG_HTTP if 'http' in protocols else 0) | (FLAG_HTTPS if 'https' in protocols else 0)
+    flags |= _anonymity_level(proxy_info.get('anonymity')) << ANONYMITY_SHIFT
+    code = (proxy_info.get('code') or '').upper().encode('ascii', 'ignore')[:2]
+    return RECORD.pack(packed_ip, int(port), flags, float(proxy_info.get('latency') or 0.0),
+                       float(score), code, int(proxy_info.get('checked_at') or time.time()))
+
+
+def unpack_record(ip, port, flags, latency, score, code, checked_at) -> Dict:
+    protocols = [name for bit, name in ((FLAG_HTTPS, 'https'), (FLAG_HTTP, 'http')) if flags & bit]
+    return {
+        'proxy': f"{ip >> 24}.{ip >> 16 & 255}.{ip >> 8 & 255}.{ip & 255}:{port}",
+        'type': protocols[0] if protocols else 'http',
+        'protocols': protocols,
+        'code': code.rstrip(b'\0').decode('ascii'),
+        'anonymity': f"{ANONYMITY_LEVELS[flags >> ANONYMITY_SHIFT & 3]} proxy",
+        'latency': round(latency, 1),
+        'score': round(score, 4),
+        'checked_at': checked_at
+    }
+
+
+class ProxyTableWriter:
+    """Publishes working proxies to a memory-mapped, fixed-width table
+
+    One validator process owns the writer; any number of processes map the
+    same file with ProxyTableReader. Updates are guarded by a seqlock: the
+    generation counter in the header is odd while records are rewritten
+    and even once they are consistent again, so readers never need a lock
+    and see every publish as soon as it completes.
+
+    Args:
+        path: Table file, created or grown as needed; it never shrinks so
+            that readers mapping the old size stay valid
+        capacity: Maximum number of records
+    """
+
+    def __init__(self, path: str = DEFAULT_TABLE, capacity: int = 65536):
+        self.path = path
+        self.capacity = capacity
+        size = HEADER.size + capacity * RECORD.size
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        generation = 0
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            current = os.fstat(fd).st_size
+            if current >= HEADER.size and os.pread(fd, 4, 0) == MAGIC:
+                # Keep counting through an odd value so open readers retry
+                # while the table is reset and notice the change afterwards
+                previous = struct.unpack('<Q', os.pread(fd, 8, GENERATION_OFFSET))[0]
+                generation = previous + (previous & 1) + 1
+                os.pwrite(fd, struct.pack('<Q', generation), GENERATION_OFFSET)
+            # Never shrink the file: readers may still map the old size
+            if current < size:
+                os.ftruncate(fd, size)
+            self._mmap = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        HEADER.pack_into(self._mmap, 0, MAGIC, VERSION, RECORD.size, capacity, 0, generation)
+        if generation & 1:
+            struct.pack_into('<Q', self._mmap, GENERATION_OFFSET, generation + 1)
+
+    @property
+    def generation(self) -> int:
+        return struct.unpack_from('<Q', self._mmap, GENERATION_OFFSET)[0]
+
+    def publish(self, proxies: Iterable[Dict], pool=None) -> int:
+        """Replace the table contents with the given working proxies
+
+        Args:
+            proxies: Working proxies, e.g. from fetch_proxies or ProxyPool.working()
+            pool (ProxyPool, optional): Supplies the score of each proxy
+
+        Returns:
+            int: Number of records written
+        """
+        records = []
+        for proxy_info in proxies:
+            score = pool.score(proxy_id(proxy_info)) if pool is not None else proxy_info.get('score', 0.0)
+            record = pack_record(proxy_info, score or 0.0)
+            if record is not None:
+                records.append(record)
+        if len(records) > self.capacity:
+            logger.warning(f"Proxy table holds {self.capacity} records, dropping {len(records) - self.capacity}")
+            records = records[:self.capacity]
+
+        generation = self.generation
+        struct.pack_into('<Q', self._mmap, GENERATION_OFFSET, generation + 1)
+        self._mmap[HEADER.size:HEADER.size + len(records) * RECORD.size] = b''.join(records)
+        struct.pack_into('<I', self._mmap, 12, len(records))
+        struct.pack_into('<Q', self._mmap, GENERATION_OFFSET, generation + 2)
+        return len(records)
+
+    def close(self) -> None:
+        self._mmap.flush()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ProxyTableReader:
+    """Lock-free reader of a table published by ProxyTableWriter
+
+    The capacity in the header is checked on every read; when a writer
+    reopened the table with more room, the file is mapped again.
+
+    Args:
+        path: Table file
+        retries: Attempts to get a consistent read while the writer is publishing
+    """
+
+    def __init__(self, path: str = DEFAULT_TABLE, retries: int = 1000):
+        self.path = path
+        self.retries = retries
+        self._mmap = None
+        self._map()
+        magic, version, record_size = HEADER.unpack_from(self._mmap, 0)[:3]
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a fastProxy table")
+        self._random = random.Random()
+
+    def _map(self) -> None:
+        """(Re)map the whole file, e.g. after the writer grew the table"""
+        with open(self.path, 'rb') as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(mapping) < HEADER.size:
+            mapping.close()
+            raise ValueError(f"{self.path} is not a fastProxy table")
+        if self._mmap is not None:
+            self._mmap.close()
+        self._mmap = mapping
+        self.capacity = HEADER.unpack_from(mapping, 0)[3]
+
+    @property
+    def generation(self) -> int:
+        return struct.unpack_from('<Q', self._mmap, GENERATION_OFFSET)[0]
+
+    def _consistent(self, read):
+        """Run read(count) until it saw no concurrent publish"""
+        for _ in range(self.retries):
+            before = self.generation
+            if before & 1:
+                time.sleep(0)
+                continue
+            capacity, count = struct.unpack_from('<II', self._mmap, 8)
+            if HEADER.size + capacity * RECORD.size > len(self._mmap):
+                # The writer reopened the table with a larger capacity
+                self._map()
+                if HEADER.size + self.capacity * RECORD.size > len(self._mmap):
+                    raise ValueError(f"{self.path} is shorter than its header claims")
+                continue
+            result = read(min(count, capacity))
+            if self.generation == before:
+                return result
+        raise TimeoutError(f"No consistent read of {self.path} after {self.retries} attempts")
+
+    def __len__(self):
+        return self._consistent(lambda count: count)
+
+    def records(self) -> List[Dict]:
+        """All published proxies"""
+        def read(count):
+            view = memoryview(self._mmap)[HEADER.size:HEADER.size + count * RECORD.size]
+            try:
+                return list(RECORD.iter_unpack(view))
+            finally:
+                view.release()
+        return [unpack_record(*fields) for fields in self._consistent(read)]
+
+    def select(self, protocol: Optional[str] = None, code: Optional[str] = None,
+               min_score: Optional[float] = None) -> Optional[Dict]:
+        """Random published proxy matching the filters, None if nothing matches
+
+        Without filters a single record is read; with filters the records
+        are scanned straight from the shared mapping.
+        """
+        if protocol is None and code is None and min_score is None:
+            def pick(count):
+                if not count:
+                    return None
+                return RECORD.unpack_from(self._mmap, HEADER.size + self._random.randrange(count) * RECORD.size)
+            fields = self._consistent(pick)
+            return unpack_record(*fields) if fields else None
+
+        flag = {'http': FLAG_HTTP, 'https': FLAG_HTTPS}.get(protocol, 0)
+        wanted_code = code.upper().encode('ascii') if code else None
+
+        def scan(count):
+            view = memoryview(self._mmap)[HEADER.size:HEADER.size + count * RECORD.size]
+            try:
+                return [fields for fields in RECORD.iter_unpack(view)
+                        if (not flag or fields[2] & flag)
+                        and (wanted_code is None or fields[5] == wanted_code)
+                        and (min_score is None or fields[4] >= min_score)]
+            finally:
+                view.release()
+
+        matches = self._consistent(scan)
+        return unpack_record(*self._random.choice(matches)) if matches else None
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,208 @@
+import json
+import os
+import threading
+import time
+from typing import List, Dict, Optional
+from .logger import logger
+from .pool import proxy_id
+
+SNAPSHOT_VERSION = 1
+DEFAULT_SNAPSHOT = 'proxy_list/snapshot.bin'
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack is optional
+    msgpack = None
+
+
+def save_snapshot(proxies: List[Dict], path: str = DEFAULT_SNAPSHOT, pool=None) -> str:
+    """Persist the validated proxies (and pool scores) for a warm start
+
+    The snapshot is msgpack encoded when msgpack is installed and compact
+    JSON otherwise; load_snapshot() detects the format. It is written to
+    a temporary file and renamed, so readers never see a partial file.
+
+    Returns:
+        str: Path written
+    """
+    data = {
+        'version': SNAPSHOT_VERSION,
+        'saved_at': time.time(),
+        'proxies': list(proxies),
+        'scores': pool.export_scores() if pool is not None else []
+    }
+    if msgpack is not None:
+        payload = msgpack.packb(data, use_bin_type=True)
+    else:
+        payload = json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+    logger.debug(f"Saved snapshot of {len(data['proxies'])} proxies to {path}")
+    return path
+
+
+def load_snapshot(path: str = DEFAULT_SNAPSHOT, pool=None, max_age: Optional[float] = None) -> List[Dict]:
+    """Load the proxies of a snapshot, restoring pool scores if a pool is given
+
+    Args:
+        path: Snapshot file
+        pool (ProxyPool, optional): Receives the saved reliability scores
+        max_age: Ignore snapshots older than this many seconds
+
+    Returns:
+        List[Dict]: Saved working proxies, empty when there is no usable snapshot
+    """
+    try:
+        with open(path, 'rb') as f:
+            payload = f.read()
+    except OSError:
+        return []
+    try:
+        if payload[:1] == b'{':
+            data = json.loads(payload)
+        elif msgpack is not None:
+            data = msgpack.unpackb(payload, raw=False)
+        else:
+            logger.warning(f"Snapshot {path} is msgpack encoded: pip install msgpack")
+            return []
+    except Exception as e:
+        logger.error(f"Error loading snapshot {path}: {str(e)}")
+        return []
+
+    if not isinstance(data, dict) or data.get('version') != SNAPSHOT_VERSION:
+        logger.warning(f"Ignoring snapshot {path} with unknown format")
+        return []
+    age = time.time() - data.get('saved_at', 0)
+    if max_age is not None and age > max_age:
+        logger.info(f"Ignoring snapshot {path}, {age:.0f}s old")
+        return []
+    if pool is not None and data.get('scores'):
+        pool.import_scores(data['scores'])
+    logger.info(f"Loaded {len(data.get('proxies', []))} proxies from snapshot ({age:.0f}s old)")
+    return data.get('proxies', [])
+
+
+def to_candidate(proxy_info: Dict) -> Dict:
+    """Turn a working proxy back into a candidate dictionary for revalidation"""
+    ip, _, port = proxy_id(proxy_info).rpartition(':')
+    protocols = proxy_info.get('protocols') or [proxy_info.get('type')]
+    return {
+        'ip': ip,
+        'port': port,
+        'code': proxy_info.get('code', ''),
+        'country': proxy_info.get('country', ''),
+        'anonymity': proxy_info.get('anonymity', 'unknown'),
+        'https': 'yes' if 'https' in protocols else 'no',
+        'source': proxy_info.get('source') or 'snapshot',
+        # When the proxy was last seen working, read as a freshness hint
+        'checked_at': proxy_info.get('checked_at')
+    }
+
+
+class WarmStart:
+    """Serve the last validated proxies immediately and refresh them in the background
+
+    load() returns the snapshot in milliseconds; those proxies are
+    "probably good" until refresh() has revalidated them together with
+    freshly fetched candidates and written a new snapshot.
+
+    Args:
+        path: Snapshot file
+        validator (ProxyValidator, optional): Validator used to refresh, built from the globals by default
+        pool (ProxyPool, optional): Restored from and saved to the snapshot
+        max_age: Ignore snapshots older than this many seconds
+    """
+
+    def __init__(self, path: str = DEFAULT_SNAPSHOT, validator=None, pool=None, max_age: Optional[float] = None):
+        self.path = path
+        self.validator = validator
+        self.pool = pool
+        self.max_age = max_age
+        self.fresh = threading.Event()
+        self._lock = threading.Lock()
+        self._proxies = []
+        self._thread = None
+
+    @property
+    def proxies(self) -> List[Dict]:
+        """Current proxies: the snapshot until the first refresh finishes"""
+        with self._lock:
+            return list(self._proxies)
+
+    def load(self) -> List[Dict]:
+        proxies = load_snapshot(self.path, pool=self.pool, max_age=self.max_age)
+        with self._lock:
+            self._proxies = proxies
+        return list(proxies)
+
+    def refresh(self, max_proxies: Optional[int] = None, candidates: Optional[List[Dict]] = None,
+                want: Optional[int] = None, **run_kwargs) -> List[Dict]:
+        """Revalidate the snapshot plus newly fetched candidates and save the result
+
+        With want, the refresh stops once that many proxies work; candidates are then
+        fetched from all sources interleaved by predicted yield, as ProxyValidator.run
+        does, and max_proxies caps how many are probed. Extra keyword arguments
+        (store, exporters, ...) are passed to ProxyValidator.run. A refresh that finds
+        no working proxy or is cancelled keeps the previous snapshot.
+        """
+        if self.validator is None:
+            from .fastProxy import ProxyValidator
+            self.validator = ProxyValidator.from_globals()
+        if candidates is None:
+            from .proxy_sources.manager import ProxySourceManager
+            manager = ProxySourceManager()
+            if want:
+                candidates = manager.fetch_all(max_proxies=max_proxies or 0, interleave=True)
+            else:
+                candidates = manager.fetch_all(max_proxies=max_proxies or 50)
+        if want:
+            run_kwargs.update(want=want, max_proxies=max_proxies)
+
+        merged = {}
+        for candidate in [to_candidate(p) for p in self.proxies] + list(candidates):
+            merged.setdefault(proxy_id(candidate), candidate)
+        working = self.validator.run(proxies=list(merged.values()), pool=self.pool, **run_kwargs)
+        report = getattr(self.validator, 'last_report', None)
+        if not working or getattr(report, 'stop_reason', None) == 'cancelled':
+            # An outage or a cancelled run says nothing about the snapshot, keep serving it
+            logger.warning(f"Refresh found {len(working)} working proxies, keeping snapshot {self.path}")
+            self.fresh.set()
+            return working
+        with self._lock:
+            self._proxies = list(working)
+        try:
+            save_snapshot(working, self.path, pool=self.pool)
+        except OSError as e:
+            logger.error(f"Error saving snapshot {self.path}: {str(e)}")
+        self.fresh.set()
+        return working
+
+    def start(self, max_proxies: Optional[int] = None, candidates: Optional[List[Dict]] = None,
+              **run_kwargs) -> List[Dict]:
+        """Load the snapshot and start refreshing it in a background thread
+
+        Returns:
+            List[Dict]: The snapshot proxies, available right away
+        """
+        proxies = self.load()
+
+        def refresh():
+            try:
+                self.refresh(max_proxies=max_proxies, candidates=candidates, **run_kwargs)
+            except Exception as e:
+                logger.error(f"Error refreshing snapshot: {str(e)}")
+                self.fresh.set()
+
+        self._thread = threading.Thread(target=refresh, daemon=True)
+        self._thread.start()
+        return proxies
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the background refresh to finish"""
+        return self.fresh.wait(timeout)
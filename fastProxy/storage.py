@@ -0,0 +1,233 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Dict, Optional, Iterable
+from .logger import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS validations (
+    id INTEGER PRIMARY KEY,
+    ip TEXT NOT NULL,
+    port INTEGER NOT NULL,
+    protocol TEXT,
+    latency REAL,
+    outcome TEXT NOT NULL,
+    checked_at REAL NOT NULL,
+    source TEXT
+);
+CREATE TABLE IF NOT EXISTS proxies (
+    ip TEXT NOT NULL,
+    port INTEGER NOT NULL,
+    protocol TEXT,
+    code TEXT,
+    country TEXT,
+    anonymity TEXT,
+    source TEXT,
+    last_checked REAL,
+    last_success REAL,
+    PRIMARY KEY (ip, port)
+);
+CREATE TABLE IF NOT EXISTS scores (
+    proxy TEXT PRIMARY KEY,
+    success REAL,
+    latency REAL,
+    updated_at REAL,
+    checks INTEGER,
+    flaps INTEGER,
+    last_alive INTEGER,
+    info TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_validations_proxy ON validations (ip, port, checked_at);
+CREATE INDEX IF NOT EXISTS idx_proxies_code ON proxies (code);
+CREATE INDEX IF NOT EXISTS idx_proxies_country ON proxies (country);
+CREATE INDEX IF NOT EXISTS idx_proxies_protocol ON proxies (protocol);
+CREATE INDEX IF NOT EXISTS idx_proxies_last_success ON proxies (last_success);
+"""
+
+INSERT_VALIDATION = """
+INSERT INTO validations (ip, port, protocol, latency, outcome, checked_at, source)
+VALUES (:ip, :port, :protocol, :latency, :outcome, :checked_at, :source)
+"""
+
+UPSERT_PROXY = """
+INSERT INTO proxies (ip, port, protocol, code, country, anonymity, source, last_checked, last_success)
+VALUES (:ip, :port, :protocol, :code, :country, :anonymity, :source, :checked_at,
+        CASE WHEN :outcome = 'alive' THEN :checked_at END)
+ON CONFLICT (ip, port) DO UPDATE SET
+    protocol = COALESCE(excluded.protocol, protocol),
+    code = COALESCE(NULLIF(excluded.code, ''), code),
+    country = COALESCE(NULLIF(excluded.country, ''), country),
+    anonymity = COALESCE(excluded.anonymity, anonymity),
+    source = COALESCE(excluded.source, source),
+    last_checked = MAX(COALESCE(last_checked, 0), excluded.last_checked),
+    last_success = CASE
+        WHEN excluded.last_success IS NULL THEN last_success
+        WHEN last_success IS NULL THEN excluded.last_success
+        ELSE MAX(last_success, excluded.last_success)
+    END
+"""
+
+
+class ProxyHistoryStore:
+    """Persistent SQLite (WAL) store of every validation result
+
+    Each record is a dictionary with the keys produced by validation:
+        - ip, port: Proxy address
+        - protocol: Protocols the proxy passed, comma separated, e.g. 'https,http'
+          (None when the proxy was dead)
+        - latency: Probe latency in milliseconds
+        - outcome: 'alive', 'dead' or 'timeout'
+        - checked_at: Unix timestamp of the probe
+        - source, code, country, anonymity: Metadata from the proxy source
+    """
+
+    def __init__(self, path: str = os.path.join('proxy_list', 'history.db')):
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def _normalize(record: Dict) -> Dict:
+        ip, port = record.get('ip'), record.get('port')
+        if ip is None or port is None:
+            ip, _, port = record['proxy'].rpartition(':')
+        return {
+            'ip': ip,
+            'port': int(port),
+            'protocol': record.get('protocol'),
+            'latency': record.get('latency'),
+            'outcome': record.get('outcome', 'alive'),
+            'checked_at': record.get('checked_at') or time.time(),
+            'source': record.get('source'),
+            'code': record.get('code', ''),
+            'country': record.get('country', ''),
+            'anonymity': record.get('anonymity')
+        }
+
+    def record_many(self, records: Iterable[Dict]) -> int:
+        """Append validation results in a single transaction
+
+        Returns:
+            int: Number of records written
+        """
+        rows = [self._normalize(record) for record in records]
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            self._conn.executemany(INSERT_VALIDATION, rows)
+            self._conn.executemany(UPSERT_PROXY, rows)
+        logger.debug(f"Recorded {len(rows)} validation results in {self.path}")
+        return len(rows)
+
+    def record(self, record: Dict) -> int:
+        return self.record_many([record])
+
+    def save_scores(self, pool) -> int:
+        """Persist the reliability scores of a ProxyPool"""
+        rows = [
+            {**record, 'info': json.dumps(record['info']) if record.get('info') else None}
+            for record in pool.export_scores()
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO scores (proxy, success, latency, updated_at, checks, flaps, '
+                'last_alive, info) VALUES (:proxy, :success, :latency, :updated_at, :checks, :flaps, '
+                ':last_alive, :info)', rows
+            )
+        return len(rows)
+
+    def load_scores(self, pool) -> int:
+        """Restore reliability scores into a ProxyPool"""
+        with self._lock:
+            rows = self._conn.execute('SELECT * FROM scores').fetchall()
+        return pool.import_scores(
+            dict(row, info=json.loads(row['info']) if row['info'] else None) for row in rows
+        )
+
+    def history(self, ip: str, port: int, limit: int = 100) -> List[Dict]:
+        """Return the most recent validation results of one proxy"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT * FROM validations WHERE ip = ? AND port = ? '
+                'ORDER BY checked_at DESC LIMIT ?', (ip, int(port), limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def query(self, country: Optional[str] = None, protocol: Optional[str] = None,
+              anonymity: Optional[str] = None, max_p90_latency: Optional[float] = None,
+              alive_within: Optional[float] = None, latency_window: float = 24 * 3600,
+              limit: int = 50) -> List[Dict]:
+        """Select the best proxies by 90th percentile latency
+
+        Args:
+            country: Country code or name, e.g. 'DE'
+            protocol: 'http' or 'https'
+            anonymity: e.g. 'elite proxy'
+            max_p90_latency: Upper bound on p90 latency in milliseconds
+            alive_within: Only proxies with a success in the last N seconds
+            latency_window: Seconds of history used for the latency percentile
+            limit: Maximum number of proxies to return
+
+        Returns:
+            List of proxy dictionaries ordered by p90 latency
+        """
+        now = time.time()
+        filters, params = [], {'since': now - latency_window, 'limit': limit}
+        if country:
+            filters.append('(p.code = :country OR p.country = :country)')
+            params['country'] = country
+        if protocol:
+            # Proxies that passed several protocols store them comma separated
+            filters.append("(',' || p.protocol || ',') LIKE ('%,' || :protocol || ',%')")
+            params['protocol'] = protocol
+        if anonymity:
+            if not anonymity.endswith(' proxy'):
+                anonymity += ' proxy'
+            filters.append('p.anonymity = :anonymity')
+            params['anonymity'] = anonymity
+        if alive_within is not None:
+            filters.append('p.last_success >= :alive_since')
+            params['alive_since'] = now - alive_within
+        where = ' AND '.join(filters) or '1'
+        having = 'WHERE pc.p90 <= :max_p90' if max_p90_latency is not None else ''
+        params['max_p90'] = max_p90_latency
+
+        sql = f"""
+            WITH candidates AS (
+                SELECT * FROM proxies p WHERE {where}
+            ), ranked AS (
+                SELECT v.ip, v.port, v.latency,
+                       ROW_NUMBER() OVER (PARTITION BY v.ip, v.port ORDER BY v.latency) AS rn,
+                       COUNT(*) OVER (PARTITION BY v.ip, v.port) AS n
+                FROM validations v JOIN candidates c ON c.ip = v.ip AND c.port = v.port
+                WHERE v.outcome = 'alive' AND v.latency IS NOT NULL AND v.checked_at >= :since
+            ), percentiles AS (
+                SELECT ip, port, latency AS p90, n AS samples
+                FROM ranked WHERE rn = (9 * n + 9) / 10
+            )
+            SELECT c.*, pc.p90, pc.samples
+            FROM candidates c JOIN percentiles pc ON pc.ip = c.ip AND pc.port = c.port
+            {having}
+            ORDER BY pc.p90 LIMIT :limit
+        """
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(row, proxy=f"{row['ip']}:{row['port']}") for row in rows]
@@ -0,0 +1,180 @@
+import socket
+import ssl
+import threading
+from typing import Optional
+from urllib.parse import urlsplit
+
+import urllib3
+
+from . import net
+from .profiling import stage
+
+# HTTPS check modes of the validator
+HTTPS_CHECKS = ('request', 'tls', 'tunnel')
+
+_context = None
+_context_lock = threading.Lock()
+_warnings_disabled = False
+
+
+class TunnelError(OSError):
+    """Raised when a proxy refuses or breaks a CONNECT tunnel"""
+
+
+def shared_context() -> ssl.SSLContext:
+    """SSL context shared by all HTTPS probes
+
+    Probes only care whether a proxy can carry TLS, not about the judge's
+    certificate, so verification is off, matching ``verify=False`` of the
+    request based check. Building a context loads ciphers and settings
+    once instead of on every probe.
+    """
+    global _context
+    if _context is None:
+        with _context_lock:
+            if _context is None:
+                # Registers its TLS sockets with the current probe, so aborts close them
+                context = net.ProbeSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+                context.minimum_version = ssl.TLSVersion.TLSv1_2
+                _context = context
+    return _context
+
+
+def disable_insecure_warnings() -> None:
+    """Silence urllib3's InsecureRequestWarning for verify=False probes, once"""
+    global _warnings_disabled
+    if not _warnings_disabled:
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        _warnings_disabled = True
+
+
+class SessionCache:
+    """TLS sessions of judge hosts, reused across probes and proxies
+
+    The TLS session ends at the judge, not at the proxy, so a session
+    established through one proxy can be resumed through any other,
+    turning most handshakes into abbreviated ones.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self.resumed = 0
+        self.full = 0
+
+    def get(self, host: str, port: int) -> Optional[ssl.SSLSession]:
+        with self._lock:
+            return self._sessions.get((host, port))
+
+    def update(self, host: str, port: int, sock: ssl.SSLSocket) -> None:
+        with self._lock:
+            if sock.session_reused:
+                self.resumed += 1
+            else:
+                self.full += 1
+            session = sock.session
+            # TLS 1.3 sessions are only resumable once the server sent a ticket
+            if session is not None and session.has_ticket:
+                self._sessions[(host, port)] = session
+
+
+sessions = SessionCache()
+
+
+def _read_head(sock: socket.socket, limit: int = 65536) -> bytes:
+    """Read an HTTP response head, up to and including the blank line"""
+    data = b''
+    while b'\r\n\r\n' not in data:
+        chunk = sock.recv(4096)
+        if not chunk:
+            break
+        data += chunk
+        if len(data) > limit:
+            raise TunnelError("response head too large")
+    return data
+
+
+def _status(head: bytes) -> int:
+    try:
+        return int(head.split(b'\r\n', 1)[0].split()[1])
+    except (IndexError, ValueError):
+        raise TunnelError(f"malformed response: {head[:64]!r}")
+
+
+def open_tunnel(proxy: str, host: str, port: int, timeout: float) -> socket.socket:
+    """Connect to an HTTP proxy and open a CONNECT tunnel to host:port
+
+    The socket is created through fastProxy.net, so it uses the resolver
+    cache and is closed by an abort of the current probe.
+    """
+    proxy_host, _, proxy_port = proxy.rpartition(':')
+    sock = net.create_connection((proxy_host, int(proxy_port)), timeout=timeout)
+    try:
+        target = f"{host}:{port}"
+        sock.sendall(f"CONNECT {target} HTTP/1.1\r\nHost: {target}\r\n\r\n".encode())
+        status = _status(_read_head(sock))
+        if status != 200:
+            raise TunnelError(f"CONNECT to {target} failed with status {status}")
+        return sock
+    except BaseException:
+        sock.close()
+        raise
+
+
+def probe_https(proxy: str, url: str, timeout: float, mode: str = 'tls',
+                context: Optional[ssl.SSLContext] = None,
+                session_cache: Optional[SessionCache] = None) -> bool:
+    """Check HTTPS support of a proxy through a CONNECT tunnel
+
+    Args:
+        proxy: Proxy address as ip:port
+        url: HTTPS judge URL
+        timeout: Socket timeout in seconds
+        mode: 'tls' completes a GET of the judge URL over a resumed TLS session,
+            'tunnel' stops after the CONNECT and TLS handshake
+        context: SSL context, defaults to the shared one
+        session_cache: TLS session cache, defaults to the module cache
+
+    Returns:
+        bool: Whether the proxy carried the check successfully
+
+    Raises:
+        OSError: On connection, tunnel or TLS errors
+    """
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 443
+    context = context or shared_context()
+    session_cache = session_cache or sessions
+
+    sock = open_tunnel(proxy, host, port, timeout)
+    probe = net.current_context()
+    try:
+        tls_sock = context.wrap_socket(sock, server_hostname=host, do_handshake_on_connect=False,
+                                       session=session_cache.get(host, port))
+    except BaseException:
+        sock.close()
+        raise
+    if probe is not None and not isinstance(context, net.ProbeSSLContext):
+        # The plain socket was detached by wrap_socket; aborts must close the TLS one
+        probe.unregister(sock)
+        probe.register(tls_sock)
+    try:
+        with stage(probe.timer if probe is not None else None, 'tls', thread=True):
+            tls_sock.do_handshake()
+        if mode == 'tunnel':
+            session_cache.update(host, port, tls_sock)
+            return True
+        path = parts.path or '/'
+        if parts.query:
+            path += f"?{parts.query}"
+        tls_sock.sendall(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n"
+                         f"Connection: close\r\n\r\n".encode())
+        status = _status(_read_head(tls_sock))
+        session_cache.update(host, port, tls_sock)
+        return status == 200
+    finally:
+        if probe is not None:
+            probe.unregister(tls_sock)
+        tls_sock.close()
@@ -26,3 +26,29 @@ def sample_proxy_data():
         'https': 'yes',
         'last_checked': '1 minute ago'
     }
+
+@pytest.fixture(autouse=True)
+def fresh_rate_limiter():
+    """Give every test its own per-host source rate limits"""
+    from unittest.mock import patch
+    from fastProxy.proxy_sources import ProxySource
+    from fastProxy.ratelimit import HostRateLimiter
+    with patch.object(ProxySource, 'rate_limiter', HostRateLimiter()):
+        yield
+
+@pytest.fixture(autouse=True)
+def fresh_source_health():
+    """Give every test its own source health statistics"""
+    from unittest.mock import patch
+    from fastProxy.proxy_sources.manager import ProxySourceManager
+    from fastProxy.proxy_sources.health import SourceHealthTracker
+    with patch.object(ProxySourceManager, 'health', SourceHealthTracker()):
+        yield
+
+@pytest.fixture(autouse=True)
+def fresh_default_prefilter():
+    """Give every test its own default prefilter and negative cache"""
+    from unittest.mock import patch
+    from fastProxy import prefilter
+    with patch.object(prefilter, '_default', None):
+        yield
@@ -1,3 +1,4 @@
+import time
 import pytest
 import requests
 import requests_mock
@@ -47,7 +48,8 @@ def test_fetch_success(requests_mock):
         'anonymity': 'elite proxy',
         'google': 'yes',
         'https': 'yes',
-        'last_checked': '1 minute ago'
+        'last_checked': '1 minute ago',
+        'checked_at': pytest.approx(time.time() - 60, abs=5)
     }
     assert proxies[1] == {
         'ip': '5.6.7.8',
@@ -57,9 +59,18 @@ def test_fetch_success(requests_mock):
         'anonymity': 'anonymous',
         'google': 'no',
         'https': 'no',
-        'last_checked': '5 minutes ago'
+        'last_checked': '5 minutes ago',
+        'checked_at': pytest.approx(time.time() - 300, abs=5)
     }
 
+def test_parse_last_checked():
+    """Test that relative last_checked ages become unix times"""
+    html = SAMPLE_HTML.replace('1 minute ago', '12 secs ago').replace('5 minutes ago', 'unknown')
+    proxies = FreeProxyListSource().parse(html, now=1000.0)
+    assert proxies[0]['last_checked'] == '12 secs ago'
+    assert proxies[0]['checked_at'] == 988.0
+    assert proxies[1]['checked_at'] is None
+
 def test_fetch_no_table(requests_mock):
     """Test handling of HTML without proxy table"""
     source = FreeProxyListSource()
@@ -91,3 +102,48 @@ def test_fetch_invalid_html(requests_mock):
 
     proxies = source.fetch()
     assert len(proxies) == 0
+
+def test_afetch_native_aiohttp():
+    """Test the native aiohttp request path against a local server"""
+    import asyncio
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    pytest.importorskip('aiohttp')
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = SAMPLE_HTML.encode()
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        source = FreeProxyListSource()
+        source.URL = f"http://127.0.0.1:{server.server_address[1]}/"
+        proxies = asyncio.run(source.afetch())
+    finally:
+        server.shutdown()
+    assert [p['ip'] for p in proxies] == ['1.2.3.4', '5.6.7.8']
+
+def test_default_afetch_runs_fetch_in_executor():
+    """Test that sources without a native afetch still work on an event loop"""
+    import asyncio
+    import threading
+    from fastProxy.proxy_sources import ProxySource
+
+    class StaticSource(ProxySource):
+        def fetch(self):
+            return [{'ip': '9.9.9.9', 'port': '80', 'thread': threading.current_thread().name}]
+
+    async def main():
+        return await StaticSource().afetch(), threading.current_thread().name
+
+    proxies, loop_thread = asyncio.run(main())
+    assert proxies[0]['ip'] == '9.9.9.9'
+    assert proxies[0]['thread'] != loop_thread
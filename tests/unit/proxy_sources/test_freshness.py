@@ -0,0 +1,76 @@
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+from fastProxy.fastProxy import ProxyValidator
+from fastProxy.proxy_sources.freshness import parse_age, parse_timestamp, liveness, order_by_liveness
+
+@pytest.mark.parametrize('text,seconds', [
+    ('12 secs ago', 12.0),
+    ('1 minute ago', 60.0),
+    ('5 mins ago', 300.0),
+    ('1 hour 5 minutes ago', 3900.0),
+    ('2 days ago', 172800.0),
+    ('just now', 0.0),
+    ('unknown', None),
+    ('', None),
+    (None, None),
+])
+def test_parse_age(text, seconds):
+    """Test parsing of relative last checked ages"""
+    assert parse_age(text) == seconds
+
+def test_parse_timestamp():
+    """Test parsing of epoch and ISO 8601 check times"""
+    assert parse_timestamp(1708153775) == 1708153775.0
+    assert parse_timestamp(1708153775000) == 1708153775.0
+    assert parse_timestamp('1708153775') == 1708153775.0
+    assert parse_timestamp('2024-02-17T07:09:35Z') == 1708153775.0
+    assert parse_timestamp('2024-02-17T07:09:35') == 1708153775.0
+    assert parse_timestamp('yesterday') is None
+    assert parse_timestamp(True) is None
+
+def test_liveness_prefers_fresh_high_uptime():
+    """Test that freshness decays with age and uptime and source yield scale it"""
+    now = 10000.0
+    fresh = {'checked_at': now - 10, 'uptime': 0.99}
+    stale = {'checked_at': now - 7200, 'uptime': 0.99}
+    flaky = {'checked_at': now - 10, 'uptime': 0.2}
+    unknown = {}
+    assert liveness(fresh, now=now) > liveness(flaky, now=now)
+    assert liveness(fresh, now=now) > liveness(unknown, now=now) > liveness(stale, now=now)
+    assert liveness(fresh, prior=0.9, now=now) > liveness(fresh, prior=0.1, now=now)
+
+def test_order_by_liveness():
+    """Test ordering by liveness, then speed, keeping hintless candidates in order"""
+    now = 10000.0
+    proxies = [
+        {'ip': 'none-1'},
+        {'ip': 'stale', 'checked_at': now - 7200},
+        {'ip': 'fresh-slow', 'checked_at': now - 10, 'uptime': 0.9, 'speed': 900},
+        {'ip': 'none-2'},
+        {'ip': 'fresh-fast', 'checked_at': now - 10, 'uptime': 0.9, 'speed': 100},
+        {'ip': 'fresh-bad-source', 'checked_at': now - 10, 'uptime': 0.9, 'source': 'bad'},
+    ]
+    ordered = order_by_liveness(proxies, priors={'bad': 0.01}, now=now)
+    assert [p['ip'] for p in ordered] == ['fresh-fast', 'fresh-slow', 'none-1', 'none-2',
+                                          'stale', 'fresh-bad-source']
+
+@patch('fastProxy.net.get')
+def test_validator_probes_freshest_first(mock_get):
+    """Test that the validation queue starts with the freshest candidates"""
+    probed = []
+
+    def get(url, proxies=None, **kwargs):
+        probed.append(proxies['http'])
+        return MagicMock(status_code=200)
+
+    mock_get.side_effect = get
+    now = time.time()
+    proxies = [{'ip': f'10.0.6.{i}', 'port': '80', 'https': 'no', 'checked_at': now - age}
+               for i, age in enumerate([3600, 60, 600])]
+    ProxyValidator(thread_count=1, write_csv=False).run(proxies=proxies)
+    assert probed == ['http://10.0.6.1:80', 'http://10.0.6.2:80', 'http://10.0.6.0:80']
+
+    probed.clear()
+    ProxyValidator(thread_count=1, write_csv=False, prioritize=False).run(proxies=proxies)
+    assert probed == ['http://10.0.6.0:80', 'http://10.0.6.1:80', 'http://10.0.6.2:80']
@@ -39,16 +39,32 @@ def test_fetch_success(requests_mock):
         'port': '8080',
         'https': 'yes',
         'country': 'United States',
-        'anonymity': 'elite proxy'
+        'anonymity': 'elite proxy',
+        'checked_at': 1708153775.811692,
+        'uptime': 0.955,
+        'speed': None
     }
     assert proxies[1] == {
         'ip': '5.6.7.8',
         'port': '3128',
         'https': 'no',
         'country': 'Germany',
-        'anonymity': 'transparent proxy'
+        'anonymity': 'transparent proxy',
+        'checked_at': 1708153710.123456,
+        'uptime': 0.921,
+        'speed': None
     }
 
+def test_parse_quality_hints():
+    """Test that epoch, millisecond and missing hints are normalized"""
+    proxies = GeoNodeSource().parse({"data": [
+        {"ip": "1.1.1.1", "port": 80, "lastChecked": 1708153775, "upTime": "99", "speed": 120},
+        {"ip": "2.2.2.2", "port": 80, "lastChecked": 1708153775000, "responseTime": "85"},
+        {"ip": "3.3.3.3", "port": 80, "lastChecked": "yesterday", "upTime": None}
+    ]})
+    assert [(p['checked_at'], p['uptime'], p['speed']) for p in proxies] == [
+        (1708153775.0, 0.99, 120.0), (1708153775.0, None, 85.0), (None, None, None)]
+
 def test_fetch_empty_response(requests_mock):
     """Test handling of empty response from API"""
     source = GeoNodeSource()
@@ -170,3 +186,19 @@ def test_fetch_malformed_data(requests_mock):
 
     proxies = source.fetch()
     assert len(proxies) == 0
+
+def test_afetch_matches_fetch(requests_mock):
+    """Test that the async fetch parses the same proxies without aiohttp installed"""
+    import asyncio
+    from unittest.mock import patch
+    from fastProxy import proxy_sources
+    source = GeoNodeSource()
+    requests_mock.get(source.API_URL, json=SAMPLE_RESPONSE)
+
+    with patch.object(proxy_sources, 'aiohttp', None):
+        proxies = asyncio.run(source.afetch())
+    assert proxies == source.fetch()
+
+    requests_mock.get(source.API_URL, text='not json')
+    with patch.object(proxy_sources, 'aiohttp', None):
+        assert asyncio.run(source.afetch()) == []
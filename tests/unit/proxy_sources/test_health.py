@@ -0,0 +1,74 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from fastProxy.fastProxy import ProxyValidator, fetch_proxies
+from fastProxy.proxy_sources.manager import ProxySourceManager
+from fastProxy.proxy_sources.health import SourceHealthTracker
+from fastProxy.ratelimit import Backoff
+
+def test_yield_weights_allocation():
+    """Test that the candidate budget follows each source's yield"""
+    health = SourceHealthTracker()
+    for i in range(100):
+        health.record_probe('good', i % 10 < 8)
+        health.record_probe('bad', i % 10 < 2)
+    weights = health.weights(['good', 'bad'])
+    assert weights['good'] == pytest.approx(0.8, abs=0.01)
+
+    allocation = health.allocate(10, {'good': 50, 'bad': 50})
+    assert allocation == {'good': 8, 'bad': 2}
+    # What one source cannot fill goes to the others
+    assert health.allocate(10, {'good': 3, 'bad': 50}) == {'good': 3, 'bad': 7}
+    assert health.allocate(100, {'good': 3, 'bad': 5}) == {'good': 3, 'bad': 5}
+
+def test_new_sources_get_a_fair_share():
+    """Test that sources without history are weighted equally and never starved"""
+    health = SourceHealthTracker(min_share=0.1)
+    assert health.weights(['a', 'b']) == {'a': 0.5, 'b': 0.5}
+    for _ in range(1000):
+        health.record_probe('a', True)
+        health.record_probe('b', False)
+    assert health.weights(['a', 'b'])['b'] >= 0.09
+
+def test_failing_sources_back_off():
+    """Test that errors and empty fetches back a source off until it recovers"""
+    health = SourceHealthTracker(backoff=Backoff(base=10, factor=2, max_delay=100))
+    health.record_fetch('flaky', 0, 0.5, error=True, now=0)
+    assert not health.is_available('flaky', now=1)
+    assert health.is_available('flaky', now=11)
+    health.record_fetch('flaky', 0, 0.5, now=11)
+    assert not health.is_available('flaky', now=15)
+    health.record_fetch('flaky', 20, 0.5, now=40)
+    assert health.is_available('flaky', now=40)
+    stats = health.stats()['flaky']
+    assert stats['fetches'] == 3
+    assert stats['error_rate'] == pytest.approx(1 / 3, abs=1e-3)
+    assert stats['consecutive_failures'] == 0
+
+def test_save_and_load(tmp_path):
+    """Test that statistics carry over to a new tracker"""
+    health = SourceHealthTracker()
+    health.record_probe('good', True)
+    health.record_fetch('good', 5, 0.2)
+    path = str(tmp_path / 'health.json')
+    health.save(path)
+    restored = SourceHealthTracker()
+    assert restored.load(path) == 1
+    assert restored.get('good').working == 1
+    assert restored.load(str(tmp_path / 'missing.json')) == 0
+
+@patch('fastProxy.net.get')
+def test_weights_survive_across_runs(mock_get, tmp_path):
+    """Test that fetch_proxies saves source health and the next process picks it up"""
+    mock_get.side_effect = lambda url, proxies=None, **kwargs: MagicMock(
+        status_code=200 if '1.1.1.' in proxies['http'] else 502)
+    candidates = [{'ip': f"1.1.1.{i}", 'port': '80', 'source': 'good'} for i in range(5)] + \
+                 [{'ip': f"2.2.2.{i}", 'port': '80', 'source': 'bad'} for i in range(5)]
+    path = str(tmp_path / 'health.json')
+    assert len(fetch_proxies(c=4, t=1, g=False, proxies=candidates, health_file=path)) == 5
+
+    # A new process starts with empty statistics
+    with patch.object(ProxySourceManager, 'health', SourceHealthTracker()):
+        with patch.object(ProxyValidator, 'run', return_value=[]):
+            fetch_proxies(proxies=[], health_file=path)
+        weights = ProxySourceManager.health.weights(['good', 'bad'])
+    assert weights['good'] > 0.8
@@ -1,4 +1,6 @@
+import time
 import pytest
+import requests
 from unittest.mock import Mock, patch
 from fastProxy.proxy_sources.manager import ProxySourceManager
 from fastProxy.proxy_sources.free_proxy_list import FreeProxyListSource
@@ -72,3 +74,81 @@ def test_fetch_all_empty_sources(mock_sources):
         proxies = manager.fetch_all()
 
         assert len(proxies) == 0
+
+def test_fetch_all_weights_sources_by_yield(mock_sources):
+    """Test that the budget goes to the source whose proxies work and failing sources are skipped"""
+    free_proxy, geonode = mock_sources
+    free_proxy.fetch.return_value = [{'ip': f'1.1.1.{i}', 'port': '8080'} for i in range(10)]
+    geonode.fetch.return_value = [{'ip': f'2.2.2.{i}', 'port': '8080'} for i in range(10)]
+
+    with patch('fastProxy.proxy_sources.manager.FreeProxyListSource', return_value=free_proxy), \
+         patch('fastProxy.proxy_sources.manager.GeoNodeSource', return_value=geonode):
+        manager = ProxySourceManager()
+        for i in range(20):
+            manager.health.record_probe(geonode.__class__.__name__, i % 10 < 9)
+            manager.health.record_probe(free_proxy.__class__.__name__, i % 10 < 1)
+        proxies = manager.fetch_all(max_proxies=10)
+        assert [p['ip'] for p in proxies].count('2.2.2.0') == 1
+        assert sum(p['ip'].startswith('2.2.2.') for p in proxies) == 9
+        assert proxies[0]['ip'].startswith('2.2.2.')
+
+        geonode.fetch.side_effect = Exception("Source failed")
+        manager.fetch_all(max_proxies=10)
+        geonode.fetch.reset_mock()
+        manager.fetch_all(max_proxies=10)
+        geonode.fetch.assert_not_called()
+
+def test_interleave_by_yield():
+    """Test that interleaved candidates mix sources in proportion to their weight"""
+    fetched = {'a': [{'ip': f'a{i}'} for i in range(6)], 'b': [{'ip': f'b{i}'} for i in range(2)]}
+    merged = ProxySourceManager.interleave(fetched, {'a': 0.75, 'b': 0.25})
+    assert [p['ip'] for p in merged[:4]].count('b0') == 1
+    assert [p['ip'] for p in merged] == ['a0', 'a1', 'b0', 'a2', 'a3', 'a4', 'b1', 'a5']
+
+def test_afetch_all(mock_sources):
+    """Test that the async fetch combines sources like fetch_all"""
+    import asyncio
+    free_proxy, geonode = mock_sources
+    free_proxy.afetch.return_value = free_proxy.fetch.return_value
+    geonode.afetch.side_effect = Exception("Source failed")
+
+    with patch('fastProxy.proxy_sources.manager.FreeProxyListSource', return_value=free_proxy), \
+         patch('fastProxy.proxy_sources.manager.GeoNodeSource', return_value=geonode):
+        manager = ProxySourceManager()
+        proxies = asyncio.run(manager.afetch_all(max_proxies=10))
+
+    assert [p['ip'] for p in proxies] == ['1.2.3.4']
+    assert proxies[0]['source'] == 'FreeProxyListSource'
+    assert manager.health.get('GeoNodeSource').errors == 1
+    free_proxy.fetch.assert_not_called()
+
+def test_budget_takes_freshest_candidates(mock_sources):
+    """Test that a source's share of the budget goes to its most recently checked candidates"""
+    free_proxy, geonode = mock_sources
+    now = time.time()
+    free_proxy.fetch.return_value = [
+        {'ip': '1.1.1.1', 'port': '80', 'checked_at': now - 3600},
+        {'ip': '2.2.2.2', 'port': '80', 'checked_at': None},
+        {'ip': '3.3.3.3', 'port': '80', 'checked_at': now - 10},
+    ]
+    geonode.fetch.return_value = []
+
+    with patch('fastProxy.proxy_sources.manager.FreeProxyListSource', return_value=free_proxy), \
+         patch('fastProxy.proxy_sources.manager.GeoNodeSource', return_value=geonode):
+        proxies = ProxySourceManager().fetch_all(max_proxies=2)
+
+    assert [p['ip'] for p in proxies] == ['3.3.3.3', '2.2.2.2']
+
+@patch('fastProxy.net.get', side_effect=requests.exceptions.ConnectionError("network down"))
+def test_request_errors_count_and_backoff_keeps_one_source(mock_get):
+    """Test that swallowed request errors reach the health stats and a fully backed off run still fetches"""
+    manager = ProxySourceManager()
+    assert manager.fetch_all() == []
+    stats = manager.health.stats()
+    assert {name: s['errors'] for name, s in stats.items()} == {'FreeProxyListSource': 1, 'GeoNodeSource': 1}
+    assert all(s['error_rate'] == 1.0 for s in stats.values())
+
+    # Both sources are backed off now; the one whose backoff ends first is still tried
+    mock_get.reset_mock()
+    manager.fetch_all()
+    assert mock_get.call_count == 1
@@ -0,0 +1,42 @@
+import pytest
+from fastProxy.bench import SyntheticWorkload, run_benchmark, format_report, percentile
+
+def test_workload_mix_is_reproducible():
+    """Test that the candidate mix follows the shares and the seed"""
+    with SyntheticWorkload(size=10, alive=0.3, slow=0.2, seed=1) as workload:
+        candidates = workload.candidates()
+        assert workload.counts() == {'alive': 3, 'slow': 2, 'dead': 5}
+        assert [c['source'] for c in candidates] == [c['source'] for c in workload.candidates()]
+        assert {c['ip'] for c in candidates} == {'127.0.0.1'}
+    with pytest.raises(ValueError):
+        SyntheticWorkload(alive=0.8, slow=0.3)
+
+def test_threaded_benchmark():
+    """Test a small benchmark run against the local fake proxies"""
+    result = run_benchmark(size=20, alive=0.5, slow=0.25, concurrency=20, timeout=2, slow_delay=0.2)
+    assert result['working'] == result['expected_working'] == 15
+    assert result['throughput'] > 0
+    assert result['latency_ms']['p99'] >= 200
+    assert result['latency_ms']['p50'] <= result['latency_ms']['p90']
+    assert 'Throughput:' in format_report(result)
+
+def test_slow_proxies_past_timeout_not_expected():
+    """Test that slow proxies slower than the timeout count as dead"""
+    result = run_benchmark(size=10, alive=0.5, slow=0.5, concurrency=10, timeout=0.3, slow_delay=0.6)
+    assert result['working'] == result['expected_working'] == 5
+
+def test_auto_keeps_up_with_refused_candidates():
+    """Test that adaptive concurrency nears the fixed limit when most candidates refuse connections"""
+    kwargs = dict(size=300, alive=0.05, slow=0.25, slow_delay=0.3, timeout=1, concurrency=50)
+    fixed = run_benchmark(engine='threaded', **kwargs)
+    auto = run_benchmark(engine='auto', **kwargs)
+    assert auto['working'] == fixed['working'] == auto['expected_working']
+    assert auto['throughput'] >= 0.5 * fixed['throughput']
+
+def test_percentile_and_engine_validation():
+    """Test nearest-rank percentiles and engine names"""
+    assert percentile([], 50) is None
+    assert percentile([3, 1, 2, 4], 50) == 2
+    assert percentile([3, 1, 2, 4], 99) == 4
+    with pytest.raises(ValueError):
+        run_benchmark(engine='async')
@@ -0,0 +1,144 @@
+import errno
+import itertools
+import time
+import requests
+from unittest.mock import patch, MagicMock
+from fastProxy.concurrency import AdaptiveConcurrencyController, classify_error
+from fastProxy.fastProxy import fetch_proxies, ProxyValidator
+
+def test_classify_wrapped_errors():
+    """Test classification through requests' exception wrapping"""
+    emfile = OSError(errno.EMFILE, 'Too many open files')
+    wrapped = requests.exceptions.ConnectionError(emfile)
+    assert classify_error(wrapped) == 'resource'
+    assert classify_error(requests.exceptions.ConnectionError(ConnectionRefusedError())) == 'refused'
+    assert classify_error(requests.exceptions.ConnectTimeout()) == 'timeout'
+    # A proxy refusing the connection is a dead candidate, not an overloaded judge
+    dead = requests.exceptions.ProxyError(OSError('Unable to connect to proxy'))
+    dead.__cause__ = ConnectionRefusedError()
+    assert classify_error(dead) == 'dead'
+    tunnel = requests.exceptions.ProxyError(OSError('Tunnel connection failed: 503 Service Unavailable'))
+    assert classify_error(tunnel) == 'refused'
+    assert classify_error(ValueError()) == 'other'
+    assert classify_error(None) is None
+
+@patch('fastProxy.concurrency.time.monotonic', side_effect=itertools.count())
+def test_limit_grows_while_latency_flat(mock_monotonic):
+    """Test additive increase while throughput holds and latency is stable"""
+    controller = AdaptiveConcurrencyController(initial=4, window=4)
+    for _ in range(40):
+        controller.on_result(latency=100)
+    assert controller.limit > 4
+
+def test_resource_errors_back_off():
+    """Test multiplicative decrease on EMFILE"""
+    controller = AdaptiveConcurrencyController(initial=32)
+    controller.on_result(error=OSError(errno.EMFILE, 'Too many open files'))
+    assert controller.limit == 16
+
+def test_refused_storm_backs_off():
+    """Test that a window dominated by refused connections halves the limit"""
+    controller = AdaptiveConcurrencyController(initial=8, window=8)
+    for _ in range(8):
+        controller.on_result(error=ConnectionRefusedError())
+    assert controller.limit == 4
+
+def test_dead_proxies_and_judge_replies():
+    """Test that refusing proxies are ordinary dead results while 502/503 replies count as a storm"""
+    refused = requests.exceptions.ProxyError(OSError('Unable to connect to proxy'))
+    refused.__cause__ = ConnectionRefusedError()
+    controller = AdaptiveConcurrencyController(initial=8, window=8)
+    for _ in range(40):
+        controller.on_result(error=refused)
+    assert controller.limit >= 8
+    controller = AdaptiveConcurrencyController(initial=8, window=8)
+    for _ in range(8):
+        controller.on_result(status=502)
+    assert controller.limit == 4
+
+def test_latency_inflation_backs_off():
+    """Test that a proxy answering far slower than it did before reduces the limit"""
+    controller = AdaptiveConcurrencyController(initial=10, window=10, tolerance=2.0)
+    for i in range(10):
+        controller.on_result(latency=100, proxy=f"p{i}")
+    grown = controller.limit
+    for i in range(grown):
+        controller.on_result(latency=1000, proxy=f"p{i % 10}")
+    assert controller.limit < grown
+
+def test_latency_spread_between_proxies_is_not_congestion():
+    """Test that slow proxies next to fast ones do not shrink the limit"""
+    controller = AdaptiveConcurrencyController(initial=10, window=10, tolerance=2.0)
+    for i in range(200):
+        controller.on_result(latency=10 if i % 2 else 2000, proxy=f"p{i}")
+    assert controller.limit > 10
+
+@patch('fastProxy.concurrency.time.monotonic', side_effect=itertools.count())
+def test_limit_bounds(mock_monotonic):
+    """Test that the limit stays within min and max"""
+    assert AdaptiveConcurrencyController(initial=10, max_limit=3).limit == 3
+    controller = AdaptiveConcurrencyController(initial=2, min_limit=2, max_limit=3, window=1)
+    for _ in range(10):
+        controller.on_result(latency=10)
+    assert controller.limit == 3
+    for _ in range(5):
+        controller.on_result(error=OSError(errno.ENFILE, 'File table overflow'))
+    assert controller.limit == 2
+
+@patch('fastProxy.net.get')
+def test_probes_run_concurrently(mock_get):
+    """Test that THREAD_COUNT probes are in flight at once"""
+    def slow_ok(*args, **kwargs):
+        time.sleep(0.2)
+        return MagicMock(status_code=200)
+    mock_get.side_effect = slow_ok
+    proxies = [{'ip': f'10.0.0.{i}', 'port': '80', 'https': False} for i in range(8)]
+
+    started = time.monotonic()
+    working = fetch_proxies(c=8, t=5, g=False, proxies=proxies)
+    assert len(working) == 8
+    assert time.monotonic() - started < 1.0
+
+@patch('fastProxy.net.get')
+def test_slow_probes_time_out(mock_get):
+    """Test that probes past the timeout are abandoned"""
+    def hang(*args, **kwargs):
+        time.sleep(1)
+        return MagicMock(status_code=200)
+    mock_get.side_effect = hang
+    proxies = [{'ip': f'10.0.1.{i}', 'port': '80', 'https': False} for i in range(4)]
+
+    started = time.monotonic()
+    working = fetch_proxies(c=4, t=0.2, g=False, proxies=proxies)
+    assert working == []
+    # Sleeping mocks cannot be interrupted, so the run waits out the abort grace period
+    assert time.monotonic() - started < 0.2 + ProxyValidator.ABORT_GRACE + 0.5
+
+@patch('fastProxy.net.get')
+def test_auto_mode(mock_get):
+    """Test validation with the adaptive controller"""
+    mock_get.return_value = MagicMock(status_code=200)
+    proxies = [{'ip': f'10.0.2.{i}', 'port': '80', 'https': False} for i in range(30)]
+    working = fetch_proxies(c='auto', t=5, g=False, proxies=proxies)
+    assert len(working) == 30
+
+@patch('fastProxy.net.get')
+def test_want_stops_once_target_found(mock_get):
+    """Test that target mode returns after want working proxies and cancels the rest"""
+    def fake_get(url, proxies=None, **kwargs):
+        # Only every other proxy works; dead ones answer slowly
+        host = proxies['http'].rsplit('.', 1)[1]
+        if int(host.split(':')[0]) % 2:
+            time.sleep(0.5)
+            raise requests.exceptions.ConnectTimeout('dead')
+        time.sleep(0.05)
+        return MagicMock(status_code=200)
+    mock_get.side_effect = fake_get
+    proxies = [{'ip': f'10.0.3.{i}', 'port': '80', 'https': False} for i in range(40)]
+
+    started = time.monotonic()
+    working = fetch_proxies(c=4, t=5, g=False, proxies=proxies, want=3)
+    assert len(working) == 3
+    assert mock_get.call_count < 20
+    assert time.monotonic() - started < 0.5 + ProxyValidator.ABORT_GRACE + 0.5
+    assert fetch_proxies(c=4, t=5, g=False, proxies=proxies, want=0) == []
@@ -0,0 +1,144 @@
+import json
+import time
+from unittest.mock import Mock, patch, MagicMock
+import requests
+from fastProxy.distributed import (
+    LocalWorkQueue, Coordinator, Worker, ResultStore, RedisWorkQueue
+)
+
+PROXIES = [
+    {'ip': '1.2.3.4', 'port': '8080', 'country': 'US', 'anonymity': 'elite', 'https': 'no'},
+    {'ip': '5.6.7.8', 'port': '3128', 'country': 'DE', 'anonymity': 'anonymous', 'https': 'no'},
+]
+
+def test_push_deduplicates_per_cycle():
+    """Test that a proxy is enqueued only once per cycle"""
+    backend = LocalWorkQueue()
+    assert backend.push('c1', PROXIES + PROXIES[:1]) == 2
+    assert backend.push('c1', PROXIES) == 0
+    assert backend.push('c2', PROXIES) == 2
+
+def test_pull_respects_batch_size():
+    """Test that workers pull bounded batches"""
+    backend = LocalWorkQueue()
+    backend.push('c1', PROXIES)
+    assert len(backend.pull(1)) == 1
+    assert len(backend.pull(10)) == 1
+    assert backend.pull(10) == []
+
+def test_coordinator_uses_manager():
+    """Test that the coordinator enqueues ProxySourceManager output"""
+    manager = Mock()
+    manager.fetch_all.return_value = PROXIES
+    backend = LocalWorkQueue()
+    cycle = Coordinator(backend, manager=manager).start_cycle(max_proxies=5)
+    manager.fetch_all.assert_called_once_with(max_proxies=5)
+    assert len(backend.pull(10)) == 2
+    assert cycle
+
+@patch('fastProxy.net.get')
+def test_workers_merge_results_by_region(mock_get):
+    """Test that results from several regions merge into one store"""
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_get.return_value = mock_response
+
+    backend = LocalWorkQueue()
+    coordinator = Coordinator(backend)
+    cycle = coordinator.start_cycle(proxies=PROXIES, cycle='c1')
+
+    eu = Worker(backend, region='eu', node='node-eu', batch_size=1)
+    assert eu.run_once() == 1
+
+    mock_get.side_effect = requests.exceptions.RequestException("down")
+    us = Worker(backend, region='us', node='node-us', batch_size=5)
+    assert us.run_once() == 1
+    assert us.run_once() == 0
+
+    store = coordinator.collect(cycle)
+    assert store.reachability() == {
+        'eu': {'probed': 1, 'alive': 1},
+        'us': {'probed': 1, 'alive': 0}
+    }
+    assert len(store.working_proxies()) == 1
+    assert store.working_proxies(region='us') == []
+    assert {r['node'] for r in store.results} == {'node-eu', 'node-us'}
+
+def test_result_store_by_proxy():
+    """Test per-proxy reachability across regions"""
+    store = ResultStore([
+        {'proxy': '1.2.3.4:8080', 'region': 'eu', 'alive': True, 'info': {}},
+        {'proxy': '1.2.3.4:8080', 'region': 'us', 'alive': False, 'info': None},
+    ])
+    assert store.by_proxy() == {'1.2.3.4:8080': {'eu': True, 'us': False}}
+
+def test_unacked_items_are_handed_out_again():
+    """Test that items of a worker that never acknowledged them are redelivered"""
+    backend = LocalWorkQueue(visibility_timeout=0.05)
+    backend.push('c1', PROXIES)
+    first = backend.pull(1)
+    assert [item['data'] for item in first] == PROXIES[:1]
+    assert backend.pull(1)[0]['data'] == PROXIES[1]
+    time.sleep(0.1)
+    redelivered = backend.pull(10)
+    assert [item['data'] for item in redelivered] == PROXIES
+    backend.ack(redelivered)
+    time.sleep(0.1)
+    assert backend.pull(10) == []
+
+@patch('fastProxy.net.get')
+def test_failed_batch_stays_claimed(mock_get):
+    """Test that a batch whose validation raised is neither reported nor acknowledged"""
+    backend = LocalWorkQueue(visibility_timeout=0.05)
+    backend.push('c1', PROXIES)
+    worker = Worker(backend, region='eu', batch_size=5)
+    with patch.object(worker.validator, 'run', side_effect=RuntimeError("boom")):
+        assert worker.run_once() == 2
+    assert backend.results('c1') == []
+    time.sleep(0.1)
+    mock_get.return_value = MagicMock(status_code=200)
+    assert worker.run_once() == 2
+    assert len(backend.results('c1')) == 2
+
+def test_worker_validates_through_proxy_validator():
+    """Test that a worker runs its batch through one ProxyValidator with its own settings"""
+    backend = LocalWorkQueue()
+    backend.push('c1', PROXIES)
+    worker = Worker(backend, region='eu', batch_size=5, thread_count=3, request_timeout=2)
+    assert worker.validator.thread_count == 3
+    assert worker.validator.request_timeout == 2
+    info = {'proxy': '5.6.7.8:3128', 'type': 'http'}
+    with patch.object(worker.validator, 'run', return_value=[info]) as run:
+        assert worker.run_once() == 2
+    run.assert_called_once_with(proxies=PROXIES)
+    results = {r['proxy']: r for r in backend.results('c1')}
+    assert results['5.6.7.8:3128']['alive'] and results['5.6.7.8:3128']['info'] == info
+    assert not results['1.2.3.4:8080']['alive']
+
+def test_redis_backend_with_client():
+    """Test the Redis backend against a mocked client"""
+    client = MagicMock()
+    client.eval.return_value = 1
+    backend = RedisWorkQueue(client=client, cycle_ttl=60)
+    assert backend.push('c1', PROXIES) == 1
+    # Dedup, enqueue and expiry of the seen set happen in one script call
+    script, numkeys, seen_key, queue_key, ttl, key, payload = client.eval.call_args.args[:7]
+    assert (numkeys, seen_key, queue_key, ttl, key) == (2, 'fastproxy:seen:c1', 'fastproxy:queue', 60,
+                                                        '1.2.3.4:8080')
+    assert json.loads(payload) == {'cycle': 'c1', 'data': PROXIES[0]}
+    client.sadd.assert_not_called()
+
+    raw = b'{"cycle": "c1", "data": {"ip": "1.2.3.4"}}'
+    client.eval.return_value = [raw]
+    batch = backend.pull(5)
+    assert batch == [{'cycle': 'c1', 'data': {'ip': '1.2.3.4'}, 'receipt': raw}]
+    assert client.eval.call_args.args[1:4] == (2, 'fastproxy:queue', 'fastproxy:claimed')
+    assert client.eval.call_args.args[-1] == 5
+    backend.ack(batch)
+    client.zrem.assert_called_once_with('fastproxy:claimed', raw)
+
+    backend.report('c1', [{'proxy': '1.2.3.4:8080'}])
+    pipeline = client.pipeline.return_value
+    pipeline.rpush.assert_called_once()
+    pipeline.expire.assert_called_once_with('fastproxy:results:c1', 60)
+    pipeline.execute.assert_called_once()
@@ -0,0 +1,135 @@
+import csv
+import json
+import os
+import pytest
+from datetime import datetime
+from unittest.mock import patch, MagicMock
+from fastProxy.exporters import (
+    CSVExporter, NDJSONExporter, ParquetExporter, get_exporter, FIELDS
+)
+from fastProxy.bench import SyntheticWorkload
+from fastProxy.fastProxy import fetch_proxies, ProxyValidator
+
+PROXIES = [
+    {'proxy': '1.2.3.4:8080', 'type': 'https', 'country': 'Germany', 'code': 'DE',
+     'anonymity': 'elite proxy', 'latency': 120.5},
+    {'proxy': '5.6.7.8:3128', 'type': 'http', 'country': 'United States',
+     'anonymity': 'anonymous proxy', 'latency': 300.0},
+]
+
+def test_csv_export_is_atomic(tmp_path):
+    """Test that the final file only appears on close"""
+    path = str(tmp_path / 'out.csv')
+    exporter = CSVExporter(path).open()
+    exporter.write(PROXIES[0])
+    assert not os.path.exists(path)
+    assert os.path.exists(exporter.tmp_path)
+    exporter.write_many(PROXIES[1:])
+    exporter.close()
+
+    assert not os.path.exists(exporter.tmp_path)
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert list(rows[0].keys()) == FIELDS
+    assert rows[0]['ip'] == '1.2.3.4'
+    assert rows[0]['port'] == '8080'
+    assert rows[0]['protocol'] == 'https'
+    assert rows[0]['latency'] == '120.5'
+    assert rows[0]['code'] == 'DE'
+
+def test_ndjson_export(tmp_path):
+    """Test newline-delimited JSON output"""
+    path = str(tmp_path / 'out.ndjson')
+    with NDJSONExporter(path) as exporter:
+        exporter.write_many(PROXIES)
+    with open(path) as f:
+        rows = [json.loads(line) for line in f]
+    assert [r['port'] for r in rows] == [8080, 3128]
+    assert rows[1]['latency'] == 300.0
+
+def test_export_lists_every_protocol(tmp_path):
+    """Test that a proxy that passed HTTP and HTTPS is exported with both protocols"""
+    path = str(tmp_path / 'out.ndjson')
+    with NDJSONExporter(path) as exporter:
+        exporter.write({'proxy': '1.2.3.4:8080', 'type': 'http', 'protocols': ['http', 'https']})
+        exporter.write({'ip': '5.6.7.8', 'port': 3128, 'protocol': 'socks5'})
+    with open(path) as f:
+        rows = [json.loads(line) for line in f]
+    assert rows[0]['protocol'] == 'http,https'
+    assert rows[1]['protocol'] == 'socks5'
+
+def test_export_aborted_on_error(tmp_path):
+    """Test that a failed export leaves no partial file behind"""
+    path = str(tmp_path / 'out.csv')
+    with pytest.raises(RuntimeError):
+        with CSVExporter(path) as exporter:
+            exporter.write(PROXIES[0])
+            raise RuntimeError("boom")
+    assert not os.path.exists(path)
+    assert not os.path.exists(exporter.tmp_path)
+
+def test_parquet_export(tmp_path):
+    """Test columnar output when pyarrow is installed"""
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = str(tmp_path / 'out.parquet')
+    with ParquetExporter(path, row_group_size=1) as exporter:
+        exporter.write_many(PROXIES)
+    table = pq.read_table(path)
+    assert table.num_rows == 2
+    assert table.column('latency').to_pylist() == [120.5, 300.0]
+
+def test_get_exporter():
+    """Test exporter lookup by format name"""
+    assert isinstance(get_exporter('csv'), CSVExporter)
+    assert get_exporter('NDJSON').path == os.path.join('proxy_list', 'export.ndjson')
+    with pytest.raises(ValueError):
+        get_exporter('xml')
+
+@patch('fastProxy.net.get')
+def test_fetch_proxies_streams_to_exporters(mock_get, tmp_path):
+    """Test that fetch_proxies writes working proxies through exporters"""
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_get.return_value = mock_response
+    path = str(tmp_path / 'out.ndjson')
+
+    proxies = [{'ip': '1.1.1.1', 'port': '8080', 'https': False}]
+    working = fetch_proxies(c=1, t=1, g=False, proxies=proxies, exporters=[NDJSONExporter(path)])
+
+    assert len(working) == 1
+    with open(path) as f:
+        assert json.loads(f.readline())['ip'] == '1.1.1.1'
+
+def test_validator_rows_carry_source_and_check_time(tmp_path):
+    """Test that rows of a real validation run keep the candidate's source and the probe time"""
+    path = str(tmp_path / 'out.ndjson')
+    with SyntheticWorkload(size=2, alive=1.0, slow=0.0) as workload:
+        validator = ProxyValidator(thread_count=2, request_timeout=5, write_csv=False,
+                                   http_url=workload.judge_url, https_url=workload.judge_url, dedup=False)
+        before = datetime.now().replace(microsecond=0)
+        working = validator.run(proxies=workload.candidates(), exporters=[NDJSONExporter(path)])
+        after = datetime.now()
+
+    assert len(working) == 2
+    with open(path) as f:
+        rows = [json.loads(line) for line in f]
+    assert [row['source'] for row in rows] == ['bench-alive', 'bench-alive']
+    for row in rows:
+        assert before <= datetime.strptime(row['checked_at'], '%Y-%m-%d %H:%M:%S') <= after
+
+@pytest.mark.parametrize('path', [None, os.path.join('proxy_list', 'working_proxies.csv')])
+def test_csv_export_alongside_generated_csv(path, tmp_path, monkeypatch):
+    """Test that generate_csv never overwrites a streamed CSV export"""
+    monkeypatch.chdir(tmp_path)
+    with SyntheticWorkload(size=2, alive=1.0, slow=0.0) as workload:
+        validator = ProxyValidator(thread_count=2, request_timeout=5, write_csv=True,
+                                   http_url=workload.judge_url, https_url=workload.judge_url, dedup=False)
+        exporter = get_exporter('csv', path)
+        working, report = validator.run(proxies=workload.candidates(), exporters=[exporter],
+                                        return_report=True)
+
+    assert len(working) == 2
+    with open(exporter.path, newline='') as f:
+        assert csv.DictReader(f).fieldnames == FIELDS
+    assert len(report.exports) == len(set(report.exports))
+    assert os.path.exists(os.path.join('proxy_list', 'working_proxies.csv'))
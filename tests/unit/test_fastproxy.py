@@ -62,7 +62,7 @@ class TestFastProxy(unittest.TestCase):
         while not alive_queue.empty():
             alive_queue.get()
 
-    @patch('requests.get')
+    @patch('fastProxy.net.get')
     def test_alive_ip_check_proxy(self, mock_get):
         """Test proxy validation"""
         proxy_data = {
@@ -91,7 +91,7 @@ class TestFastProxy(unittest.TestCase):
         self.assertEqual(proxy_info['ip'], '127.0.0.1')
         self.assertEqual(proxy_info['port'], '8080')
 
-    @patch('requests.get')
+    @patch('fastProxy.net.get')
     def test_alive_ip_check_proxy(self, mock_get):
         """Test proxy validation"""
         proxy_data = {
@@ -194,7 +194,7 @@ class TestFastProxy(unittest.TestCase):
             'https': 'no'
         }]
         # Mock validation to fail
-        with patch('requests.get', side_effect=requests.exceptions.RequestException):
+        with patch('fastProxy.net.get', side_effect=requests.exceptions.RequestException):
             proxies = fetch_proxies(max_proxies=1)
             assert proxies == []
 
@@ -391,7 +391,7 @@ class TestFastProxy(unittest.TestCase):
             def check_proxy(self, proxy):
                 return False
 
-        with patch('requests.get') as mock_get, \
+        with patch('fastProxy.net.get') as mock_get, \
              patch('fastProxy.fastProxy.alive_ip', return_value=MockThread()), \
              patch('time.time', side_effect=[0, 1, 2, 3, 4, 5] * 100):  # Ensure enough values
             mock_response = MagicMock()
@@ -402,7 +402,7 @@ class TestFastProxy(unittest.TestCase):
 
         # Test missing table
         no_table_html = "<div>No proxy table here</div>"
-        with patch('requests.get') as mock_get:
+        with patch('fastProxy.net.get') as mock_get:
             mock_response = MagicMock()
             mock_response.text = no_table_html
             mock_get.return_value = mock_response
@@ -410,7 +410,7 @@ class TestFastProxy(unittest.TestCase):
             assert proxies == []
 
         # Test timeout during proxy validation
-        with patch('requests.get') as mock_get:
+        with patch('fastProxy.net.get') as mock_get:
             mock_get.side_effect = requests.exceptions.Timeout("Connection timed out")
             proxies = fetch_proxies(max_proxies=1)
             assert proxies == []
@@ -509,7 +509,7 @@ class TestFastProxy(unittest.TestCase):
             </tbody>
         </table>
         """
-        with patch('requests.get') as mock_get, \
+        with patch('fastProxy.net.get') as mock_get, \
              patch('fastProxy.fastProxy.alive_ip') as mock_alive_ip, \
              patch('time.time', side_effect=[0, 1, 2, 3, 4, 5] * 100):
             mock_response = MagicMock()
@@ -523,7 +523,7 @@ class TestFastProxy(unittest.TestCase):
 
     def test_fetch_proxies_request_failure(self):
         """Test fetch_proxies when request fails"""
-        with patch('requests.get', side_effect=requests.exceptions.RequestException("Failed")):
+        with patch('fastProxy.net.get', side_effect=requests.exceptions.RequestException("Failed")):
             proxies = fetch_proxies(max_proxies=1)
             assert proxies == []
 
@@ -576,7 +576,7 @@ class TestFastProxy(unittest.TestCase):
             result = main(proxies=None)
             assert isinstance(result, list)
 
-    @patch('requests.get')
+    @patch('fastProxy.net.get')
     def test_https_proxy_validation(self, mock_get):
         """Test HTTPS proxy validation"""
         proxy_data = {
@@ -725,3 +725,105 @@ class TestFastProxy(unittest.TestCase):
         # Test fetch_proxies with various settings
         fetch_proxies(c=1, t=1, g=True, a=True, max_proxies=1)
         fetch_proxies(c=None, t=None, g=None, a=None)
+
+def test_validator_instances_keep_own_settings():
+    """Test that concurrent validators use their own timeout and judge"""
+    seen = {}
+
+    def fake_get(url, proxies=None, timeout=None, **kwargs):
+        seen.setdefault(url, set()).add(timeout)
+        time.sleep(0.1)
+        response = MagicMock()
+        response.status_code = 200 if url.startswith('http://judge-a') else 500
+        return response
+
+    fast = fastProxy.ProxyValidator(thread_count=2, request_timeout=3, write_csv=False,
+                                    http_url='http://judge-a/ip')
+    slow = fastProxy.ProxyValidator(thread_count=2, request_timeout=7, write_csv=False,
+                                    http_url='http://judge-b/ip')
+    proxies = [{'ip': f'10.1.0.{i}', 'port': '80', 'https': False} for i in range(4)]
+    results = {}
+
+    with patch('fastProxy.net.get', side_effect=fake_get):
+        runs = [
+            threading.Thread(target=lambda: results.update(a=fast.run(proxies=proxies))),
+            threading.Thread(target=lambda: results.update(b=slow.run(proxies=proxies)))
+        ]
+        for run in runs:
+            run.start()
+        for run in runs:
+            run.join()
+
+    assert seen == {'http://judge-a/ip': {3}, 'http://judge-b/ip': {7}}
+    assert len(results['a']) == 4
+    assert results['b'] == []
+    assert alive_queue.empty()
+
+def test_fetch_proxies_uses_validator():
+    """Test that fetch_proxies builds its validator from the given settings"""
+    with patch.object(fastProxy.ProxyValidator, 'run', return_value=[]) as mock_run:
+        assert fetch_proxies(c=3, t=4, g=False, proxies=[]) == []
+        mock_run.assert_called_once()
+    validator = fastProxy.ProxyValidator.from_globals(c=5)
+    assert validator.thread_count == 5
+    assert validator.request_timeout == fastProxy.REQUEST_TIMEOUT
+
+def test_check_proxy_keeps_country_code():
+    """Test that the source country code is carried into the working proxy info"""
+    results = Queue()
+    response = MagicMock(status_code=200)
+    proxy_data = {'ip': '10.0.0.1', 'port': '80', 'code': 'US', 'country': 'United States',
+                  'anonymity': 'elite proxy', 'https': False}
+    with patch('fastProxy.net.get', return_value=response):
+        thread = alive_ip(proxy_data, result_queue=results)
+        thread.check_proxy()
+    assert results.get()['code'] == 'US'
+
+def test_https_and_http_probed_concurrently():
+    """Test that HTTPS capable proxies get both probes at once and record both protocols"""
+    def slow_get(url, **kwargs):
+        time.sleep(0.3)
+        return MagicMock(status_code=200)
+
+    results = Queue()
+    proxy_data = {'ip': '10.0.0.1', 'port': '80', 'https': 'yes', 'anonymity': 'elite'}
+    with patch('fastProxy.net.get', side_effect=slow_get) as mock_get:
+        started = time.monotonic()
+        alive_ip(proxy_data, result_queue=results).check_proxy()
+        elapsed = time.monotonic() - started
+    proxy_info = results.get()
+    assert proxy_info['type'] == 'https'
+    assert proxy_info['protocols'] == ['https', 'http']
+    assert mock_get.call_count == 2
+    assert elapsed < 0.55
+
+def test_https_flag_no_is_not_truthy():
+    """Test that sources reporting https='no' only get the HTTP probe"""
+    results = Queue()
+    proxy_data = {'ip': '10.0.0.1', 'port': '80', 'https': 'no', 'anonymity': 'elite'}
+    with patch('fastProxy.net.get', return_value=MagicMock(status_code=200)) as mock_get:
+        alive_ip(proxy_data, result_queue=results).check_proxy()
+    assert mock_get.call_count == 1
+    assert mock_get.call_args[0][0] == fastProxy.HTTP_URL
+    assert results.get()['protocols'] == ['http']
+
+def test_http_only_capability_recorded():
+    """Test that an HTTPS flagged proxy failing HTTPS is still recorded as HTTP"""
+    def fake_get(url, **kwargs):
+        if url.startswith('https'):
+            raise requests.exceptions.ProxyError('tunnel failed')
+        return MagicMock(status_code=200)
+
+    results = Queue()
+    proxy_data = {'ip': '10.0.0.1', 'port': '80', 'https': True, 'anonymity': 'elite'}
+    with patch('fastProxy.net.get', side_effect=fake_get):
+        alive_ip(proxy_data, result_queue=results).check_proxy()
+    proxy_info = results.get()
+    assert proxy_info['type'] == 'http'
+    assert proxy_info['protocols'] == ['http']
+
+def test_want_fetches_all_candidates_interleaved():
+    """Test that target mode draws on every source instead of the first ten candidates"""
+    with patch.object(fastProxy.ProxySourceManager, 'fetch_all', return_value=[]) as mock_fetch_all:
+        assert fetch_proxies(g=False, want=5) == []
+    mock_fetch_all.assert_called_once_with(max_proxies=0, interleave=True)
@@ -0,0 +1,117 @@
+import threading
+import pytest
+from unittest.mock import patch, MagicMock
+from fastProxy.index import ProxyIndex, GeoEnricher, latency_bucket, index_keys
+
+PROXIES = [
+    {'proxy': '1.1.1.1:80', 'type': 'https', 'code': 'US', 'country': 'United States',
+     'anonymity': 'elite proxy', 'latency': 90.0},
+    {'proxy': '2.2.2.2:80', 'type': 'http', 'code': 'US', 'country': 'United States',
+     'anonymity': 'anonymous', 'latency': 400.0},
+    {'proxy': '3.3.3.3:80', 'type': 'https', 'country': 'DE', 'anonymity': 'elite', 'latency': 900.0},
+    {'proxy': '4.4.4.4:80', 'type': 'https', 'code': 'us', 'country': 'United States',
+     'anonymity': 'elite proxy', 'latency': 7000.0},
+]
+
+def test_latency_bucket():
+    """Test latency bucket boundaries"""
+    assert latency_bucket(None) is None
+    assert latency_bucket(100) == 100
+    assert latency_bucket(101) == 250
+    assert latency_bucket(9000) == 0
+
+def test_index_keys():
+    """Test normalization of indexed attributes"""
+    assert index_keys(PROXIES[2]) == {'code': 'DE', 'protocol': ('https',), 'anonymity': 'elite',
+                                      'latency': 1000, 'asn': None}
+
+def test_proxies_filed_under_every_protocol():
+    """Test that a proxy passing HTTP and HTTPS is found by either protocol"""
+    both = {'proxy': '5.5.5.5:80', 'type': 'https', 'protocols': ['https', 'http'], 'code': 'FR',
+            'anonymity': 'elite', 'latency': 80.0}
+    index = ProxyIndex(PROXIES + [both])
+    assert index.select(code='FR', protocol='http')['proxy'] == '5.5.5.5:80'
+    assert index.select(code='FR', protocol='https')['proxy'] == '5.5.5.5:80'
+    assert index.count(code='FR') == 1
+    assert index.count(protocol='http') == 2
+    index.remove('5.5.5.5:80')
+    assert index.count(protocol='http') == 1
+
+def test_filtered_selection():
+    """Test exact filters, wildcards and latency limits"""
+    index = ProxyIndex(PROXIES)
+    assert len(index) == 4
+    assert index.count() == 4
+    assert index.count(code='us') == 3
+    assert {p['proxy'] for p in index.filter(code='US', protocol='https', anonymity='elite proxy')} == \
+        {'1.1.1.1:80', '4.4.4.4:80'}
+    assert index.count(protocol='https', max_latency=1000) == 2
+    assert index.select(code='US', protocol='https', anonymity='elite', max_latency=500)['proxy'] == '1.1.1.1:80'
+    assert index.select(code='FR') is None
+    assert index.select(code='US', max_latency=50) is None
+
+def test_selection_is_random():
+    """Test that selection spreads over all matching proxies"""
+    index = ProxyIndex(PROXIES)
+    assert {index.select(code='US')['proxy'] for _ in range(200)} == {'1.1.1.1:80', '2.2.2.2:80', '4.4.4.4:80'}
+
+def test_update_and_remove():
+    """Test that re-adding a proxy moves it between buckets and removal unfiles it"""
+    index = ProxyIndex(PROXIES)
+    index.add(dict(PROXIES[0], latency=1500.0))
+    assert index.count(max_latency=250) == 0
+    assert index.count(code='US', max_latency=2000) == 2
+
+    index.remove('1.1.1.1:80')
+    assert '1.1.1.1:80' not in index
+    assert index.count(code='US') == 2
+    index.remove('9.9.9.9:80')
+
+def test_concurrent_updates():
+    """Test that selection stays consistent while other threads update the index"""
+    index = ProxyIndex(PROXIES)
+    errors = []
+
+    def churn():
+        for i in range(500):
+            index.add(dict(PROXIES[i % 4], latency=float(i)))
+            index.remove(PROXIES[(i + 1) % 4]['proxy'])
+            index.add(PROXIES[(i + 1) % 4])
+
+    def read():
+        try:
+            for _ in range(2000):
+                proxy = index.select(protocol='https')
+                assert proxy is None or proxy['type'] == 'https'
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=churn)] + [threading.Thread(target=read) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert index.count() == 4
+
+def test_geo_enrichment():
+    """Test enrichment from mmdb readers, indexing by ASN"""
+    country_db, asn_db = MagicMock(), MagicMock()
+    country_db.get.return_value = {'country': {'iso_code': 'FR', 'names': {'en': 'France'}}}
+    asn_db.get.return_value = {'autonomous_system_number': 64500, 'autonomous_system_organization': 'Example'}
+    maxminddb = MagicMock()
+    maxminddb.open_database.side_effect = [country_db, asn_db]
+
+    with patch.dict('sys.modules', {'maxminddb': maxminddb}):
+        geo = GeoEnricher('country.mmdb', 'asn.mmdb')
+    index = ProxyIndex([{'proxy': '5.5.5.5:3128', 'type': 'http', 'anonymity': 'elite'}], geo=geo)
+    proxy = index.select(code='FR', asn=64500)
+    assert proxy['country'] == 'France'
+    assert proxy['asn_org'] == 'Example'
+    country_db.get.assert_called_with('5.5.5.5')
+
+def test_geo_enricher_requires_maxminddb():
+    """Test the error raised when maxminddb is not installed"""
+    with patch.dict('sys.modules', {'maxminddb': None}):
+        with pytest.raises(ImportError, match='pip install maxminddb'):
+            GeoEnricher('country.mmdb')
@@ -11,6 +11,9 @@ class TestProxyLogger:
                 with patch('fastProxy.logger.logging.StreamHandler') as mock_stream_handler:
                     logger = ProxyLogger()
                     yield logger, mock_makedirs, mock_file_handler, mock_stream_handler
+                    # Drop the mocked handlers from the shared 'fastProxy' logger
+                    logger.logger.removeHandler(mock_file_handler.return_value)
+                    logger.logger.removeHandler(mock_stream_handler.return_value)
 
     def test_logger_initialization(self, logger_instance):
         logger, mock_makedirs, mock_file_handler, mock_stream_handler = logger_instance
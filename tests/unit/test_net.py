@@ -0,0 +1,143 @@
+import socket
+import threading
+import time
+import pytest
+import requests
+from queue import Queue
+from fastProxy import net
+from fastProxy.net import ProbeContext, probe_context
+from fastProxy.fastProxy import ProxyValidator, alive_ip
+
+@pytest.fixture
+def blackhole():
+    """A local server that accepts connections and never answers"""
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(64)
+    conns = []
+    stop = threading.Event()
+
+    def accept():
+        server.settimeout(0.1)
+        while not stop.is_set():
+            try:
+                conns.append(server.accept()[0])
+            except OSError:
+                continue
+
+    thread = threading.Thread(target=accept, daemon=True)
+    thread.start()
+    yield server.getsockname()[1]
+    stop.set()
+    thread.join()
+    for conn in conns:
+        conn.close()
+    server.close()
+
+@pytest.fixture
+def stalled_tunnel():
+    """A local proxy that accepts CONNECT tunnels and then never answers the TLS handshake"""
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(16)
+    conns = []
+
+    def handle(conn):
+        head = b''
+        while b'\r\n\r\n' not in head:
+            chunk = conn.recv(4096)
+            if not chunk:
+                return
+            head += chunk
+        if head.startswith(b'CONNECT'):
+            conn.sendall(b'HTTP/1.1 200 Connection established\r\n\r\n')
+
+    def accept():
+        while True:
+            try:
+                conn = server.accept()[0]
+            except OSError:
+                return
+            conns.append(conn)
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=accept, daemon=True).start()
+    yield server.getsockname()[1]
+    server.close()
+    for conn in conns:
+        conn.close()
+
+@pytest.mark.parametrize('https_check', ['request', 'tls'])
+def test_abort_interrupts_https_handshake(stalled_tunnel, https_check):
+    """Test that aborting an HTTPS probe closes its TLS socket and the thread exits promptly"""
+    thread = alive_ip({'ip': '127.0.0.1', 'port': str(stalled_tunnel), 'https': 'yes'}, result_queue=Queue(),
+                      timeout=10, http_url=f'http://127.0.0.1:{stalled_tunnel}/ip',
+                      https_url='https://judge.invalid/ip', https_check=https_check)
+    thread.start()
+    time.sleep(0.5)
+    started = time.monotonic()
+    assert thread.abort() >= 2
+    thread.join(timeout=3)
+    assert not thread.is_alive()
+    assert time.monotonic() - started < 2
+    assert thread.result is None
+
+def test_abort_interrupts_blocked_request(blackhole):
+    """Test that aborting a probe closes its socket and unblocks the request"""
+    context = ProbeContext()
+    errors = []
+
+    def probe():
+        with probe_context(context):
+            try:
+                net.get(f'http://127.0.0.1:{blackhole}/', timeout=10)
+            except requests.exceptions.RequestException as e:
+                errors.append(e)
+
+    thread = threading.Thread(target=probe)
+    thread.start()
+    time.sleep(0.2)
+    assert context.abort() == 1
+    thread.join(timeout=2)
+    assert not thread.is_alive()
+    assert errors
+
+def test_cancelled_context_refuses_new_connections():
+    """Test that a cancelled probe cannot open new sockets"""
+    context = ProbeContext()
+    context.abort()
+    with probe_context(context):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            net.get('http://127.0.0.1:9/', timeout=1)
+
+def test_aborted_probe_does_not_publish():
+    """Test that results of cancelled probes never reach the result queue"""
+    results = Queue()
+    thread = alive_ip({'ip': '127.0.0.1', 'port': '1'}, result_queue=results)
+    thread.abort()
+    assert thread._publish({'proxy': '127.0.0.1:1'}) is False
+    assert results.empty()
+    assert thread.result is None
+
+def test_run_deadline_releases_threads(blackhole):
+    """Test that a run deadline aborts in-flight probes and joins their threads"""
+    proxies = [{'ip': '127.0.0.1', 'port': str(blackhole), 'https': False} for _ in range(5)]
+    validator = ProxyValidator(thread_count=5, request_timeout=30, write_csv=False,
+                               http_url='http://example.invalid/ip', run_timeout=0.5)
+    before = threading.active_count()
+
+    started = time.monotonic()
+    assert validator.run(proxies=proxies) == []
+    assert time.monotonic() - started < 2
+    assert threading.active_count() <= before
+
+def test_cancel_from_another_thread(blackhole):
+    """Test cooperative cancellation of a running validation"""
+    proxies = [{'ip': '127.0.0.1', 'port': str(blackhole), 'https': False} for _ in range(20)]
+    validator = ProxyValidator(thread_count=2, request_timeout=30, write_csv=False,
+                               http_url='http://example.invalid/ip')
+    threading.Timer(0.3, validator.cancel).start()
+
+    started = time.monotonic()
+    assert validator.run(proxies=proxies) == []
+    assert time.monotonic() - started < 2
@@ -0,0 +1,73 @@
+import json
+from unittest.mock import patch, MagicMock
+from fastProxy.exporters import NDJSONExporter
+from fastProxy.pool import ProxyPool
+from fastProxy.storage import ProxyHistoryStore
+from fastProxy.fastProxy import fetch_proxies
+
+def test_rank_and_filter():
+    """Test ranking candidates by reliability score"""
+    pool = ProxyPool()
+    pool.record('1.1.1.1:80', True, latency=100, now=0)
+    pool.record('2.2.2.2:80', False, now=0)
+    candidates = [{'ip': '2.2.2.2', 'port': '80'}, {'ip': '3.3.3.3', 'port': '80'},
+                  {'ip': '1.1.1.1', 'port': '80'}]
+    ranked = pool.rank(candidates, now=0)
+    assert [c['ip'] for c in ranked] == ['1.1.1.1', '3.3.3.3', '2.2.2.2']
+    assert [c['ip'] for c in pool.rank(candidates, min_score=0.6, now=0)] == ['1.1.1.1']
+
+def test_working_sorted_by_score():
+    """Test that working proxies come back best first"""
+    pool = ProxyPool()
+    pool.record('1.1.1.1:80', True, latency=2000, info={'proxy': '1.1.1.1:80'})
+    pool.record('2.2.2.2:80', True, latency=100, info={'proxy': '2.2.2.2:80'})
+    pool.record('3.3.3.3:80', False)
+    working = pool.working()
+    assert [p['proxy'] for p in working] == ['2.2.2.2:80', '1.1.1.1:80']
+    assert pool.working(limit=1)[0]['score'] > 0.8
+
+def test_scores_persist_in_store(tmp_path):
+    """Test saving and restoring scores alongside the history"""
+    pool = ProxyPool()
+    pool.record('1.1.1.1:80', True, latency=120, info={'proxy': '1.1.1.1:80', 'type': 'http'})
+    with ProxyHistoryStore(str(tmp_path / 'history.db')) as store:
+        assert store.save_scores(pool) == 1
+        restored = ProxyPool()
+        assert store.load_scores(restored) == 1
+    assert restored.get_score('1.1.1.1:80').to_dict() == pool.get_score('1.1.1.1:80').to_dict()
+    assert restored.get_info('1.1.1.1:80')['type'] == 'http'
+
+@patch('fastProxy.net.get')
+def test_fetch_proxies_skips_stable_proxies(mock_get):
+    """Test that proxies which are not due are served from the pool"""
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_get.return_value = mock_response
+    pool = ProxyPool(min_interval=60, max_interval=3600)
+    proxies = [{'ip': '1.1.1.1', 'port': '8080', 'https': False}]
+
+    for _ in range(5):
+        pool.record('1.1.1.1:8080', True, latency=50, info={'proxy': '1.1.1.1:8080', 'type': 'http'})
+    working = fetch_proxies(c=1, t=1, g=False, proxies=proxies, pool=pool)
+    assert mock_get.call_count == 0
+    assert [p['proxy'] for p in working] == ['1.1.1.1:8080']
+
+    fresh = ProxyPool()
+    working = fetch_proxies(c=1, t=1, g=False, proxies=proxies, pool=fresh)
+    assert mock_get.call_count == 1
+    assert fresh.get_score('1.1.1.1:8080').checks == 1
+    assert len(working) == 1
+
+@patch('fastProxy.net.get')
+def test_pool_served_proxies_are_exported(mock_get, tmp_path):
+    """Test that proxies served from the pool without a probe still reach the exporters"""
+    pool = ProxyPool(min_interval=60, max_interval=3600)
+    for _ in range(5):
+        pool.record('1.1.1.1:8080', True, latency=50, info={'proxy': '1.1.1.1:8080', 'type': 'http'})
+    exporter = NDJSONExporter(str(tmp_path / 'working.ndjson'))
+    working = fetch_proxies(c=1, t=1, g=False, proxies=[{'ip': '1.1.1.1', 'port': '8080', 'https': False}],
+                            pool=pool, exporters=[exporter])
+    assert mock_get.call_count == 0
+    assert len(working) == 1
+    with open(exporter.path) as f:
+        assert [json.loads(line)['ip'] for line in f] == ['1.1.1.1']
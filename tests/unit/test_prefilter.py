@@ -0,0 +1,114 @@
+import pytest
+from unittest.mock import patch, MagicMock
+from fastProxy import prefilter as prefilter_module
+from fastProxy.prefilter import Prefilter, NegativeCache, merge_networks, pack_ip, pack_port
+from fastProxy.fastProxy import ProxyValidator
+
+CANDIDATES = [
+    {'ip': '8.8.8.8', 'port': '8080'},
+    {'ip': '10.1.2.3', 'port': '8080'},
+    {'ip': '192.168.1.1', 'port': '3128'},
+    {'ip': '127.0.0.1', 'port': '80'},
+    {'ip': '224.0.0.1', 'port': '80'},
+    {'ip': '1.2.3.4', 'port': '0'},
+    {'ip': '1.2.3.4', 'port': '70000'},
+    {'ip': '1.2.3', 'port': '80'},
+    {'ip': 'not-an-ip', 'port': '80'},
+    {'ip': '45.10.20.30', 'port': '25'},
+    {'ip': '203.0.114.9', 'port': '443'},
+    {'ip': '5.6.7.8', 'port': '3128'},
+]
+
+@pytest.fixture(params=['python', 'numpy'])
+def engine(request):
+    """Run each test with the bisect fallback and, if installed, numpy"""
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+        yield
+    else:
+        with patch.object(prefilter_module, 'np', None):
+            yield
+
+def test_pack_helpers():
+    """Test IP and port packing"""
+    assert pack_ip('1.2.3.4') == 0x01020304
+    assert pack_ip('1.2.3') is None
+    assert pack_ip('::1') is None
+    assert pack_port('8080') == 8080
+    assert pack_port('0') is None
+    assert pack_port('http') is None
+
+def test_merge_networks():
+    """Test that overlapping and adjacent CIDRs are merged into sorted ranges"""
+    starts, ends = merge_networks(['10.0.0.0/9', '10.128.0.0/9', '10.1.0.0/16', '1.1.1.1'])
+    assert starts == [pack_ip('1.1.1.1'), pack_ip('10.0.0.0')]
+    assert ends == [pack_ip('1.1.1.1'), pack_ip('10.255.255.255')]
+
+def test_bogons_and_invalid_entries(engine):
+    """Test that bogon, private, reserved and malformed candidates are dropped"""
+    kept = Prefilter().filter(CANDIDATES)
+    assert [p['ip'] for p in kept] == ['8.8.8.8', '45.10.20.30', '203.0.114.9', '5.6.7.8']
+
+def test_blocklist_and_ports(engine):
+    """Test user blocklisted subnets and ports"""
+    kept = Prefilter(blocklist=['203.0.114.0/24', '5.6.7.8'], blocked_ports=[25]).filter(CANDIDATES)
+    assert [p['ip'] for p in kept] == ['8.8.8.8']
+
+def test_negative_cache(engine):
+    """Test that known-dead proxies are skipped until their entry expires"""
+    cache = NegativeCache(ttl=60)
+    cache.add('8.8.8.8', '8080', now=1000)
+    cache.add('5.6.7.8', '9999', now=1000)
+    prefilter = Prefilter(negative_cache=cache)
+
+    with patch('fastProxy.prefilter.time.time', return_value=1030):
+        kept = prefilter.filter(CANDIDATES)
+    assert '8.8.8.8' not in [p['ip'] for p in kept]
+    assert '5.6.7.8' in [p['ip'] for p in kept]
+    assert prefilter.stats == {'candidates': 12, 'kept': 3, 'dropped': 9}
+
+    with patch('fastProxy.prefilter.time.time', return_value=1061):
+        assert '8.8.8.8' in [p['ip'] for p in prefilter.filter(CANDIDATES)]
+    assert len(cache) == 0
+
+def test_disable_bogons(engine):
+    """Test that bogon filtering can be turned off for lab networks"""
+    kept = Prefilter(drop_bogons=False).filter(CANDIDATES)
+    assert len(kept) == 8
+
+@patch('fastProxy.net.get')
+def test_validator_applies_prefilter(mock_get):
+    """Test that the validator screens candidates and feeds dead proxies back"""
+    mock_get.side_effect = lambda *args, **kwargs: MagicMock(status_code=500)
+    cache = NegativeCache()
+    prefilter = Prefilter(negative_cache=cache)
+    validator = ProxyValidator(thread_count=2, request_timeout=1, write_csv=False)
+
+    assert validator.run(proxies=CANDIDATES[:4], prefilter=prefilter) == []
+    assert mock_get.call_count == 1
+    assert len(cache) == 1
+    assert validator.run(proxies=CANDIDATES[:4], prefilter=prefilter) == []
+    assert mock_get.call_count == 1
+
+def test_working_proxies_without_ip_key(engine):
+    """Test that proxies carrying only 'proxy' are screened and remembered like candidates"""
+    cache = NegativeCache()
+    prefilter = Prefilter(negative_cache=cache)
+    prefilter.record_dead({'proxy': '8.8.8.8:8080', 'type': 'http'})
+    assert len(cache) == 1
+    kept = prefilter.filter([{'proxy': '8.8.8.8:8080'}, {'proxy': '10.0.0.1:80'}, {'proxy': '5.6.7.8:3128'}])
+    assert kept == [{'proxy': '5.6.7.8:3128'}]
+
+@patch('fastProxy.net.get')
+@patch('fastProxy.proxy_sources.manager.ProxySourceManager.fetch_all')
+def test_fetched_candidates_prefiltered_by_default(mock_fetch_all, mock_get):
+    """Test that candidates from the sources are screened and dead ones skipped on the next run"""
+    mock_fetch_all.return_value = CANDIDATES[:4]
+    mock_get.side_effect = lambda *args, **kwargs: MagicMock(status_code=500)
+    validator = ProxyValidator(thread_count=2, request_timeout=1, write_csv=False)
+
+    assert validator.run() == []
+    assert mock_get.call_count == 1
+    assert validator.run() == []
+    assert mock_get.call_count == 1
+    assert len(prefilter_module.default_prefilter().negative_cache) == 1
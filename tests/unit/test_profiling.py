@@ -0,0 +1,112 @@
+import json
+import os
+import time
+import pstats
+from unittest.mock import patch, MagicMock
+from fastProxy.exporters import NDJSONExporter
+from fastProxy.fastProxy import ProxyValidator
+from fastProxy.logger import logger
+from fastProxy.profiling import StageTimer, RunReport, profiling_requested, PROFILE_ENV
+
+def test_stage_timer_accumulates():
+    """Test that repeated stages add up wall time and count"""
+    timer = StageTimer()
+    for _ in range(2):
+        with timer.stage('sleep'):
+            time.sleep(0.01)
+    timer.add('connect', 0.5, 0.1)
+    stages = timer.stages()
+    assert stages['sleep']['count'] == 2
+    assert stages['sleep']['wall'] >= 0.02
+    assert stages['sleep']['cpu'] < stages['sleep']['wall']
+    assert stages['connect'] == {'wall': 0.5, 'cpu': 0.1, 'count': 1}
+
+@patch('fastProxy.net.get')
+def test_validator_records_stages(mock_get):
+    """Test that a run keeps per-stage timings in last_report"""
+    mock_get.return_value = MagicMock(status_code=200)
+    validator = ProxyValidator(thread_count=2, write_csv=False)
+    proxies = [{'ip': f'10.0.4.{i}', 'port': '80', 'https': 'no'} for i in range(3)]
+    working = validator.run(proxies=proxies)
+
+    report = validator.last_report
+    assert report.working == len(working) == 3
+    assert report.elapsed > 0
+    assert report.stages['probe_http']['count'] == 3
+    assert report.stages['validate']['count'] == 1
+    assert report.profile_path is None
+
+def test_connect_stage_recorded(tmp_path):
+    """Test that TCP connects of probes are timed through the probe context"""
+    validator = ProxyValidator(thread_count=1, request_timeout=1, write_csv=False,
+                               http_url='http://127.0.0.1:9/ip')
+    validator.run(proxies=[{'ip': '127.0.0.1', 'port': '9', 'https': 'no'}])
+    stages = validator.last_report.stages
+    assert stages['resolve']['count'] >= 1
+    assert stages['connect']['count'] >= 1
+
+@patch('fastProxy.net.get')
+def test_profile_dumped_to_log_dir(mock_get, tmp_path, monkeypatch):
+    """Test that profile=True or the environment variable saves a profile"""
+    mock_get.return_value = MagicMock(status_code=200)
+    monkeypatch.setattr(logger, 'log_dir', str(tmp_path))
+    validator = ProxyValidator(thread_count=1, write_csv=False)
+    validator.run(proxies=[{'ip': '10.0.4.1', 'port': '80', 'https': 'no'}], profile=True)
+
+    path = validator.last_report.profile_path
+    assert os.path.dirname(path) == str(tmp_path)
+    if path.endswith('.prof'):
+        assert pstats.Stats(path).total_calls > 0
+
+    monkeypatch.setenv(PROFILE_ENV, '1')
+    assert profiling_requested()
+    assert not profiling_requested(False)
+    monkeypatch.setenv(PROFILE_ENV, 'no')
+    assert not profiling_requested()
+
+@patch('fastProxy.net.get')
+def test_return_report(mock_get, tmp_path):
+    """Test that return_report=True gives the working proxies and a full RunReport"""
+    mock_get.side_effect = lambda url, proxies=None, **kwargs: MagicMock(
+        status_code=200 if '10.0.5.1:' in str(proxies) else 503)
+    proxies = [{'ip': '10.0.5.1', 'port': '80', 'https': 'yes', 'source': 'a'},
+               {'ip': '10.0.5.1', 'port': '80', 'https': 'yes', 'source': 'b'},
+               {'ip': '10.0.5.2', 'port': '80', 'https': 'no', 'source': 'b'},
+               {'ip': '10.0.5.3', 'port': '80', 'https': 'no', 'source': 'b'}]
+    exporter = NDJSONExporter(str(tmp_path / 'working.ndjson'))
+    validator = ProxyValidator(thread_count=2, write_csv=False)
+    working, report = validator.run(proxies=proxies, max_proxies=2, exporters=[exporter], return_report=True)
+
+    assert report is validator.last_report
+    assert [p['proxy'] for p in working] == ['10.0.5.1:80']
+    assert report.candidates == 4
+    assert report.candidates_by_source == {'a': 1, 'b': 3}
+    assert report.dropped == {'duplicate': 1, 'max_proxies': 1}
+    assert report.outcomes == {'alive': 1, 'dead': 1}
+    assert report.probes == 2 and report.timeouts == 0
+    assert report.protocols['http'] == {'probed': 2, 'working': 1}
+    assert report.protocols['https'] == {'probed': 1, 'working': 1}
+    assert report.latency['count'] == 1
+    assert report.exports == [exporter.path]
+    assert report.stop_reason is None
+
+    data = json.loads(json.dumps(report.to_dict()))
+    assert data['working'] == 1
+    assert data['latency_ms']['p50'] == working[0]['latency']
+    assert 'validate' in data['stages']
+
+def test_report_counts_timeouts_and_stop_reason():
+    """Test probe outcome bookkeeping for timeouts and cancelled runs"""
+    report = RunReport()
+    report.record_probe('timeout', ['http'])
+    report.record_probe('cancelled')
+    report.drop('prefilter', 0)
+    report.stop_reason = 'deadline'
+    report.finish([])
+    data = report.to_dict()
+    assert data['timeouts'] == 1
+    assert data['probes'] == 2
+    assert data['dropped'] == {}
+    assert data['protocols'] == {'http': {'probed': 1, 'working': 0}}
+    assert data['latency_ms']['p50'] is None
+    assert data['stop_reason'] == 'deadline'
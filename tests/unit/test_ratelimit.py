@@ -0,0 +1,101 @@
+import asyncio
+import time
+from unittest.mock import MagicMock
+from fastProxy.ratelimit import TokenBucket, HostRateLimiter, Backoff, retry_after_seconds
+from fastProxy.proxy_sources.geonode import GeoNodeSource
+
+def test_token_bucket_burst_and_refill():
+    """Test that the bucket allows a burst and then refills at its rate"""
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == 0
+    wait = bucket.try_acquire()
+    assert 0 < wait <= 0.1
+
+    started = time.monotonic()
+    assert bucket.acquire()
+    assert 0.05 < time.monotonic() - started < 0.3
+    stats = bucket.stats()
+    assert stats['acquired'] == 3
+    assert stats['throttled'] == 1
+    assert stats['wait_time'] > 0
+
+def test_token_bucket_timeout():
+    """Test that acquire gives up after its timeout"""
+    bucket = TokenBucket(rate=0.1, capacity=1)
+    assert bucket.acquire()
+    assert bucket.acquire(timeout=0.05) is False
+
+def test_penalize_blocks_bucket():
+    """Test that a penalty holds back tokens for its duration"""
+    bucket = TokenBucket(rate=100, capacity=10)
+    bucket.penalize(0.2)
+    assert bucket.try_acquire() > 0.1
+    assert bucket.stats()['penalties'] == 1
+
+def test_async_acquire_does_not_block_other_tasks():
+    """Test that waiting for tokens asynchronously lets other coroutines run"""
+    bucket = TokenBucket(rate=10, capacity=1)
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        assert await bucket.acquire_async()
+        await asyncio.gather(bucket.acquire_async(), ticker())
+
+    asyncio.run(scenario())
+    assert len(ticks) == 5
+
+def test_host_rate_limiter_shares_buckets():
+    """Test that URLs of one host share a bucket and limits can be overridden"""
+    limiter = HostRateLimiter(rate=1, capacity=5, limits={'slow.example': (0.5, 1)})
+    assert limiter.bucket('https://a.example/x') is limiter.bucket('http://A.example/y')
+    assert limiter.bucket('https://slow.example/').capacity == 1
+    limiter.acquire('https://a.example/x')
+    assert limiter.stats()['a.example']['acquired'] == 1
+
+def test_backoff_delays():
+    """Test jittered exponential delays and Retry-After lower bound"""
+    backoff = Backoff(base=1, factor=2, max_delay=10)
+    for attempt, ceiling in [(0, 1), (1, 2), (2, 4), (5, 10)]:
+        delay = backoff.delay(attempt)
+        assert ceiling / 2 <= delay <= ceiling
+    assert backoff.delay(0, retry_after=7) >= 7
+    assert backoff.delay(0, retry_after=500) <= 10
+
+def test_retry_after_parsing():
+    """Test Retry-After in seconds and as an HTTP date"""
+    assert retry_after_seconds(MagicMock(headers={'Retry-After': '3'})) == 3
+    assert retry_after_seconds(MagicMock(headers={})) is None
+    date = MagicMock(headers={'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'})
+    assert retry_after_seconds(date) == 0
+
+def test_make_request_retries_after_429(requests_mock):
+    """Test that a 429 penalizes the host bucket and the request is retried"""
+    source = GeoNodeSource()
+    source.rate_limiter = HostRateLimiter(rate=100, capacity=10)
+    source.backoff = Backoff(base=0.01, max_delay=0.05)
+    requests_mock.get(source.API_URL, [
+        {'status_code': 429, 'headers': {'Retry-After': '0'}},
+        {'json': {'data': [{'ip': '1.2.3.4', 'port': 8080, 'protocols': ['http']}]}}
+    ])
+
+    proxies = source.fetch()
+    assert [p['ip'] for p in proxies] == ['1.2.3.4']
+    stats = source.rate_limiter.stats()['proxylist.geonode.com']
+    assert stats['penalties'] == 1
+    assert stats['acquired'] == 2
+
+def test_make_request_gives_up_after_retries(requests_mock):
+    """Test that persistent 429s end with no response"""
+    source = GeoNodeSource()
+    source.rate_limiter = HostRateLimiter(rate=100, capacity=10)
+    source.backoff = Backoff(base=0.01, max_delay=0.02, max_retries=2)
+    requests_mock.get(source.API_URL, status_code=429)
+
+    assert source._make_request(source.API_URL) is None
+    assert requests_mock.call_count == 3
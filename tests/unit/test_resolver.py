@@ -0,0 +1,116 @@
+import socket
+import threading
+import time
+import pytest
+import requests
+from unittest.mock import patch
+from fastProxy import net
+from fastProxy.resolver import ResolverCache, ip_literal
+
+ADDRINFO = [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, '', ('93.184.216.34', 0))]
+
+def test_ip_literal():
+    """Test detection of IPv4 and IPv6 literals"""
+    assert ip_literal('1.2.3.4') is not None
+    assert ip_literal('[::1]') is not None
+    assert ip_literal('httpbin.org') is None
+
+@patch('socket.getaddrinfo')
+def test_ip_literals_skip_lookup(mock_getaddrinfo):
+    """Test that proxy IP addresses never reach the resolver"""
+    cache = ResolverCache()
+    assert cache.resolve('1.2.3.4', 8080) == [
+        (socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, '', ('1.2.3.4', 8080))]
+    assert cache.resolve('::1', 80)[0][4] == ('::1', 80, 0, 0)
+    with pytest.raises(socket.gaierror):
+        cache.resolve('::1', 80, socket.AF_INET)
+    mock_getaddrinfo.assert_not_called()
+    assert cache.literals == 3
+
+@patch('socket.getaddrinfo', return_value=ADDRINFO)
+def test_names_resolved_once_per_ttl(mock_getaddrinfo):
+    """Test that host names are cached with a TTL and the requested port"""
+    cache = ResolverCache(ttl=60)
+    with patch('fastProxy.resolver.time.monotonic', return_value=100):
+        assert cache.resolve('httpbin.org', 80)[0][4] == ('93.184.216.34', 80)
+        assert cache.resolve('HTTPBIN.org', 443)[0][4] == ('93.184.216.34', 443)
+    assert mock_getaddrinfo.call_count == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    with patch('fastProxy.resolver.time.monotonic', return_value=161):
+        cache.resolve('httpbin.org', 80)
+    assert mock_getaddrinfo.call_count == 2
+
+@patch('socket.getaddrinfo', side_effect=socket.gaierror(socket.EAI_NONAME, 'not known'))
+def test_failures_are_negatively_cached(mock_getaddrinfo):
+    """Test that lookup failures are remembered for negative_ttl"""
+    cache = ResolverCache(negative_ttl=30)
+    for _ in range(3):
+        with pytest.raises(socket.gaierror):
+            cache.resolve('no.such.host', 80)
+    assert mock_getaddrinfo.call_count == 1
+
+def test_concurrent_lookups_are_coalesced():
+    """Test that parallel lookups of one name share a single resolver call"""
+    calls = []
+
+    def slow_getaddrinfo(*args):
+        calls.append(args)
+        time.sleep(0.2)
+        return ADDRINFO
+
+    cache = ResolverCache()
+    with patch('socket.getaddrinfo', side_effect=slow_getaddrinfo):
+        threads = [threading.Thread(target=cache.resolve, args=('httpbin.org', 80)) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert len(calls) == 1
+
+@patch('socket.getaddrinfo', return_value=ADDRINFO)
+def test_max_entries(mock_getaddrinfo):
+    """Test that the cache does not grow beyond max_entries"""
+    cache = ResolverCache(max_entries=2)
+    for host in ('a.example', 'b.example', 'c.example'):
+        cache.resolve(host, 80)
+    assert len(cache) == 2
+
+def test_connections_use_shared_resolver():
+    """Test that only the net sessions go through the shared resolver cache"""
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+    port = server.getsockname()[1]
+    net.resolver.clear()
+    try:
+        with patch('socket.getaddrinfo', wraps=socket.getaddrinfo) as mock_getaddrinfo:
+            for _ in range(2):
+                with pytest.raises(requests.exceptions.RequestException):
+                    net.get(f'http://localhost:{port}/', timeout=0.2)
+            assert mock_getaddrinfo.call_count == 1
+            # Requests of the host application keep resolving through urllib3
+            for _ in range(2):
+                with pytest.raises(requests.exceptions.RequestException):
+                    requests.get(f'http://localhost:{port}/', timeout=0.2)
+            assert mock_getaddrinfo.call_count == 3
+    finally:
+        server.close()
+
+@patch('socket.getaddrinfo', side_effect=socket.gaierror(socket.EAI_NONAME, 'not known'))
+def test_cached_failure_raises_fresh_error(mock_getaddrinfo):
+    """Test that every lookup of a cached failure raises a new error with a short traceback"""
+    cache = ResolverCache(negative_ttl=30)
+    errors = []
+    for _ in range(50):
+        with pytest.raises(socket.gaierror) as info:
+            cache.resolve('no.such.host', 80)
+        errors.append(info.value)
+    assert len({id(e) for e in errors}) == 50
+    assert errors[-1].args == (socket.EAI_NONAME, 'not known')
+    depth = 0
+    tb = errors[-1].__traceback__
+    while tb is not None:
+        depth += 1
+        tb = tb.tb_next
+    assert depth < 5
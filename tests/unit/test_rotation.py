@@ -0,0 +1,142 @@
+import pytest
+from unittest.mock import patch
+from fastProxy.pool import ProxyPool
+from fastProxy.rotation import ProxyRotator, domain_of
+
+def make_proxies(n):
+    return [{'proxy': f'10.0.0.{i}:8080', 'type': 'http', 'latency': 100.0} for i in range(1, n + 1)]
+
+@pytest.fixture
+def clock():
+    """Controllable monotonic clock for cooldowns and sticky sessions"""
+    now = [1000.0]
+    with patch('fastProxy.rotation.time.monotonic', side_effect=lambda: now[0]):
+        yield now
+
+def test_domain_of():
+    """Test domain extraction from URLs and bare domains"""
+    assert domain_of('https://Example.com:8443/path') == 'example.com'
+    assert domain_of('example.com/path') == 'example.com'
+    assert domain_of('example.com:80') == 'example.com'
+
+def test_round_robin_per_domain():
+    """Test that load is spread evenly over proxies for each domain"""
+    rotator = ProxyRotator(make_proxies(3))
+    picked = []
+    for _ in range(6):
+        proxy = rotator.acquire('https://example.com/')
+        picked.append(proxy['proxy'])
+        rotator.release(proxy, 'https://example.com/')
+    assert picked == ['10.0.0.1:8080', '10.0.0.2:8080', '10.0.0.3:8080'] * 2
+    assert rotator.acquire('other.org')['proxy'] == '10.0.0.1:8080'
+
+def test_concurrency_cap():
+    """Test that a proxy never serves more than max_concurrency requests"""
+    rotator = ProxyRotator(make_proxies(2), max_concurrency=2)
+    leases = [rotator.acquire('example.com') for _ in range(4)]
+    assert all(leases)
+    assert rotator.acquire('example.com') is None
+    assert rotator.stats()['in_flight'] == {'10.0.0.1:8080': 2, '10.0.0.2:8080': 2}
+
+    rotator.release(leases[0], 'example.com')
+    assert rotator.acquire('example.com')['proxy'] == leases[0]['proxy']
+
+def test_sticky_sessions(clock):
+    """Test that a session keeps its proxy until it expires or gets blocked"""
+    rotator = ProxyRotator(make_proxies(3), sticky_ttl=60)
+    first = rotator.acquire('example.com', session='user-1')
+    rotator.release(first, 'example.com')
+    for _ in range(3):
+        proxy = rotator.acquire('example.com', session='user-1')
+        assert proxy['proxy'] == first['proxy']
+        rotator.release(proxy, 'example.com')
+
+    rotator.release(rotator.acquire('example.com', session='user-1'), 'example.com', status=429)
+    moved = rotator.acquire('example.com', session='user-1')
+    assert moved['proxy'] != first['proxy']
+    rotator.release(moved, 'example.com')
+
+    clock[0] += 61
+    assert rotator.acquire('example.com', session='user-1')['proxy'] != moved['proxy']
+
+def test_cooldown_after_rate_limit(clock):
+    """Test that 429/403 put a proxy on cooldown for that domain only, with backoff"""
+    rotator = ProxyRotator(make_proxies(2), cooldown=10)
+    blocked = rotator.acquire('example.com')
+    rotator.release(blocked, 'example.com', status=429)
+
+    for _ in range(4):
+        proxy = rotator.acquire('example.com')
+        assert proxy['proxy'] != blocked['proxy']
+        rotator.release(proxy, 'example.com')
+    assert rotator.acquire('other.org')['proxy'] == blocked['proxy']
+
+    clock[0] += 10
+    seen = set()
+    for _ in range(2):
+        proxy = rotator.acquire('example.com')
+        seen.add(proxy['proxy'])
+        rotator.release(proxy, 'example.com', status=403 if proxy['proxy'] == blocked['proxy'] else 200)
+    assert blocked['proxy'] in seen
+
+    # Second strike doubles the cooldown
+    clock[0] += 10
+    assert all(rotator.acquire('example.com')['proxy'] != blocked['proxy'] for _ in range(2))
+    clock[0] += 10
+    assert blocked['proxy'] in {rotator.acquire('example.com')['proxy'] for _ in range(2)}
+
+def test_update_and_remove():
+    """Test adding proxies to known domains and removing proxies"""
+    rotator = ProxyRotator(make_proxies(1), max_concurrency=100)
+    assert rotator.acquire('example.com')['proxy'] == '10.0.0.1:8080'
+    rotator.update(make_proxies(2))
+    assert len(rotator) == 2
+    assert {rotator.acquire('example.com')['proxy'] for _ in range(2)} == {'10.0.0.1:8080', '10.0.0.2:8080'}
+
+    rotator.remove('10.0.0.1:8080')
+    assert {rotator.acquire('example.com')['proxy'] for _ in range(3)} == {'10.0.0.2:8080'}
+
+def test_pool_ordering_and_feedback():
+    """Test that proxies are handed out in score order and outcomes reach the pool"""
+    pool = ProxyPool()
+    pool.record('10.0.0.2:8080', alive=True, latency=50)
+    pool.record('10.0.0.1:8080', alive=False)
+    rotator = ProxyRotator(make_proxies(2), pool=pool)
+
+    proxy = rotator.acquire('example.com')
+    assert proxy['proxy'] == '10.0.0.2:8080'
+    rotator.release(proxy, 'example.com', error=True)
+    assert pool.get_score('10.0.0.2:8080').checks == 2
+
+def test_lease_context_manager():
+    """Test that lease() releases the proxy and reports errors"""
+    rotator = ProxyRotator(make_proxies(1), max_concurrency=1)
+    with rotator.lease('example.com') as proxy:
+        assert proxy['proxy'] == '10.0.0.1:8080'
+        assert rotator.acquire('example.com') is None
+    with pytest.raises(RuntimeError):
+        with rotator.lease('example.com'):
+            raise RuntimeError('boom')
+    assert rotator.stats()['in_flight'] == {}
+
+def test_remove_and_readd_keeps_one_entry():
+    """Test that removal clears in-flight counts and a re-added proxy is rotated once"""
+    rotator = ProxyRotator(make_proxies(2), max_concurrency=100)
+    leased = rotator.acquire('example.com')
+    rotator.remove(leased['proxy'])
+    assert rotator.stats()['in_flight'] == {}
+    rotator.update([leased])
+    picked = [rotator.acquire('example.com')['proxy'] for _ in range(4)]
+    assert sorted(picked) == ['10.0.0.1:8080', '10.0.0.1:8080', '10.0.0.2:8080', '10.0.0.2:8080']
+
+def test_domains_are_evicted_and_synced_lazily():
+    """Test that idle domains are evicted and updates only touch domains when they are used"""
+    rotator = ProxyRotator(make_proxies(1), max_domains=2)
+    for domain in ('a.com', 'b.com', 'c.com'):
+        rotator.release(rotator.acquire(domain), domain)
+    assert list(rotator._domains) == ['b.com', 'c.com']
+
+    rotator.update(make_proxies(2))
+    assert len(rotator._domains['b.com'][0]) == 1
+    assert {rotator.acquire('b.com')['proxy'] for _ in range(2)} == {'10.0.0.1:8080', '10.0.0.2:8080'}
+    assert len(rotator._domains['b.com'][0]) == 2
@@ -0,0 +1,120 @@
+import time
+import pytest
+from unittest.mock import MagicMock
+from fastProxy.pool import ProxyPool, proxy_id
+from fastProxy.scheduler import RevalidationScheduler
+
+
+def _candidate(n):
+    return {'ip': f"10.0.{n // 256}.{n % 256}", 'port': '8080'}
+
+
+def _validator(pool, alive=lambda key: True):
+    """Validator stub that records every probe in the pool like ProxyValidator.run"""
+    validator = MagicMock()
+
+    def run(proxies, pool):
+        working = []
+        for proxy in proxies:
+            key = proxy_id(proxy)
+            pool.record(key, alive(key), 100.0, info={'proxy': key})
+            if alive(key):
+                working.append({'proxy': key})
+        return working
+
+    validator.run.side_effect = run
+    return validator
+
+
+def test_new_proxies_due_immediately_and_budget_caps_batch():
+    """Test that unchecked proxies are due now and one step never exceeds the burst"""
+    pool = ProxyPool()
+    scheduler = RevalidationScheduler(pool, validator=_validator(pool), budget=5, burst=5)
+    assert scheduler.add([_candidate(n) for n in range(20)]) == 20
+    assert scheduler.add([_candidate(0)]) == 0
+
+    assert len(scheduler.step()) == 5
+    assert len(scheduler.step()) == 0  # budget exhausted
+    stats = scheduler.stats()
+    assert stats['probed'] == 5
+    assert stats['scheduled'] == 20
+    assert stats['overdue'] == 15
+
+
+def test_checked_proxies_rescheduled_by_stability():
+    """Test that stable proxies are pushed out further than flapping ones"""
+    pool = ProxyPool(min_interval=60, max_interval=3600)
+    now = time.time()
+    for i in range(10):
+        pool.record('1.1.1.1:80', True, 100, now=now - 5 + i * 0.1)
+        pool.record('2.2.2.2:80', i % 2 == 0, 100, now=now - 5 + i * 0.1)
+    stable = pool.due_at('1.1.1.1:80', now)
+    flapping = pool.due_at('2.2.2.2:80', now)
+    assert pool.due_at('3.3.3.3:80') is None
+    assert flapping < stable
+
+    scheduler = RevalidationScheduler(pool, validator=_validator(pool), budget=100)
+    scheduler.add([{'proxy': '1.1.1.1:80'}, {'proxy': '2.2.2.2:80'}, {'ip': '3.3.3.3', 'port': '80'}], now=now)
+    assert [proxy_id(p) for p in scheduler.due(now)] == ['3.3.3.3:80']
+    assert scheduler.next_due() == pytest.approx(flapping)
+    assert [proxy_id(p) for p in scheduler.due(stable + 1)] == ['2.2.2.2:80', '1.1.1.1:80']
+
+
+def test_step_reschedules_after_probe():
+    """Test that probed proxies go back on the heap with their new due time"""
+    pool = ProxyPool(min_interval=60, max_interval=3600)
+    validator = _validator(pool, alive=lambda key: key.endswith('0.0:8080'))
+    scheduler = RevalidationScheduler(pool, validator=validator, budget=100)
+    scheduler.add([_candidate(0), _candidate(1)])
+    assert [p['proxy'] for p in scheduler.step()] == ['10.0.0.0:8080']
+    assert scheduler.step() == []
+    next_due = scheduler.next_due()
+    assert next_due > time.time() + 30
+    assert validator.run.call_count == 1
+
+
+def test_validator_errors_keep_proxies_scheduled():
+    """Test that a failing batch is rescheduled instead of lost"""
+    pool = ProxyPool()
+    validator = MagicMock()
+    validator.run.side_effect = RuntimeError('boom')
+    scheduler = RevalidationScheduler(pool, validator=validator, budget=10)
+    scheduler.add([_candidate(0)])
+    assert scheduler.step() == []
+    assert len(scheduler) == 1
+    assert scheduler.next_due() is not None
+    scheduler.remove('10.0.0.0:8080')
+    assert scheduler.next_due() is None
+
+
+def test_run_respects_budget_rate():
+    """Test that a continuous run probes about budget proxies per second"""
+    pool = ProxyPool()
+    validator = _validator(pool)
+    scheduler = RevalidationScheduler(pool, validator=validator, budget=20, burst=5)
+    scheduler.add([_candidate(n) for n in range(200)])
+    scheduler.run(duration=0.5)
+    # Initial burst of 5 plus 20 per second
+    assert 5 <= scheduler.probed <= 5 + 20 * 0.5 + 5
+
+
+def test_run_holds_budget_with_slow_probes():
+    """Test that probes waiting out their timeout do not hold the rate below the budget"""
+    pool = ProxyPool()
+    validator = _validator(pool, alive=lambda key: False)
+    run = validator.run.side_effect
+
+    def slow_run(proxies, pool):
+        time.sleep(1.0)  # dead proxies, every probe runs into the timeout
+        return run(proxies, pool)
+
+    validator.run.side_effect = slow_run
+    scheduler = RevalidationScheduler(pool, validator=validator, budget=20, burst=5)
+    scheduler.add([_candidate(n) for n in range(200)])
+    started = time.monotonic()
+    scheduler.run(duration=1.0)
+    # Waiting for each batch would probe 5; the budget allows 5 plus 20 per second
+    assert 15 <= scheduler.probed <= 5 + 20 * 1.0 + 5
+    assert scheduler.alive == 0
+    assert scheduler.stats()['batches'] == 0
+    assert time.monotonic() - started < 2.5
@@ -0,0 +1,52 @@
+import pytest
+from fastProxy.scoring import ReliabilityScore
+
+def test_first_observation_sets_score():
+    """Test that the first check replaces the prior"""
+    score = ReliabilityScore()
+    assert score.success_rate(now=0) == 0.5
+    score.update(True, latency=200, now=0)
+    assert score.success_rate(now=0) == 1.0
+    assert score.latency == 200
+
+def test_ewma_moves_towards_observations():
+    """Test that repeated failures pull the success rate down gradually"""
+    score = ReliabilityScore(alpha=0.3)
+    score.update(True, now=0)
+    score.update(False, now=0)
+    assert score.success_rate(now=0) == pytest.approx(0.7)
+    score.update(False, now=0)
+    assert score.success_rate(now=0) == pytest.approx(0.49)
+    assert score.flaps == 1
+
+def test_time_decay_towards_prior():
+    """Test that stale evidence decays back to the prior"""
+    score = ReliabilityScore(half_life=100)
+    score.update(True, now=0)
+    assert score.success_rate(now=100) == pytest.approx(0.75)
+    assert score.success_rate(now=10000) == pytest.approx(0.5, abs=1e-6)
+
+def test_latency_lowers_value():
+    """Test that slow proxies score lower than fast ones"""
+    fast, slow = ReliabilityScore(), ReliabilityScore()
+    fast.update(True, latency=100, now=0)
+    slow.update(True, latency=3000, now=0)
+    assert fast.value(now=0) > slow.value(now=0)
+
+def test_stable_proxies_checked_less_often():
+    """Test that revalidation interval grows with stability"""
+    stable, flapping = ReliabilityScore(), ReliabilityScore()
+    for i in range(10):
+        stable.update(True, now=0)
+        flapping.update(i % 2 == 0, now=0)
+    assert stable.next_check_interval(now=0) > flapping.next_check_interval(now=0)
+    assert flapping.is_due(now=120)
+    assert not stable.is_due(now=120)
+    assert ReliabilityScore().is_due(now=0)
+
+def test_round_trip():
+    """Test serialization used for persistence"""
+    score = ReliabilityScore()
+    score.update(True, latency=150, now=10)
+    restored = ReliabilityScore.from_dict(score.to_dict())
+    assert restored.to_dict() == score.to_dict()
@@ -0,0 +1,176 @@
+import asyncio
+import socket
+from fastProxy.pool import ProxyPool
+from fastProxy.rotation import ProxyRotator
+from fastProxy.server import ForwardProxyServer
+
+def free_port():
+    """Return a local port nothing listens on"""
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+async def start_upstream(name, status=200):
+    """Fake upstream proxy: answers HTTP requests itself and tunnels CONNECT to the target"""
+    async def handle(reader, writer):
+        head = await reader.readuntil(b'\r\n\r\n')
+        method, target = head.split()[:2]
+        if method == b'CONNECT':
+            host, port = target.decode().rsplit(':', 1)
+            up_reader, up_writer = await asyncio.open_connection(host, int(port))
+            writer.write(b'HTTP/1.1 200 Connection established\r\n\r\n')
+            data = await reader.read(1024)
+            up_writer.write(data)
+            writer.write(await up_reader.read(1024))
+            up_writer.close()
+        else:
+            body = f"{name} {target.decode()}".encode()
+            writer.write(f"HTTP/1.1 {status} OK\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(handle, '127.0.0.1', 0)
+    return server, f"127.0.0.1:{server.sockets[0].getsockname()[1]}"
+
+async def start_echo():
+    async def handle(reader, writer):
+        writer.write(b'echo:' + await reader.read(1024))
+        await writer.drain()
+        writer.close()
+    server = await asyncio.start_server(handle, '127.0.0.1', 0)
+    return server, server.sockets[0].getsockname()[1]
+
+async def http_get(address, url):
+    reader, writer = await asyncio.open_connection(*address)
+    writer.write(f"GET {url} HTTP/1.1\r\nHost: example.com\r\nProxy-Connection: keep-alive\r\n\r\n".encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return response
+
+async def serve(proxies, **kwargs):
+    server = ForwardProxyServer(ProxyRotator(proxies, pool=kwargs.pop('pool', None)), port=0, **kwargs)
+    await server.start()
+    return server
+
+def test_forwards_http_requests():
+    """Test that plain HTTP requests are routed through an upstream proxy"""
+    async def scenario():
+        upstream, address = await start_upstream('up1')
+        server = await serve([{'proxy': address}])
+        response = await http_get(server.address, 'http://example.com/ip')
+        await server.close()
+        upstream.close()
+        return response
+
+    response = asyncio.run(scenario())
+    assert response.startswith(b'HTTP/1.1 200')
+    assert response.endswith(b'up1 http://example.com/ip')
+
+def test_retries_on_failing_upstream():
+    """Test that a dead upstream is skipped, reported and eventually removed"""
+    async def scenario():
+        upstream, address = await start_upstream('up1')
+        dead = f"127.0.0.1:{free_port()}"
+        pool = ProxyPool()
+        server = await serve([{'proxy': dead}, {'proxy': address}], pool=pool, max_failures=2)
+        responses = [await http_get(server.address, 'http://example.com/') for _ in range(3)]
+        await server.close()
+        upstream.close()
+        return responses, pool, server.rotator, dead
+
+    responses, pool, rotator, dead = asyncio.run(scenario())
+    assert all(r.startswith(b'HTTP/1.1 200') for r in responses)
+    assert pool.get_score(dead).last_alive is False
+    assert len(rotator) == 1
+
+def test_connect_tunnel():
+    """Test that CONNECT requests are tunnelled through an upstream proxy"""
+    async def scenario():
+        upstream, address = await start_upstream('up1')
+        echo, echo_port = await start_echo()
+        server = await serve([{'proxy': address}])
+        reader, writer = await asyncio.open_connection(*server.address)
+        writer.write(f"CONNECT 127.0.0.1:{echo_port} HTTP/1.1\r\n\r\n".encode())
+        head = await reader.readuntil(b'\r\n\r\n')
+        writer.write(b'hello')
+        data = await reader.read(1024)
+        writer.close()
+        await server.close()
+        upstream.close()
+        echo.close()
+        return head, data
+
+    head, data = asyncio.run(scenario())
+    assert head.startswith(b'HTTP/1.1 200')
+    assert data == b'echo:hello'
+
+def test_bad_gateway_when_all_upstreams_fail():
+    """Test that the client gets a 502 when no upstream works"""
+    async def scenario():
+        server = await serve([{'proxy': f"127.0.0.1:{free_port()}"}], retries=0)
+        response = await http_get(server.address, 'http://example.com/')
+        await server.close()
+        return response
+
+    assert asyncio.run(scenario()).startswith(b'HTTP/1.1 502')
+
+def test_rate_limited_upstream_cools_down():
+    """Test that 429 responses from the target put the upstream on cooldown"""
+    async def scenario():
+        upstream, address = await start_upstream('up1', status=429)
+        server = await serve([{'proxy': address}])
+        first = await http_get(server.address, 'http://example.com/')
+        second = await http_get(server.address, 'http://example.com/')
+        await server.close()
+        upstream.close()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first.startswith(b'HTTP/1.1 429')
+    assert second.startswith(b'HTTP/1.1 502')
+
+async def start_body_echo():
+    """Fake upstream proxy that answers with the request head and body it received"""
+    async def handle(reader, writer):
+        head = await reader.readuntil(b'\r\n\r\n')
+        length = next((int(line.split(b':', 1)[1]) for line in head.split(b'\r\n')
+                       if line.lower().startswith(b'content-length:')), 0)
+        received = head + await reader.readexactly(length)
+        writer.write(f"HTTP/1.1 200 OK\r\nContent-Length: {len(received)}\r\n\r\n".encode() + received)
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(handle, '127.0.0.1', 0)
+    return server, f"127.0.0.1:{server.sockets[0].getsockname()[1]}"
+
+async def http_post(address, headers, body):
+    reader, writer = await asyncio.open_connection(*address)
+    writer.write(f"POST http://example.com/form HTTP/1.1\r\nHost: example.com\r\n{headers}\r\n".encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return response
+
+def test_chunked_request_body():
+    """Test that chunked bodies are decoded and forwarded with a Content-Length"""
+    async def scenario():
+        upstream, address = await start_body_echo()
+        server = await serve([{'proxy': address}])
+        chunked = await http_post(server.address, 'Transfer-Encoding: chunked\r\n',
+                                  b'5;ext=1\r\nhello\r\n6\r\n world\r\n0\r\nX-Trailer: 1\r\n\r\n')
+        gzipped = await http_post(server.address, 'Transfer-Encoding: gzip, chunked\r\n', b'0\r\n\r\n')
+        malformed = await http_post(server.address, 'Transfer-Encoding: chunked\r\n', b'zz\r\n')
+        await server.close()
+        upstream.close()
+        return chunked, gzipped, malformed
+
+    chunked, gzipped, malformed = asyncio.run(scenario())
+    assert chunked.startswith(b'HTTP/1.1 200')
+    assert chunked.endswith(b'\r\n\r\nhello world')
+    assert b'Content-Length: 11' in chunked
+    assert b'transfer-encoding' not in chunked.lower().split(b'\r\n\r\n', 1)[1]
+    assert gzipped.startswith(b'HTTP/1.1 501')
+    assert malformed.startswith(b'HTTP/1.1 400')
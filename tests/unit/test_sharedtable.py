@@ -0,0 +1,137 @@
+import multiprocessing
+import struct
+import pytest
+from fastProxy.pool import ProxyPool
+from fastProxy.sharedtable import (ProxyTableWriter, ProxyTableReader, pack_record, RECORD,
+                                   GENERATION_OFFSET)
+
+WORKING = [
+    {'proxy': '1.2.3.4:8080', 'type': 'https', 'protocols': ['https', 'http'], 'code': 'US',
+     'anonymity': 'elite proxy', 'latency': 120.5},
+    {'proxy': '5.6.7.8:3128', 'type': 'http', 'code': 'de', 'anonymity': 'anonymous', 'latency': 300.0},
+]
+
+
+def _read_in_child(path, queue):
+    with ProxyTableReader(path) as reader:
+        queue.put(reader.records())
+
+
+def test_publish_and_read(tmp_path):
+    """Test that readers decode exactly what the writer published"""
+    path = str(tmp_path / 'proxies.table')
+    with ProxyTableWriter(path, capacity=16) as writer:
+        assert writer.publish(WORKING) == 2
+        assert writer.generation == 2
+        with ProxyTableReader(path) as reader:
+            records = reader.records()
+            assert len(reader) == 2
+    assert [r['proxy'] for r in records] == ['1.2.3.4:8080', '5.6.7.8:3128']
+    assert records[0]['protocols'] == ['https', 'http']
+    assert records[0]['anonymity'] == 'elite proxy'
+    assert records[1] == {**records[1], 'type': 'http', 'protocols': ['http'], 'code': 'DE',
+                          'anonymity': 'anonymous proxy', 'latency': 300.0}
+
+
+def test_updates_visible_without_reopening(tmp_path):
+    """Test that an open reader sees every later publish immediately"""
+    path = str(tmp_path / 'proxies.table')
+    with ProxyTableWriter(path, capacity=16) as writer:
+        writer.publish(WORKING)
+        with ProxyTableReader(path) as reader:
+            assert len(reader) == 2
+            writer.publish(WORKING[1:])
+            assert [r['proxy'] for r in reader.records()] == ['5.6.7.8:3128']
+            writer.publish([])
+            assert reader.select() is None
+
+
+def test_reader_in_other_process(tmp_path):
+    """Test that a separate process reads the table through its own mapping"""
+    path = str(tmp_path / 'proxies.table')
+    with ProxyTableWriter(path, capacity=16) as writer:
+        writer.publish(WORKING)
+        queue = multiprocessing.get_context('spawn').Queue()
+        process = multiprocessing.get_context('spawn').Process(target=_read_in_child, args=(path, queue))
+        process.start()
+        records = queue.get(timeout=30)
+        process.join(timeout=30)
+    assert [r['proxy'] for r in records] == ['1.2.3.4:8080', '5.6.7.8:3128']
+
+
+def test_select_filters_and_scores(tmp_path):
+    """Test selection by protocol, country and pool score"""
+    path = str(tmp_path / 'proxies.table')
+    pool = ProxyPool()
+    for _ in range(5):
+        pool.record('1.2.3.4:8080', True, 120.5)
+        pool.record('5.6.7.8:3128', False)
+    with ProxyTableWriter(path, capacity=16) as writer:
+        writer.publish(WORKING, pool=pool)
+        with ProxyTableReader(path) as reader:
+            assert reader.select(protocol='https')['proxy'] == '1.2.3.4:8080'
+            assert reader.select(code='de')['proxy'] == '5.6.7.8:3128'
+            assert reader.select(min_score=0.5)['proxy'] == '1.2.3.4:8080'
+            assert reader.select(code='FR') is None
+            assert reader.select()['proxy'] in ('1.2.3.4:8080', '5.6.7.8:3128')
+
+
+def test_reader_waits_for_consistent_generation(tmp_path):
+    """Test that a read during a publish (odd generation) is retried and finally gives up"""
+    path = str(tmp_path / 'proxies.table')
+    with ProxyTableWriter(path, capacity=16) as writer:
+        writer.publish(WORKING)
+        struct.pack_into('<Q', writer._mmap, GENERATION_OFFSET, writer.generation + 1)
+        with ProxyTableReader(path, retries=5) as reader:
+            with pytest.raises(TimeoutError):
+                reader.records()
+            struct.pack_into('<Q', writer._mmap, GENERATION_OFFSET, writer.generation + 1)
+            assert len(reader.records()) == 2
+
+
+def test_capacity_and_invalid_entries(tmp_path):
+    """Test that non-IPv4 proxies are skipped and the table never overflows"""
+    path = str(tmp_path / 'proxies.table')
+    assert pack_record({'proxy': 'example.com:80'}) is None
+    assert len(pack_record(WORKING[0])) == RECORD.size
+    with ProxyTableWriter(path, capacity=1) as writer:
+        assert writer.publish(WORKING + [{'proxy': '[::1]:80'}]) == 1
+    with ProxyTableWriter(path, capacity=4) as writer:
+        # Reopening moves through an odd generation so readers notice the reset
+        assert writer.generation == 4
+    (tmp_path / 'bogus.table').write_bytes(b'x' * 64)
+    with pytest.raises(ValueError):
+        ProxyTableReader(str(tmp_path / 'bogus.table'))
+
+
+def test_reader_remaps_after_capacity_grows(tmp_path):
+    """Test that an open reader follows a writer that reopened the table larger"""
+    path = str(tmp_path / 'proxies.table')
+    with ProxyTableWriter(path, capacity=1) as writer:
+        writer.publish(WORKING[:1])
+    with ProxyTableReader(path) as reader:
+        assert reader.capacity == 1
+        with ProxyTableWriter(path, capacity=4096) as writer:
+            assert len(reader) == 0
+            many = [{'proxy': f"10.0.{i // 256}.{i % 256}:80", 'type': 'http'} for i in range(3000)]
+            assert writer.publish(many) == 3000
+            assert reader.capacity == 4096
+            assert len(reader.records()) == 3000
+            assert reader.select()['proxy'].startswith('10.0.')
+        # Reopening smaller keeps the file size, so the wider mapping stays valid
+        with ProxyTableWriter(path, capacity=2) as writer:
+            writer.publish(WORKING)
+            assert [r['proxy'] for r in reader.records()] == ['1.2.3.4:8080', '5.6.7.8:3128']
+
+
+def test_reader_refuses_truncated_table(tmp_path):
+    """Test that a header claiming more records than the file holds is refused"""
+    path = str(tmp_path / 'proxies.table')
+    with ProxyTableWriter(path, capacity=4) as writer:
+        writer.publish(WORKING)
+    with open(path, 'r+b') as f:
+        f.seek(8)
+        f.write(struct.pack('<I', 1000))
+    with ProxyTableReader(path, retries=5) as reader:
+        with pytest.raises(ValueError):
+            reader.records()
@@ -0,0 +1,115 @@
+import json
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from fastProxy import snapshot as snapshot_module
+from fastProxy.pool import ProxyPool
+from fastProxy.snapshot import save_snapshot, load_snapshot, to_candidate, WarmStart
+
+WORKING = [
+    {'proxy': '1.2.3.4:8080', 'type': 'https', 'protocols': ['https', 'http'], 'code': 'US',
+     'country': 'United States', 'anonymity': 'elite proxy', 'latency': 120.5},
+    {'proxy': '5.6.7.8:3128', 'type': 'http', 'country': 'DE', 'anonymity': 'anonymous proxy', 'latency': 300.0},
+]
+
+@pytest.fixture(params=['json', 'msgpack'])
+def encoding(request):
+    """Run each test with the JSON fallback and, if installed, msgpack"""
+    if request.param == 'msgpack':
+        pytest.importorskip('msgpack')
+        yield
+    else:
+        with patch.object(snapshot_module, 'msgpack', None):
+            yield
+
+def test_roundtrip_with_scores(tmp_path, encoding):
+    """Test that proxies and pool scores survive a save/load cycle"""
+    path = str(tmp_path / 'nested' / 'snapshot.bin')
+    pool = ProxyPool()
+    pool.record('1.2.3.4:8080', True, 120.5, info=WORKING[0])
+    save_snapshot(WORKING, path, pool=pool)
+
+    restored = ProxyPool()
+    started = time.perf_counter()
+    assert load_snapshot(path, pool=restored) == WORKING
+    assert time.perf_counter() - started < 0.1
+    assert restored.get_score('1.2.3.4:8080').checks == 1
+
+def test_missing_stale_and_corrupt_snapshots(tmp_path):
+    """Test that unusable snapshots load as empty"""
+    path = tmp_path / 'snapshot.bin'
+    assert load_snapshot(str(path)) == []
+
+    path.write_bytes(b'{not json')
+    assert load_snapshot(str(path)) == []
+
+    path.write_text(json.dumps({'version': 99, 'proxies': WORKING}))
+    assert load_snapshot(str(path)) == []
+
+    path.write_text(json.dumps({'version': 1, 'saved_at': time.time() - 3600, 'proxies': WORKING}))
+    assert load_snapshot(str(path), max_age=60) == []
+    assert load_snapshot(str(path)) == WORKING
+
+def test_to_candidate():
+    """Test conversion of working proxies back to candidates"""
+    assert to_candidate(WORKING[0]) == {
+        'ip': '1.2.3.4', 'port': '8080', 'code': 'US', 'country': 'United States',
+        'anonymity': 'elite proxy', 'https': 'yes', 'source': 'snapshot', 'checked_at': None
+    }
+    assert to_candidate(WORKING[1])['https'] == 'no'
+    assert to_candidate(dict(WORKING[1], checked_at=1700000000.0))['checked_at'] == 1700000000.0
+
+def test_warm_start_serves_snapshot_then_refreshes(tmp_path):
+    """Test that the snapshot is served right away and replaced after revalidation"""
+    path = str(tmp_path / 'snapshot.bin')
+    save_snapshot(WORKING, path)
+    refreshed = [dict(WORKING[1], latency=90.0)]
+    gate = threading.Event()
+
+    def run(proxies, **kwargs):
+        gate.wait(5)
+        assert {p['ip'] for p in proxies} == {'1.2.3.4', '5.6.7.8', '9.9.9.9'}
+        return refreshed
+
+    validator = MagicMock()
+    validator.run.side_effect = run
+
+    warm = WarmStart(path, validator=validator)
+    assert warm.start(candidates=[{'ip': '9.9.9.9', 'port': '80'}, {'ip': '1.2.3.4', 'port': '8080'}]) == WORKING
+    assert warm.proxies == WORKING
+    gate.set()
+    assert warm.wait(5)
+    assert warm.proxies == refreshed
+    assert load_snapshot(path) == refreshed
+
+def test_refresh_keeps_snapshot_without_result(tmp_path):
+    """Test that an empty or cancelled refresh neither replaces nor overwrites the snapshot"""
+    path = str(tmp_path / 'snapshot.bin')
+    save_snapshot(WORKING, path)
+    validator = MagicMock()
+    validator.run.return_value = []
+    warm = WarmStart(path, validator=validator)
+    warm.load()
+    assert warm.refresh(candidates=[]) == []
+    assert warm.fresh.is_set()
+    assert warm.proxies == WORKING
+    assert load_snapshot(path) == WORKING
+
+    validator.run.return_value = WORKING[:1]
+    validator.last_report.stop_reason = 'cancelled'
+    assert warm.refresh(candidates=[]) == WORKING[:1]
+    assert warm.proxies == WORKING
+    assert load_snapshot(path) == WORKING
+
+def test_refresh_in_target_mode(tmp_path):
+    """Test that want fetches interleaved candidates and reaches the validator"""
+    path = str(tmp_path / 'snapshot.bin')
+    validator = MagicMock()
+    validator.run.return_value = WORKING[:1]
+    with patch('fastProxy.proxy_sources.manager.ProxySourceManager.fetch_all',
+               return_value=[{'ip': '9.9.9.9', 'port': '80'}]) as fetch_all:
+        WarmStart(path, validator=validator).refresh(max_proxies=20, want=1)
+    fetch_all.assert_called_once_with(max_proxies=20, interleave=True)
+    assert validator.run.call_args.kwargs['want'] == 1
+    assert validator.run.call_args.kwargs['max_proxies'] == 20
@@ -0,0 +1,92 @@
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+from fastProxy.storage import ProxyHistoryStore
+from fastProxy.fastProxy import fetch_proxies
+
+@pytest.fixture
+def store(tmp_path):
+    with ProxyHistoryStore(str(tmp_path / 'history.db')) as store:
+        yield store
+
+def _record(ip, latency, outcome='alive', checked_at=None, **extra):
+    record = {
+        'ip': ip, 'port': '8080', 'protocol': 'https', 'latency': latency,
+        'outcome': outcome, 'checked_at': checked_at or time.time(),
+        'source': 'GeoNodeSource', 'code': 'DE', 'country': 'Germany',
+        'anonymity': 'elite proxy'
+    }
+    record.update(extra)
+    return record
+
+def test_wal_mode_enabled(store):
+    """Test that the store runs in WAL mode"""
+    mode = store._conn.execute('PRAGMA journal_mode').fetchone()[0]
+    assert mode == 'wal'
+
+def test_record_many_appends_history(store):
+    """Test bulk inserts keep every validation result"""
+    assert store.record_many([_record('1.1.1.1', 100), _record('1.1.1.1', None, 'dead')]) == 2
+    assert store.record_many([]) == 0
+    history = store.history('1.1.1.1', 8080)
+    assert len(history) == 2
+    assert {h['outcome'] for h in history} == {'alive', 'dead'}
+
+def test_last_success_not_cleared_by_failure(store):
+    """Test that a failed probe keeps the last success timestamp"""
+    store.record(_record('1.1.1.1', 100, checked_at=1000.0))
+    store.record(_record('1.1.1.1', None, 'dead', checked_at=2000.0, protocol=None))
+    row = store._conn.execute('SELECT * FROM proxies').fetchone()
+    assert row['last_success'] == 1000.0
+    assert row['last_checked'] == 2000.0
+    assert row['protocol'] == 'https'
+
+def test_query_p90_latency(store):
+    """Test top proxies by p90 latency with filters"""
+    fast = [_record('1.1.1.1', latency) for latency in range(100, 1100, 100)]
+    slow = [_record('2.2.2.2', latency) for latency in (700, 900, 1200)]
+    other = [_record('3.3.3.3', 50, code='US', country='United States')]
+    store.record_many(fast + slow + other)
+
+    results = store.query(country='DE', protocol='https', anonymity='elite',
+                          max_p90_latency=1000, alive_within=600)
+    assert [r['proxy'] for r in results] == ['1.1.1.1:8080']
+    assert results[0]['p90'] == 900
+    assert results[0]['samples'] == 10
+
+    results = store.query(country='DE')
+    assert [r['proxy'] for r in results] == ['1.1.1.1:8080', '2.2.2.2:8080']
+
+def test_query_matches_any_passed_protocol(store):
+    """Test that proxies passing HTTP and HTTPS are found by either protocol"""
+    store.record(_record('1.1.1.1', 100, protocol='https,http'))
+    store.record(_record('2.2.2.2', 100, protocol='http'))
+    assert [r['proxy'] for r in store.query(protocol='http')] == ['1.1.1.1:8080', '2.2.2.2:8080']
+    assert [r['proxy'] for r in store.query(protocol='https')] == ['1.1.1.1:8080']
+
+def test_query_alive_within(store):
+    """Test that stale proxies are excluded"""
+    store.record(_record('1.1.1.1', 100, checked_at=time.time() - 3600))
+    assert store.query(alive_within=600) == []
+    assert len(store.query(alive_within=7200)) == 1
+
+@patch('fastProxy.net.get')
+def test_fetch_proxies_records_outcomes(mock_get, store):
+    """Test that fetch_proxies appends alive and dead outcomes"""
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_get.return_value = mock_response
+    proxies = [{'ip': '1.1.1.1', 'port': '8080', 'https': False, 'source': 'FreeProxyListSource'}]
+
+    working = fetch_proxies(c=1, t=1, g=False, proxies=proxies, store=store)
+    assert len(working) == 1
+
+    mock_get.return_value.status_code = 500
+    fetch_proxies(c=1, t=1, g=False, proxies=proxies, store=store)
+
+    history = store.history('1.1.1.1', 8080)
+    assert [h['outcome'] for h in history] == ['dead', 'alive']
+    assert history[1]['protocol'] == 'http'
+    assert [r['proxy'] for r in store.query(protocol='http')] == ['1.1.1.1:8080']
+    assert history[1]['source'] == 'FreeProxyListSource'
+    assert history[1]['latency'] is not None
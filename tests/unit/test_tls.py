@@ -0,0 +1,160 @@
+import shutil
+import socket
+import ssl
+import subprocess
+import threading
+import pytest
+from unittest.mock import patch
+from fastProxy import tls
+from fastProxy.fastProxy import ProxyValidator, fetch_proxies
+from fastProxy.tls import SessionCache, TunnelError, probe_https, open_tunnel
+
+def _serve(server, handler):
+    def loop():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=handler, args=(conn,), daemon=True).start()
+    threading.Thread(target=loop, daemon=True).start()
+
+@pytest.fixture(scope='module')
+def judge(tmp_path_factory):
+    """A local HTTPS judge answering 200 to every request"""
+    if not shutil.which('openssl'):
+        pytest.skip('openssl is required to create a test certificate')
+    path = tmp_path_factory.mktemp('cert')
+    cert, key = path / 'cert.pem', path / 'key.pem'
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                    '-subj', '/CN=localhost', '-keyout', str(key), '-out', str(cert)],
+                   check=True, capture_output=True)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(str(cert), str(key))
+
+    def handle(conn):
+        try:
+            with context.wrap_socket(conn, server_side=True) as tls_conn:
+                data = b''
+                while b'\r\n\r\n' not in data:
+                    chunk = tls_conn.recv(4096)
+                    if not chunk:
+                        return
+                    data += chunk
+                tls_conn.sendall(b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\n{}')
+        except (OSError, ssl.SSLError):
+            pass
+
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(16)
+    _serve(server, handle)
+    yield f"https://127.0.0.1:{server.getsockname()[1]}/ip"
+    server.close()
+
+@pytest.fixture
+def connect_proxy():
+    """A local proxy that tunnels CONNECT requests, refusing any other method"""
+    def pipe(src, dst):
+        try:
+            while True:
+                data = src.recv(65536)
+                if not data:
+                    break
+                dst.sendall(data)
+        except OSError:
+            pass
+        finally:
+            for sock in (src, dst):
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+    def handle(conn):
+        head = b''
+        while b'\r\n\r\n' not in head:
+            chunk = conn.recv(4096)
+            if not chunk:
+                conn.close()
+                return
+            head += chunk
+        method, target = head.split()[:2]
+        if method != b'CONNECT':
+            conn.sendall(b'HTTP/1.1 405 Method Not Allowed\r\n\r\n')
+            conn.close()
+            return
+        host, _, port = target.decode().rpartition(':')
+        upstream = socket.create_connection((host, int(port)))
+        conn.sendall(b'HTTP/1.1 200 Connection established\r\n\r\n')
+        threading.Thread(target=pipe, args=(upstream, conn), daemon=True).start()
+        pipe(conn, upstream)
+
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(16)
+    _serve(server, handle)
+    yield f"127.0.0.1:{server.getsockname()[1]}"
+    server.close()
+
+def test_shared_context_is_reused():
+    """Test that every probe gets the same preconfigured SSL context"""
+    context = tls.shared_context()
+    assert context is tls.shared_context()
+    assert context.verify_mode == ssl.CERT_NONE
+    assert not context.check_hostname
+
+def test_tunnel_mode(judge, connect_proxy):
+    """Test the tunnel-only check: CONNECT and TLS handshake without a request"""
+    cache = SessionCache()
+    assert probe_https(connect_proxy, judge, timeout=5, mode='tunnel', session_cache=cache)
+    assert cache.full == 1
+
+def test_tls_mode_resumes_sessions(judge, connect_proxy):
+    """Test that later probes resume the TLS session of the first one"""
+    cache = SessionCache()
+    for _ in range(3):
+        assert probe_https(connect_proxy, judge, timeout=5, mode='tls', session_cache=cache)
+    assert cache.full == 1
+    assert cache.resumed == 2
+
+def test_refused_tunnel(judge):
+    """Test that a proxy answering CONNECT with an error is reported as TunnelError"""
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+
+    def refuse(conn):
+        conn.recv(4096)
+        conn.sendall(b'HTTP/1.1 403 Forbidden\r\n\r\n')
+        conn.close()
+
+    _serve(server, refuse)
+    try:
+        with pytest.raises(TunnelError):
+            open_tunnel(f"127.0.0.1:{server.getsockname()[1]}", '127.0.0.1', 443, timeout=5)
+    finally:
+        server.close()
+
+def test_validator_https_check_modes(judge, connect_proxy):
+    """Test that the validator reports tunnelling proxies as HTTPS in tunnel mode"""
+    ip, port = connect_proxy.split(':')
+    proxies = [{'ip': ip, 'port': port, 'https': True, 'country': 'Local', 'anonymity': 'elite'}]
+    validator = ProxyValidator(thread_count=1, request_timeout=5, write_csv=False,
+                               https_url=judge, http_url='http://127.0.0.1:9/ip', https_check='tunnel')
+    working = validator.run(proxies=proxies)
+    assert [p['type'] for p in working] == ['https']
+    assert working[0]['protocols'] == ['https']
+
+def test_fetch_proxies_https_check():
+    """Test that fetch_proxies and from_globals pass the HTTPS check mode to the validator"""
+    assert ProxyValidator.from_globals().https_check == 'request'
+    assert ProxyValidator.from_globals(https_check='tls').https_check == 'tls'
+    with patch.object(ProxyValidator, 'run', autospec=True, return_value=[]) as run:
+        fetch_proxies(proxies=[], https_check='tunnel')
+    assert run.call_args.args[0].https_check == 'tunnel'
+
+def test_invalid_https_check():
+    """Test that unknown HTTPS check modes are rejected"""
+    with pytest.raises(ValueError):
+        ProxyValidator(https_check='handshake')